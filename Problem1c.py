@@ -4,10 +4,10 @@ from datetime import datetime
 from typing import Dict
 
 from justinvest.access_control import AccessControlEngine
-from justinvest.authentication import AuthenticatedUser, CredentialStore
+from justinvest.authentication import AuthenticatedUser, AuthenticationError, CredentialStore
 from justinvest.models import SessionContext
 from justinvest.operations import ALL_OPERATIONS, format_operations_menu
-from justinvest.repository import load_roles, load_users
+from justinvest.snapshot import load_startup_state
 
 try:
     import getpass
@@ -31,7 +31,11 @@ def _auth_prompt(credentials: CredentialStore) -> AuthenticatedUser | None:
         password = getpass.getpass("Enter password: ")
     else:
         password = input("Enter password: ")
-    user = credentials.authenticate(username=username, password=password)
+    try:
+        user = credentials.authenticate(username=username, password=password)
+    except AuthenticationError as exc:
+        print(f"ACCESS DENIED. {exc}")
+        return None
     if user is None:
         print("ACCESS DENIED. Invalid username or password.")
         return None
@@ -42,16 +46,20 @@ def _auth_prompt(credentials: CredentialStore) -> AuthenticatedUser | None:
 def _display_authorized_operations(engine: AccessControlEngine, user: AuthenticatedUser, context: SessionContext) -> None:
     """shows the user which operations they can perform and lets them pick one."""
     operation_numbers = _build_operation_index()
-    allowed_codes = []
-    denial_reason = None
-    for operation in ALL_OPERATIONS:
-        decision = engine.is_operation_allowed(user.role, operation.code, context)
-        if decision.granted:
-            allowed_codes.append(operation.code)
-        elif denial_reason is None:
-            denial_reason = decision.reason
+    decisions = engine.authorize_many(
+        (user.role, operation.code, context.as_of) for operation in ALL_OPERATIONS
+    )
+    allowed_codes = [
+        operation.code
+        for operation, granted in zip(ALL_OPERATIONS, decisions)
+        if granted
+    ]
 
     if not allowed_codes:
+        # every operation was denied, so the first one's decision says why
+        denial_reason = engine.is_operation_allowed(
+            user.role, ALL_OPERATIONS[0].code, context
+        ).reason
         print(f"\nNo operations available. Reason: {denial_reason or 'Not authorized.'}")
         return
 
@@ -80,10 +88,9 @@ def main() -> None:
     print("justInvest System")
     print(format_operations_menu())
 
-    roles = load_roles()
-    users = load_users()
-    credentials = CredentialStore(users)
-    engine = AccessControlEngine(roles)
+    state = load_startup_state()
+    credentials = state.credential_store()
+    engine = state.engine
 
     user = _auth_prompt(credentials)
     if user is None:
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from justinvest.enrollment import EnrollmentError, enroll_user, get_self_signup_roles
+from justinvest.enrollment_log import EnrollmentLog, EnrollmentMaterializer
 from justinvest.password_policy import PasswordPolicy
-from justinvest.repository import load_roles
+from justinvest.snapshot import load_startup_state
 
 try:
     import getpass
@@ -58,17 +59,20 @@ def _prompt_password(policy: PasswordPolicy, username: str) -> str:
 def main() -> None:
     """runs the self-service signup flow, collecting username, role, and password."""
     print("justInvest Self-Service Signup")
-    roles = load_roles()
-    signup_roles = get_self_signup_roles(roles)
+    state = load_startup_state(include_users=False)
+    signup_roles = get_self_signup_roles(state.roles)
     if not signup_roles:
         print("Self-service signup is currently unavailable.")
         return
-    policy = PasswordPolicy()
+    policy = state.password_policy()
     username = _prompt_username()
     role = _prompt_role(signup_roles)
     password = _prompt_password(policy, username)
     try:
-        result = enroll_user(username, role, password, policy=policy)
+        # the account is logged once; passwd.txt and users.json are
+        # brought up to date by the materializer before we exit
+        with EnrollmentMaterializer(EnrollmentLog()) as materializer:
+            result = enroll_user(username, role, password, policy=policy, log=materializer.log)
     except EnrollmentError as exc:
         print(f"Enrollment failed: {exc}")
         return
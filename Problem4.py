@@ -2,10 +2,10 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from justinvest.access_control import AccessControlEngine
+from justinvest.hash_params import load_hash_parameters
 from justinvest.login import LoginError, perform_login
 from justinvest.operations import OPERATIONS_BY_CODE, format_operations_menu
-from justinvest.repository import load_roles
+from justinvest.snapshot import load_startup_state
 
 try:
     import getpass
@@ -18,8 +18,9 @@ def main() -> None:
     print("justInvest Login Portal")
     print(format_operations_menu())
 
-    roles = load_roles()
-    engine = AccessControlEngine(roles)
+    state = load_startup_state(include_users=False)
+    roles = state.roles
+    engine = state.engine
 
     username = input("\nEnter username: ").strip()
     if getpass:
@@ -34,6 +35,7 @@ def main() -> None:
             engine,
             roles=roles,
             as_of=datetime.now(),
+            rehash=load_hash_parameters(),
         )
     except LoginError as exc:
         print(f"\nACCESS DENIED: {exc}")
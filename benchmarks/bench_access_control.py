@@ -0,0 +1,50 @@
+"""Microbenchmark for authorization checks against the teller role.
+
+The teller role carries a time_window constraint, so it exercises the
+constraint path on every check.
+
+    python3 benchmarks/bench_access_control.py --number 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from justinvest.access_control import AccessControlEngine  # noqa: E402
+from justinvest.models import SessionContext  # noqa: E402
+from justinvest.repository import load_roles  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = AccessControlEngine(load_roles())
+    inside = SessionContext(as_of=datetime(2025, 1, 1, 10, 0))
+    outside = SessionContext(as_of=datetime(2025, 1, 1, 20, 0))
+    cases = {
+        "is_operation_allowed (in hours)": lambda: engine.is_operation_allowed(
+            "teller", "VIEW_ACCOUNT_BALANCE", inside
+        ),
+        "is_operation_allowed (after hours)": lambda: engine.is_operation_allowed(
+            "teller", "VIEW_ACCOUNT_BALANCE", outside
+        ),
+        "permitted_operations (in hours)": lambda: engine.permitted_operations(
+            "teller", inside
+        ),
+    }
+    for name, call in cases.items():
+        best = min(timeit.repeat(call, number=args.number, repeat=args.repeat))
+        print(f"{name:<36} {best / args.number * 1e9:>8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
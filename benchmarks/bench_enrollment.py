@@ -0,0 +1,170 @@
+"""Multi-process enrollment stress test.
+
+Several processes, each running several threads, enroll distinct users
+at once. Afterwards every expected username is looked up in passwd.txt
+and users.json, and the two files are compared with the consistency
+checker. Any missing username is counted as lost.
+
+Modes:
+
+* ``log`` appends to the shared enrollment log. Each append waits up to
+  ``--windows`` seconds so that concurrent appends share one write and
+  one fsync. Each process runs its own materializer.
+* ``files`` is the direct path enrollment used before the log, kept as a
+  baseline. It does a locked ``add_record`` and then a locked users
+  journal append, with no fsync.
+
+Hashing is excluded from the measurement. The log mode uses a
+precomputed hash and the files mode hashes with a single PBKDF2
+iteration, so the numbers measure the write path only.
+
+    python3 benchmarks/bench_enrollment.py --processes 4 --threads 8 --per-thread 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from justinvest.credentials import hash_password  # noqa: E402
+from justinvest.enrollment_log import (  # noqa: E402
+    EnrollmentLog,
+    EnrollmentMaterializer,
+    check_consistency,
+)
+from justinvest.file_lock import file_lock  # noqa: E402
+from justinvest.password_file import add_record, iter_records  # noqa: E402
+from justinvest.repository import load_users  # noqa: E402
+from justinvest.user_journal import UserJournal  # noqa: E402
+
+
+def worker(
+    mode: str,
+    workdir: Path,
+    process: int,
+    threads: int,
+    per_thread: int,
+    window: float,
+    start,
+    commits,
+) -> None:
+    passwd_path = workdir / "passwd.txt"
+    users_path = workdir / "users.json"
+    password_hash = hash_password("Secure@123", iterations=1)
+    log = EnrollmentLog(
+        workdir / "enrollments.log",
+        passwd_path=passwd_path,
+        users_path=users_path,
+        commit_window=window,
+    )
+    journal = UserJournal(users_path)
+
+    def enroll(thread: int) -> None:
+        for number in range(per_thread):
+            username = f"p{process}.t{thread}.u{number}"
+            if mode == "log":
+                log.append(
+                    {
+                        "username": username,
+                        "full_name": username,
+                        "role": "client",
+                        "password_hash": password_hash,
+                    }
+                )
+            else:
+                record = add_record(username, "client", "Secure@123", path=passwd_path, iterations=1)
+                with file_lock(users_path):
+                    journal.append(
+                        {
+                            "username": username,
+                            "full_name": username,
+                            "role": "client",
+                            "password_hash": record.password_hash,
+                        }
+                    )
+
+    materializer = EnrollmentMaterializer(log) if mode == "log" else None
+    pool = [threading.Thread(target=enroll, args=(thread,)) for thread in range(threads)]
+    start.wait()
+    if materializer is not None:
+        materializer.start()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    if materializer is not None:
+        materializer.stop()
+    commits.put(log.commits)
+
+
+def run(mode: str, processes: int, threads: int, per_thread: int, window: float) -> dict:
+    with tempfile.TemporaryDirectory() as scratch:
+        workdir = Path(scratch)
+        (workdir / "users.json").write_text(json.dumps({"users": []}))
+        start = multiprocessing.Event()
+        commits = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=worker,
+                args=(mode, workdir, process, threads, per_thread, window, start, commits),
+            )
+            for process in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        time.sleep(0.5)
+        started = time.perf_counter()
+        start.set()
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - started
+        fsyncs = sum(commits.get() for _ in workers)
+
+        expected = {
+            f"p{process}.t{thread}.u{number}"
+            for process in range(processes)
+            for thread in range(threads)
+            for number in range(per_thread)
+        }
+        in_passwd = {record.username for record in iter_records(workdir / "passwd.txt")}
+        in_users = {user.username for user in load_users(workdir / "users.json")}
+        report = check_consistency(workdir / "passwd.txt", workdir / "users.json")
+        return {
+            "rate": len(expected) / elapsed,
+            "fsyncs": fsyncs,
+            "lost": len(expected - (in_passwd & in_users)),
+            "consistent": report.consistent,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=50)
+    parser.add_argument("--windows", nargs="+", type=float, default=[0.0, 0.002, 0.005])
+    parser.add_argument("--modes", nargs="+", choices=["log", "files"], default=["log", "files"])
+    args = parser.parse_args()
+
+    total = args.processes * args.threads * args.per_thread
+    print(f"{total} enrollments from {args.processes} processes x {args.threads} threads")
+    print(f"{'mode':>6} {'window ms':>10} {'enroll/s':>10} {'fsyncs':>8} {'lost':>6} {'consistent':>11}")
+    for mode in args.modes:
+        for window in args.windows if mode == "log" else [0.0]:
+            result = run(mode, args.processes, args.threads, args.per_thread, window)
+            print(
+                f"{mode:>6} {window * 1000:>10.1f} {result['rate']:>10.0f} "
+                f"{result['fsyncs']:>8} {result['lost']:>6} {str(result['consistent']):>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmarks get_record against synthetic passwd.txt files.
+
+Compares the streaming reader with the old read_text().splitlines() scan
+for the first user, the last user and a missing user. Memory is the
+tracemalloc peak for a single lookup, taken in a separate run.
+
+    python3 benchmarks/bench_password_file.py --sizes 10000 1000000 10000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import secrets
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from justinvest.password_file import PasswordRecord, get_record, parse_record  # noqa: E402
+
+
+def legacy_get_record(username: str, path: Path) -> Optional[PasswordRecord]:
+    """the original whole-file implementation, kept for comparison."""
+
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        record = parse_record(line)
+        if record.username == username:
+            return record
+    return None
+
+
+def write_passwd_file(path: Path, count: int) -> None:
+    salt = secrets.token_hex(16)
+    digest = secrets.token_hex(32)
+    with path.open("w", encoding="utf-8") as handle:
+        for index in range(count):
+            handle.write(f"user{index:08d}|client|pbkdf2_sha256$600000${salt}${digest}\n")
+
+
+def measure(lookup: Callable[[], object]) -> tuple[float, int]:
+    # time and memory are taken in separate runs because tracemalloc
+    # slows allocation-heavy code down by several times
+    started = time.perf_counter()
+    lookup()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    lookup()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--skip-legacy", action="store_true", help="only run the streaming reader")
+    args = parser.parse_args()
+
+    print(f"{'records':>10} {'target':>8} {'impl':>9} {'ms':>10} {'peak KiB':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in args.sizes:
+            path = Path(workdir) / f"passwd-{count}.txt"
+            write_passwd_file(path, count)
+            targets = {
+                "first": "user00000000",
+                "last": f"user{count - 1:08d}",
+                "missing": "nobody",
+            }
+            for target, username in targets.items():
+                impls = {"stream": lambda: get_record(username, path)}
+                if not args.skip_legacy:
+                    impls["legacy"] = lambda: legacy_get_record(username, path)
+                for name, lookup in impls.items():
+                    elapsed, peak = measure(lookup)
+                    print(
+                        f"{count:>10} {target:>8} {name:>9} "
+                        f"{elapsed * 1000:>10.2f} {peak / 1024:>12.1f}"
+                    )
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Measures cold start of the entry points with and without the snapshot.
+
+Import cost is the cumulative ``python -X importtime`` figure for each
+Problem module. It is the minimum over several fresh interpreters.
+
+Setup cost is the work ``main`` does before its first prompt, run
+against a synthetic users.json and the bundled roles and weak-password
+list. It is timed three ways:
+
+* ``parse`` builds everything from the text files, as the entry points
+  did before the snapshot.
+* ``build`` is a snapshot miss: parse, then write the snapshot.
+* ``hit`` loads the snapshot written by ``build``.
+
+    python3 benchmarks/bench_startup.py --users 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from bench_user_memory import write_users_file  # noqa: E402
+from justinvest.access_control import AccessControlEngine  # noqa: E402
+from justinvest.authentication import CredentialStore  # noqa: E402
+from justinvest.password_policy import PasswordPolicy  # noqa: E402
+from justinvest.policy_resources import PolicyResourceRegistry  # noqa: E402
+from justinvest.repository import load_roles, load_users  # noqa: E402
+from justinvest.snapshot import build_snapshot, load_startup_state  # noqa: E402
+
+
+def import_ms(module: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        last = completed.stderr.strip().splitlines()[-1]
+        timings.append(int(last.split("|")[1]) / 1000)
+    return min(timings)
+
+
+def best_of(runs: int, setup) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        setup()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':>10} {'import ms':>10}")
+    for module in ("Problem1c", "Problem3", "Problem4"):
+        print(f"{module:>10} {import_ms(module, args.runs):>10.1f}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = {
+            "roles_path": Path(workdir) / "roles.json",
+            "users_path": Path(workdir) / "users.json",
+            "weak_passwords_path": Path(workdir) / "weak_passwords.txt",
+            "snapshot_path": Path(workdir) / "startup.snapshot",
+        }
+        shutil.copy(ROOT / "data" / "roles.json", paths["roles_path"])
+        shutil.copy(ROOT / "data" / "weak_passwords.txt", paths["weak_passwords_path"])
+        write_users_file(paths["users_path"], args.users)
+
+        def parse() -> None:
+            roles = load_roles(paths["roles_path"])
+            AccessControlEngine(roles)
+            CredentialStore(load_users(paths["users_path"]), compact=True)
+            policy = PasswordPolicy(
+                weak_passwords_path=paths["weak_passwords_path"],
+                registry=PolicyResourceRegistry(),
+            )
+            policy.validate("someone", "Secure@123")
+
+        def hit() -> None:
+            state = load_startup_state(**paths)
+            state.credential_store()
+            policy = state.password_policy(registry=PolicyResourceRegistry())
+            policy.validate("someone", "Secure@123")
+
+        print(f"\n{args.users} users")
+        print(f"{'setup':>10} {'ms':>10}")
+        print(f"{'parse':>10} {best_of(args.runs, parse):>10.1f}")
+        print(f"{'build':>10} {best_of(args.runs, lambda: build_snapshot(**paths)):>10.1f}")
+        print(f"{'hit':>10} {best_of(args.runs, hit):>10.1f}")
+        if not load_startup_state(**paths).from_snapshot:
+            print("warning: the snapshot was not used")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Measures memory per user and verify overhead for in-memory user records.
+
+A synthetic users.json is loaded once as ``UserRecord`` dataclasses with
+text hashes (``load_users``) and once as ``CompactUser`` records with
+decoded hashes (``load_compact_users``). Memory is the tracemalloc
+growth once each list is built, divided by the user count. The verify
+timing uses a single-iteration PBKDF2 hash, so it shows the cost of
+parsing the stored hash rather than the key derivation.
+
+    python3 benchmarks/bench_user_memory.py --users 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import secrets
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from justinvest.authentication import compact_user, verify_compact, verify_password  # noqa: E402
+from justinvest.repository import load_compact_users, load_users  # noqa: E402
+
+ROLES = ["client", "premium_client", "financial_advisor", "financial_planner", "teller"]
+
+
+def write_users_file(path: Path, count: int) -> None:
+    users = []
+    for index in range(count):
+        salt = secrets.token_hex(16)
+        digest = secrets.token_hex(32)
+        username = f"user{index:08d}"
+        users.append(
+            {
+                "username": username,
+                "full_name": username,
+                "role": ROLES[index % len(ROLES)],
+                "password_hash": f"pbkdf2_sha256$600000${salt}${digest}",
+            }
+        )
+    path.write_text(json.dumps({"users": users}), encoding="utf-8")
+
+
+def retained_bytes(load) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    records = load()
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return after - before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = Path(workdir) / "users.json"
+        write_users_file(path, args.users)
+        print(f"{'records':>14} {'bytes/user':>12}")
+        for name, load in (
+            ("UserRecord", lambda: load_users(path)),
+            ("CompactUser", lambda: load_compact_users(path)),
+        ):
+            print(f"{name:>14} {retained_bytes(load) / args.users:>12.1f}")
+
+    stored_hash = f"pbkdf2_sha256$1${secrets.token_hex(16)}${secrets.token_hex(32)}"
+    user = compact_user("someone", "client", stored_hash)
+    print(f"\n{'verify':>14} {'us/call':>12}")
+    for name, check in (
+        ("text hash", lambda: verify_password("Secure@123", stored_hash)),
+        ("decoded", lambda: verify_compact("Secure@123", user)),
+    ):
+        seconds = min(timeit.repeat(check, number=args.number, repeat=3))
+        print(f"{name:>14} {seconds / args.number * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
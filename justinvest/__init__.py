@@ -1,4 +1,4 @@
-from .operations import ALL_OPERATIONS, Operation, OPERATIONS_BY_CODE
+from .operations import ALL_OPERATIONS, OPERATION_BITS, Operation, OPERATIONS_BY_CODE
 
-__all__ = ["ALL_OPERATIONS", "OPERATIONS_BY_CODE", "Operation"]
+__all__ = ["ALL_OPERATIONS", "OPERATION_BITS", "OPERATIONS_BY_CODE", "Operation"]
 
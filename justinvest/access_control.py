@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime, time
-from typing import Dict, Iterable, List, Protocol, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, tzinfo
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
 
 from .models import (
     AuthorizationDecision,
@@ -11,6 +11,15 @@ from .models import (
     SessionContext,
     build_role_lookup,
 )
+from .operations import OPERATION_BITS, operations_mask
+
+_MICROS_PER_DAY = 24 * 60 * 60 * 1_000_000
+
+
+def _micros_of_day(value: time) -> int:
+    return (
+        (value.hour * 60 + value.minute) * 60 + value.second
+    ) * 1_000_000 + value.microsecond
 
 
 class ConstraintEvaluator(Protocol):
@@ -26,18 +35,19 @@ class TimeWindowConstraint:
 
     start: time
     end: time
+    denial_reason: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.denial_reason = (
+            "Access restricted to business hours "
+            f"{self.start.strftime('%H:%M')}–{self.end.strftime('%H:%M')}."
+        )
 
     def evaluate(self, context: SessionContext) -> AuthorizationDecision:
         current_time = context.as_of.time()
         if self.start <= current_time <= self.end:
             return AuthorizationDecision(granted=True)
-        return AuthorizationDecision(
-            granted=False,
-            reason=(
-                "Access restricted to business hours "
-                f"{self.start.strftime('%H:%M')}–{self.end.strftime('%H:%M')}."
-            ),
-        )
+        return AuthorizationDecision(granted=False, reason=self.denial_reason)
 
 
 class ConstraintFactory:
@@ -63,52 +73,280 @@ class ConstraintFactory:
         return TimeWindowConstraint(start=start, end=end)
 
 
+@dataclass(frozen=True)
+class CompiledRole:
+    """a role with its constraints built and permissions sorted ahead of time.
+
+    ``window`` is the intersection of the role's time windows in
+    microseconds since midnight, or None if some constraint is not a
+    time window and has to be evaluated the slow way.
+    """
+
+    definition: RoleDefinition
+    constraints: Tuple[ConstraintEvaluator, ...]
+    sorted_permissions: Tuple[str, ...]
+    permission_mask: int
+    window: Optional[Tuple[int, int]]
+
+
+@dataclass(frozen=True)
+class _CachedOutcome:
+    """a role's constraint outcome and the span of time it holds for.
+
+    a bound of None means the outcome never changes in that direction.
+    """
+
+    tz: Optional[tzinfo]
+    valid_from: Optional[datetime]
+    valid_until: Optional[datetime]
+    granted: bool
+    reason: Optional[str]
+    permitted: Tuple[str, ...]
+
+    def covers(self, as_of: datetime) -> bool:
+        if self.valid_from is None and self.valid_until is None:
+            return True
+        if as_of.tzinfo is not self.tz:
+            return False
+        return (self.valid_from is None or self.valid_from <= as_of) and (
+            self.valid_until is None or as_of < self.valid_until
+        )
+
+
+@dataclass
+class DecisionCacheStats:
+    """hit and miss counts for the engine's decision cache."""
+
+    hits: int = 0
+    misses: int = 0
+
+
 class AccessControlEngine:
-    """decides what each role can and can't do."""
+    """decides what each role can and can't do.
+
+    time windows give the same answer until the clock crosses a window
+    edge, so each role's outcome is cached together with the span it is
+    valid for and only recomputed once a request falls outside it.
+    """
 
     def __init__(self, roles: Iterable[RoleDefinition]) -> None:
-        self._roles = build_role_lookup(roles)
         self._constraint_factory = ConstraintFactory()
+        self._cache_stats = DecisionCacheStats()
+        self.reload(roles)
+
+    def reload(self, roles: Iterable[RoleDefinition]) -> None:
+        """replaces the role set and compiles it for fast checks."""
+
+        self._decision_cache: Dict[str, _CachedOutcome] = {}
+        self._roles = build_role_lookup(roles)
+        self._permission_bits = dict(OPERATION_BITS)
+        for role in self._roles.values():
+            for code in sorted(role.permissions):
+                self._permission_bits.setdefault(code, len(self._permission_bits))
+        self._compiled: Dict[str, CompiledRole] = {
+            name: self._compile(role) for name, role in self._roles.items()
+        }
+
+    def _compile(self, role: RoleDefinition) -> CompiledRole:
+        constraints = tuple(
+            self._constraint_factory.build(definition) for definition in role.constraints
+        )
+        window: Optional[Tuple[int, int]] = (0, _MICROS_PER_DAY - 1)
+        for evaluator in constraints:
+            if not isinstance(evaluator, TimeWindowConstraint) or window is None:
+                window = None
+                continue
+            window = (
+                max(window[0], _micros_of_day(evaluator.start)),
+                min(window[1], _micros_of_day(evaluator.end)),
+            )
+        return CompiledRole(
+            definition=role,
+            constraints=constraints,
+            sorted_permissions=tuple(sorted(role.permissions)),
+            permission_mask=operations_mask(role.permissions, self._permission_bits),
+            window=window,
+        )
 
     def get_role(self, role_name: str) -> RoleDefinition:
-        if role_name not in self._roles:
+        return self._get_compiled(role_name).definition
+
+    def _get_compiled(self, role_name: str) -> CompiledRole:
+        compiled = self._compiled.get(role_name)
+        if compiled is None:
             raise KeyError(f"Unknown role '{role_name}'")
-        return self._roles[role_name]
+        return compiled
 
     def _evaluate_role_constraints(
-        self, role: RoleDefinition, context: SessionContext
+        self, compiled: CompiledRole, context: SessionContext
     ) -> AuthorizationDecision:
-        for definition in role.constraints:
-            evaluator = self._constraint_factory.build(definition)
+        for evaluator in compiled.constraints:
             decision = evaluator.evaluate(context)
             if not decision.granted:
                 return decision
         return AuthorizationDecision(granted=True)
 
+    def _outcome(self, compiled: CompiledRole, as_of: datetime) -> _CachedOutcome:
+        """returns the role's cached constraint outcome, recomputing it if
+        ``as_of`` falls outside the span it was cached for."""
+
+        name = compiled.definition.name
+        cached = self._decision_cache.get(name)
+        if cached is not None and cached.covers(as_of):
+            self._cache_stats.hits += 1
+            return cached
+        self._cache_stats.misses += 1
+        decision = self._evaluate_role_constraints(compiled, SessionContext(as_of=as_of))
+        valid_from, valid_until = self._outcome_span(compiled, as_of)
+        outcome = _CachedOutcome(
+            tz=as_of.tzinfo,
+            valid_from=valid_from,
+            valid_until=valid_until,
+            granted=decision.granted,
+            reason=decision.reason,
+            permitted=compiled.sorted_permissions if decision.granted else (),
+        )
+        self._decision_cache[name] = outcome
+        return outcome
+
+    def _outcome_span(
+        self, compiled: CompiledRole, as_of: datetime
+    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """finds the last and next instants around ``as_of`` at which the
+        role's constraint outcome can change."""
+
+        window = compiled.window
+        if window is None:
+            # opaque constraints can change at any time, so cache nothing
+            return as_of, as_of
+        start, end = window
+        if start == 0 and end == _MICROS_PER_DAY - 1:
+            return None, None
+        midnight = as_of.replace(hour=0, minute=0, second=0, microsecond=0)
+        if start > end:
+            return midnight, midnight + timedelta(days=1)
+        now = _micros_of_day(as_of.time())
+        opens = midnight + timedelta(microseconds=start)
+        closes = midnight + timedelta(microseconds=end + 1)
+        if now < start:
+            return midnight, opens
+        if now <= end:
+            return opens, closes
+        return closes, opens + timedelta(days=1)
+
+    def next_transition(
+        self, role_name: str, as_of: datetime | None = None
+    ) -> Optional[datetime]:
+        """returns when the role's constraint outcome next changes, or None
+        if it never does. roles with constraints other than time windows
+        report ``as_of`` itself since they may change at any moment."""
+
+        as_of = as_of or datetime.now()
+        return self._outcome(self._get_compiled(role_name), as_of).valid_until
+
+    def cache_stats(self) -> DecisionCacheStats:
+        """returns a copy of the decision cache counters."""
+
+        return DecisionCacheStats(
+            hits=self._cache_stats.hits, misses=self._cache_stats.misses
+        )
+
     def is_operation_allowed(
         self,
         role_name: str,
         permission_code: str,
         context: SessionContext | None = None,
     ) -> AuthorizationDecision:
-        context = context or SessionContext(as_of=datetime.now())
-        role = self.get_role(role_name)
+        as_of = context.as_of if context is not None else datetime.now()
+        compiled = self._get_compiled(role_name)
+        role = compiled.definition
         if not role.allows(permission_code):
             return AuthorizationDecision(
                 granted=False, reason=f"Role '{role.label}' lacks '{permission_code}'."
             )
-        constraint_decision = self._evaluate_role_constraints(role, context)
-        if not constraint_decision.granted:
-            return constraint_decision
-        return AuthorizationDecision(granted=True)
+        outcome = self._outcome(compiled, as_of)
+        return AuthorizationDecision(granted=outcome.granted, reason=outcome.reason)
 
     def permitted_operations(
         self, role_name: str, context: SessionContext | None = None
     ) -> List[str]:
-        context = context or SessionContext(as_of=datetime.now())
-        role = self.get_role(role_name)
-        constraint_decision = self._evaluate_role_constraints(role, context)
-        if not constraint_decision.granted:
-            return []
-        return sorted(role.permissions)
+        as_of = context.as_of if context is not None else datetime.now()
+        return list(self._outcome(self._get_compiled(role_name), as_of).permitted)
+
+    def authorize_many(
+        self, requests: Iterable[Tuple[str, str, datetime]]
+    ) -> List[bool]:
+        """checks a batch of (role, permission, timestamp) rows at once."""
+
+        results: List[bool] = []
+        for role_name, permission_code, as_of in requests:
+            compiled = self._get_compiled(role_name)
+            bit = self._permission_bits.get(permission_code)
+            if bit is None or not compiled.permission_mask >> bit & 1:
+                results.append(False)
+            elif compiled.window is not None:
+                micros = _micros_of_day(as_of.time())
+                results.append(compiled.window[0] <= micros <= compiled.window[1])
+            else:
+                context = SessionContext(as_of=as_of)
+                results.append(self._evaluate_role_constraints(compiled, context).granted)
+        return results
+
+    def authorize_arrays(
+        self,
+        role_names: Sequence[str],
+        permission_codes: Sequence[str],
+        timestamps: Sequence[Any],
+    ) -> Any:
+        """vectorized authorize_many over numpy arrays; returns a bool array.
+
+        the columns may be numpy arrays or plain sequences, and timestamps
+        are read as naive wall-clock ``datetime64`` values. the types are
+        kept loose so that numpy stays an optional dependency.
+        """
+
+        # numpy is imported here rather than at module load, since it
+        # costs more than the rest of the package put together
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("authorize_arrays requires numpy to be installed.") from None
+        if len(self._permission_bits) > 63:
+            raise ValueError("Too many distinct permissions for a 64-bit mask.")
+        roles = numpy.asarray(role_names)
+        codes = numpy.asarray(permission_codes)
+        # roles and codes are few, so one comparison pass per distinct value
+        # is cheaper than sorting the columns with numpy.unique
+        role_index = numpy.full(roles.shape, -1, dtype=numpy.int64)
+        compiled_roles = list(self._compiled.values())
+        for position, compiled in enumerate(compiled_roles):
+            role_index[roles == compiled.definition.name] = position
+        if (role_index < 0).any():
+            unknown = roles[role_index < 0][0]
+            raise KeyError(f"Unknown role '{unknown}'")
+        if any(compiled.window is None for compiled in compiled_roles):
+            return numpy.array(
+                self.authorize_many(
+                    zip(
+                        roles.tolist(),
+                        codes.tolist(),
+                        numpy.asarray(timestamps, dtype="datetime64[us]").tolist(),
+                    )
+                ),
+                dtype=bool,
+            )
+        bits = numpy.full(codes.shape, -1, dtype=numpy.int64)
+        for code, bit in self._permission_bits.items():
+            bits[codes == code] = bit
+        masks = numpy.array([c.permission_mask for c in compiled_roles], dtype=numpy.int64)
+        starts = numpy.array([c.window[0] for c in compiled_roles], dtype=numpy.int64)
+        ends = numpy.array([c.window[1] for c in compiled_roles], dtype=numpy.int64)
+
+        stamps = numpy.asarray(timestamps, dtype="datetime64[us]")
+        micros = (stamps - stamps.astype("datetime64[D]")).astype(numpy.int64)
 
+        has_permission = (bits >= 0) & (
+            (masks[role_index] >> numpy.maximum(bits, 0)) & 1
+        ).astype(bool)
+        in_window = (micros >= starts[role_index]) & (micros <= ends[role_index])
+        return has_permission & in_window
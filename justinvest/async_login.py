@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .access_control import AccessControlEngine
+from .authentication import AuthenticatedUser, AuthenticationError, verify_password
+from .hashing import HashingPool, HashingPoolSaturated
+from .login import LoginError, LoginResult, _build_login_result
+from .models import RoleDefinition, UserRecord, build_user_lookup
+from .password_file import PasswordStore, get_record
+
+# semaphores are bound to the loop that first waits on them, so the
+# default caps are kept per loop and per pool
+_default_limits: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, Dict[Optional[HashingPool], asyncio.Semaphore]
+] = weakref.WeakKeyDictionary()
+
+
+def _default_limit(pool: Optional[HashingPool]) -> asyncio.Semaphore:
+    """returns the shared cap for logins on this loop using ``pool``,
+    sized to its workers, or to the CPU count without a pool."""
+
+    limits = _default_limits.setdefault(asyncio.get_running_loop(), {})
+    limit = limits.get(pool)
+    if limit is None:
+        workers = pool.workers if pool is not None else os.cpu_count() or 1
+        limit = limits[pool] = asyncio.Semaphore(workers)
+    return limit
+
+
+async def _verify_off_loop(
+    password: str,
+    stored_hash: str,
+    *,
+    pool: Optional[HashingPool],
+    limit: Optional[asyncio.Semaphore],
+) -> bool:
+    """runs the password check on a worker thread.
+
+    the semaphore is taken before anything is queued, so a task cancelled
+    while it waits never reaches the hashing step; cancelling after that
+    still drops the job if a worker has not picked it up yet.
+    """
+
+    async with limit if limit is not None else contextlib.nullcontext():
+        if pool is not None:
+            future = asyncio.wrap_future(pool.submit(verify_password, password, stored_hash))
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, verify_password, password, stored_hash)
+        return await future
+
+
+async def async_perform_login(
+    username: str,
+    password: str,
+    engine: AccessControlEngine,
+    *,
+    roles: Iterable[RoleDefinition],
+    passwd_path: Path | None = None,
+    as_of: datetime | None = None,
+    store: PasswordStore | None = None,
+    pool: HashingPool | None = None,
+    limit: asyncio.Semaphore | None = None,
+) -> LoginResult:
+    """perform_login for asyncio callers; file access and hashing happen
+    off the event loop.
+
+    ``limit`` caps concurrent verifications. by default logins on the same
+    loop and pool share a cap of one verification per pool worker, so a
+    burst waits on the loop instead of piling work onto the executor.
+    """
+
+    username = username.strip()
+    if not username:
+        raise LoginError("Username is required.")
+
+    loop = asyncio.get_running_loop()
+    record = await loop.run_in_executor(
+        None, lambda: get_record(username, path=passwd_path, store=store)
+    )
+    if record is None:
+        raise LoginError("Invalid username or password.")
+    if limit is None:
+        limit = _default_limit(pool)
+    try:
+        verified = await _verify_off_loop(
+            password, record.password_hash, pool=pool, limit=limit
+        )
+    except HashingPoolSaturated as exc:
+        raise LoginError("Login service is busy; please try again shortly.") from exc
+    if not verified:
+        raise LoginError("Invalid username or password.")
+    return _build_login_result(username, record.role, engine, roles, as_of)
+
+
+class AsyncCredentialStore:
+    """CredentialStore for asyncio callers.
+
+    at most ``max_concurrent`` verifications run at once; the rest wait
+    on the event loop without holding a worker. by default the store
+    shares async_perform_login's cap of one verification per pool worker.
+    """
+
+    def __init__(
+        self,
+        users: list[UserRecord],
+        *,
+        max_concurrent: Optional[int] = None,
+        pool: Optional[HashingPool] = None,
+    ) -> None:
+        self._users = build_user_lookup(users)
+        self._pool = pool
+        self._max_concurrent = max_concurrent
+        self._limit: Optional[asyncio.Semaphore] = None
+
+    async def authenticate(self, username: str, password: str) -> Optional[AuthenticatedUser]:
+        record = self._users.get(username)
+        if record is None:
+            return None
+        if self._max_concurrent is None:
+            limit = _default_limit(self._pool)
+        else:
+            if self._limit is None:
+                self._limit = asyncio.Semaphore(self._max_concurrent)
+            limit = self._limit
+        try:
+            verified = await _verify_off_loop(
+                password, record.password_hash, pool=self._pool, limit=limit
+            )
+        except HashingPoolSaturated as exc:
+            raise AuthenticationError("Login service is busy; please try again shortly.") from exc
+        if not verified:
+            return None
+        return AuthenticatedUser(
+            username=record.username, full_name=record.full_name, role=record.role
+        )
@@ -3,37 +3,99 @@ from __future__ import annotations
 import hashlib
 import hmac
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional, Union
 
-from .models import UserRecord, build_user_lookup
+from .models import CompactUser, UserRecord, build_user_lookup
+
+if TYPE_CHECKING:
+    from .hashing import HashingPool
+    from .rate_limit import LoginRateLimiter
+    from .single_flight import SingleFlightVerifier
+    from .sqlite_repository import SqliteRepository
 
 
 class AuthenticationError(Exception):
     """raised when authentication fails."""
 
 
-def _parse_hash(hash_string: str) -> tuple[str, int, bytes, bytes]:
+LAYERED_ALGORITHM = "pbkdf2_sha256+scrypt"
+
+
+def _parse_hash(hash_string: str) -> tuple[str, tuple[int, ...], bytes, bytes]:
+    """splits a stored hash into its algorithm, cost, salt and digest.
+
+    the cost field is the PBKDF2 iteration count, ``n:r:p`` for scrypt, or
+    ``iterations:n:r:p`` for a PBKDF2 digest wrapped in scrypt.
+    """
+
     try:
-        algorithm, iteration_str, salt_hex, digest_hex = hash_string.split("$")
-        return algorithm, int(iteration_str), bytes.fromhex(salt_hex), bytes.fromhex(
-            digest_hex
-        )
+        algorithm, cost_str, salt_hex, digest_hex = hash_string.split("$")
+        cost = tuple(int(part) for part in cost_str.split(":"))
+        return algorithm, cost, bytes.fromhex(salt_hex), bytes.fromhex(digest_hex)
     except ValueError as exc:  # pragma: no cover - defensive
         raise AuthenticationError("Corrupt password hash format.") from exc
 
 
+def _scrypt_maxmem(n: int, r: int, p: int) -> int:
+    # scrypt needs 128 * r * (n + p) bytes; OpenSSL's 32 MiB default is too
+    # tight for n = 2**15, r = 8
+    return 128 * r * (n + p + 2) + (1 << 20)
+
+
+def _scrypt(secret: bytes, salt: bytes, cost: tuple[int, ...], length: int) -> bytes:
+    n, r, p = cost
+    return hashlib.scrypt(
+        secret, salt=salt, n=n, r=r, p=p, maxmem=_scrypt_maxmem(n, r, p), dklen=length
+    )
+
+
+def _layer_digest(inner_digest: bytes, salt: bytes, outer_cost: tuple[int, ...]) -> bytes:
+    """wraps a stored PBKDF2 digest in scrypt, which needs no password."""
+
+    return _scrypt(inner_digest, salt, outer_cost, len(inner_digest))
+
+
+def _derive_digest(
+    algorithm: str, cost: tuple[int, ...], password: str, salt: bytes, length: int
+) -> bytes:
+    """runs the key derivation named in a stored hash."""
+
+    if algorithm == "pbkdf2_sha256" and len(cost) == 1:
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, cost[0])
+    if algorithm == "scrypt" and len(cost) == 3:
+        return _scrypt(password.encode("utf-8"), salt, cost, length)
+    if algorithm == LAYERED_ALGORITHM and len(cost) == 4:
+        inner = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, cost[0])
+        return _layer_digest(inner, salt, cost[1:])
+    raise AuthenticationError(f"Unsupported hash algorithm '{algorithm}'.")
+
+
 def verify_password(password: str, stored_hash: str) -> bool:
     """checks if the password matches what we have on file."""
 
-    algorithm, iterations, salt, stored_digest = _parse_hash(stored_hash)
-    if algorithm != "pbkdf2_sha256":
-        raise AuthenticationError(f"Unsupported hash algorithm '{algorithm}'.")
-    candidate_digest = hashlib.pbkdf2_hmac(
-        "sha256", password.encode("utf-8"), salt, iterations
-    )
+    algorithm, cost, salt, stored_digest = _parse_hash(stored_hash)
+    candidate_digest = _derive_digest(algorithm, cost, password, salt, len(stored_digest))
     return hmac.compare_digest(candidate_digest, stored_digest)
 
 
+def compact_user(
+    username: str, role: str, password_hash: str, full_name: Optional[str] = None
+) -> CompactUser:
+    """decodes a stored hash into a compact record."""
+
+    algorithm, cost, salt, digest = _parse_hash(password_hash)
+    return CompactUser(username, full_name, role, algorithm, cost, salt, digest)
+
+
+def verify_compact(password: str, user: CompactUser) -> bool:
+    """checks a password against a compact record without parsing its hash."""
+
+    candidate_digest = _derive_digest(
+        user.algorithm, user.cost, password, user.salt, len(user.digest)
+    )
+    return hmac.compare_digest(candidate_digest, user.digest)
+
+
 @dataclass
 class AuthenticatedUser:
     username: str
@@ -42,18 +104,94 @@ class AuthenticatedUser:
 
 
 class CredentialStore:
-    """keeps track of users and checks their passwords."""
-
-    def __init__(self, users: list[UserRecord]) -> None:
-        self._users: Dict[str, UserRecord] = build_user_lookup(users)
+    """keeps track of users and checks their passwords.
+
+    with ``compact`` the users are held as ``CompactUser`` records, which
+    take less memory and verify without re-parsing the stored hash.
+    """
+
+    def __init__(
+        self,
+        users: list[UserRecord],
+        *,
+        pool: Optional["HashingPool"] = None,
+        single_flight: Optional["SingleFlightVerifier"] = None,
+        limiter: Optional["LoginRateLimiter"] = None,
+        compact: bool = False,
+    ) -> None:
+        self._users: Dict[str, Union[UserRecord, CompactUser]]
+        if compact:
+            self._users = {
+                user.username: (
+                    user
+                    if isinstance(user, CompactUser)
+                    else compact_user(user.username, user.role, user.password_hash, user.full_name)
+                )
+                for user in users
+            }
+        else:
+            self._users = build_user_lookup(users)
+        self._pool = pool
+        self._single_flight = single_flight
+        self._limiter = limiter
+
+    @classmethod
+    def from_repository(cls, repository: "SqliteRepository", **options) -> "CredentialStore":
+        """builds a store that looks each user up in the database when they
+        log in instead of loading every user up front."""
+
+        store = cls([], **options)
+        store._users = repository.users
+        return store
+
+    @classmethod
+    def from_users(cls, users: Dict[str, CompactUser], **options) -> "CredentialStore":
+        """builds a store around an existing username lookup of compact
+        records, such as one read from a startup snapshot."""
+
+        store = cls([], **options)
+        store._users = users
+        return store
+
+    def authenticate(
+        self, username: str, password: str, *, source: Optional[str] = None
+    ) -> Optional[AuthenticatedUser]:
+        """returns the user if the password matches, otherwise None.
+
+        with a rate limiter, refused attempts raise RateLimitExceeded. a
+        full hashing pool raises AuthenticationError asking to retry.
+        """
+
+        if self._limiter is None:
+            return self._authenticate(username, password)
+        with self._limiter.attempt(username, source):
+            return self._authenticate(username, password)
+
+    def _authenticate(self, username: str, password: str) -> Optional[AuthenticatedUser]:
+        # imported here because the hashing module imports this one
+        from .hashing import HashingPoolSaturated
 
-    def authenticate(self, username: str, password: str) -> Optional[AuthenticatedUser]:
         record = self._users.get(username)
         if record is None:
             return None
-        if not verify_password(password, record.password_hash):
+        try:
+            verified = self._verify(record, password)
+        except HashingPoolSaturated as exc:
+            raise AuthenticationError("Login service is busy; please try again shortly.") from exc
+        if not verified:
             return None
         return AuthenticatedUser(
             username=record.username, full_name=record.full_name, role=record.role
         )
 
+    def _verify(self, record: Union[UserRecord, CompactUser], password: str) -> bool:
+        if self._single_flight is not None:
+            return self._single_flight.verify(record.username, password, record.password_hash)
+        if isinstance(record, CompactUser):
+            if self._pool is not None:
+                return self._pool.submit(verify_compact, password, record).result()
+            return verify_compact(password, record)
+        if self._pool is not None:
+            return self._pool.verify(password, record.password_hash)
+        return verify_password(password, record.password_hash)
+
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, TextIO
+
+from .access_control import AccessControlEngine
+from .models import SessionContext
+from .password_file import iter_records
+from .repository import load_roles
+
+DEFAULT_CHUNK_SIZE = 4096
+_DECODER = json.JSONDecoder()
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+@dataclass(frozen=True)
+class BatchDecision:
+    """the outcome of one line of a batch authorization run."""
+
+    line_number: int
+    username: Optional[str]
+    operation: Optional[str]
+    timestamp: Optional[str]
+    granted: bool
+    reason: Optional[str] = None
+
+    def to_json(self) -> str:
+        return _ENCODER.encode(
+            {
+                "line": self.line_number,
+                "username": self.username,
+                "operation": self.operation,
+                "timestamp": self.timestamp,
+                "granted": self.granted,
+                "reason": self.reason,
+            }
+        )
+
+
+def build_role_index(passwd_path: Optional[Path] = None) -> Dict[str, str]:
+    """maps each username in the password file to its role."""
+
+    index: Dict[str, str] = {}
+    for record in iter_records(passwd_path):
+        index.setdefault(record.username, record.role)
+    return index
+
+
+def authorize_stream(
+    lines: Iterable[str],
+    engine: AccessControlEngine,
+    resolve_role: Callable[[str], Optional[str]],
+) -> Iterator[BatchDecision]:
+    """turns JSONL requests into decisions, one line at a time."""
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            request = _DECODER.decode(line)
+            username = request["username"]
+            operation = request["operation"]
+            timestamp = request["timestamp"]
+            for field_name, value in (
+                ("username", username),
+                ("operation", operation),
+                ("timestamp", timestamp),
+            ):
+                if not isinstance(value, str):
+                    raise TypeError(f"'{field_name}' must be a string")
+            as_of = datetime.fromisoformat(timestamp)
+        except (ValueError, KeyError, TypeError) as exc:
+            yield BatchDecision(
+                line_number, None, None, None, False, f"Malformed request: {exc}"
+            )
+            continue
+        role_name = resolve_role(username)
+        if role_name is None:
+            yield BatchDecision(
+                line_number, username, operation, timestamp, False, f"Unknown user '{username}'."
+            )
+            continue
+        try:
+            decision = engine.is_operation_allowed(
+                role_name, operation, SessionContext(as_of=as_of)
+            )
+        except KeyError:
+            yield BatchDecision(
+                line_number,
+                username,
+                operation,
+                timestamp,
+                False,
+                f"Role '{role_name}' is not recognized.",
+            )
+            continue
+        yield BatchDecision(
+            line_number, username, operation, timestamp, decision.granted, decision.reason
+        )
+
+
+def write_decisions(
+    decisions: Iterable[BatchDecision],
+    handle: TextIO,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """writes decisions as JSONL in chunks and returns how many were written."""
+
+    buffer: list[str] = []
+    count = 0
+    for decision in decisions:
+        buffer.append(decision.to_json())
+        count += 1
+        if len(buffer) >= chunk_size:
+            handle.write("\n".join(buffer) + "\n")
+            buffer.clear()
+    if buffer:
+        handle.write("\n".join(buffer) + "\n")
+    return count
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for batch authorization."""
+
+    parser = argparse.ArgumentParser(
+        prog="python -m justinvest.batch",
+        description="Authorize a JSONL stream of {username, operation, timestamp} requests.",
+    )
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file, or - for stdout")
+    parser.add_argument("--passwd", type=Path, default=None, help="password file for user roles")
+    parser.add_argument("--roles", type=Path, default=None, help="roles.json to load")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    engine = AccessControlEngine(load_roles(args.roles))
+    role_index = build_role_index(args.passwd)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        decisions = authorize_stream(source, engine, role_index.get)
+        write_decisions(decisions, sink, chunk_size=args.chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+FILTER_SUFFIX = ".filter"
+DEFAULT_BITS_PER_KEY = 10
+DEFAULT_CHUNK_KEYS = 4_000_000
+_MAGIC = b"JIBF"
+_VERSION = 1
+# magic, version, bloom hash count, key count, bloom bit count,
+# source list size, source list mtime
+_HEADER = struct.Struct("<4sHHQQQQ")
+_READ_KEYS = 65536
+
+
+def filter_path_for(list_path: Path) -> Path:
+    """works out where the compiled filter for a password list lives."""
+
+    return list_path.with_name(list_path.name + FILTER_SUFFIX)
+
+
+def normalize_entry(password: str) -> str:
+    """the form in which blacklist entries and candidate passwords are
+    compared, shared by the compiled filter and the plain-list loaders."""
+
+    return password.strip().lower()
+
+
+def _key(password: str) -> int:
+    digest = hashlib.blake2b(password.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _bloom_positions(key: int, hash_count: int, bit_count: int) -> Iterator[int]:
+    """double hashing: the stride is a remix of the key, so the positions
+    can be recomputed from the sorted keys alone."""
+
+    stride = (key * 0x9E3779B97F4A7C15 >> 64 ^ key >> 29) | 1
+    for probe in range(hash_count):
+        yield (key + probe * stride) % bit_count
+
+
+def _hash_count(bits_per_key: int) -> int:
+    # k = m/n * ln 2 minimises the false positive rate
+    return max(1, round(bits_per_key * 0.693))
+
+
+def _iter_list(list_path: Path) -> Iterator[str]:
+    with list_path.open("r", encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            entry = normalize_entry(line)
+            if entry:
+                yield entry
+
+
+def _iter_chunk(path: Path) -> Iterator[int]:
+    with path.open("rb") as handle:
+        while True:
+            block = array("Q")
+            try:
+                block.fromfile(handle, _READ_KEYS)
+            except EOFError:
+                pass
+            if not block:
+                return
+            yield from block
+
+
+def build_filter(
+    list_path: Path,
+    output_path: Optional[Path] = None,
+    *,
+    bits_per_key: int = DEFAULT_BITS_PER_KEY,
+    chunk_keys: int = DEFAULT_CHUNK_KEYS,
+) -> int:
+    """compiles a text list of passwords, one per line, into a filter file
+    and returns how many distinct passwords it holds.
+
+    keys are sorted in chunks of ``chunk_keys`` that are spilled to disk
+    and merged, so the list can be far larger than memory; only the bloom
+    bit array is held whole.
+    """
+
+    stat = list_path.stat()
+    output_path = output_path or filter_path_for(list_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as scratch:
+        chunk_paths: List[Path] = []
+        total = 0
+        chunk = array("Q")
+        for entry in _iter_list(list_path):
+            chunk.append(_key(entry))
+            total += 1
+            if len(chunk) >= chunk_keys:
+                chunk_paths.append(_spill(chunk, Path(scratch) / f"chunk{len(chunk_paths)}"))
+                chunk = array("Q")
+        if chunk:
+            chunk_paths.append(_spill(chunk, Path(scratch) / f"chunk{len(chunk_paths)}"))
+
+        bit_count = max(64, total * bits_per_key)
+        hash_count = _hash_count(bits_per_key)
+        bloom = bytearray((bit_count + 63) // 64 * 8)
+        keys_path = Path(scratch) / "keys"
+        distinct = 0
+        with keys_path.open("wb") as keys_file:
+            buffer = array("Q")
+            previous = None
+            for key in heapq.merge(*(_iter_chunk(path) for path in chunk_paths)):
+                if key == previous:
+                    continue
+                previous = key
+                distinct += 1
+                for position in _bloom_positions(key, hash_count, bit_count):
+                    bloom[position >> 3] |= 1 << (position & 7)
+                buffer.append(key)
+                if len(buffer) >= _READ_KEYS:
+                    buffer.tofile(keys_file)
+                    buffer = array("Q")
+            buffer.tofile(keys_file)
+
+        temp_path = output_path.with_name(output_path.name + ".tmp")
+        with temp_path.open("wb") as handle, keys_path.open("rb") as keys_file:
+            handle.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    _VERSION,
+                    hash_count,
+                    distinct,
+                    bit_count,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                )
+            )
+            handle.write(bloom)
+            while True:
+                block = keys_file.read(1 << 20)
+                if not block:
+                    break
+                handle.write(block)
+        os.replace(temp_path, output_path)
+    return distinct
+
+
+def _spill(chunk: array, path: Path) -> Path:
+    """writes one sorted run of keys to the scratch directory."""
+
+    with path.open("wb") as handle:
+        array("Q", sorted(chunk)).tofile(handle)
+    return path
+
+
+class BreachFilter:
+    """checks passwords against a compiled breach list without loading it.
+
+    the file holds a bloom filter followed by the sorted 64-bit hashes of
+    every entry, and both are read through an mmap. most passwords that
+    are not listed fail the bloom check after a few bit probes; the rest
+    are confirmed with a binary search over the sorted hashes, so only the
+    pages actually touched become resident.
+    """
+
+    def __init__(self, path: Path, handle, mapped: mmap.mmap) -> None:
+        self.path = path
+        self._handle = handle
+        self._map = mapped
+        (
+            _,
+            _,
+            self._hash_count,
+            self._key_count,
+            self._bit_count,
+            self.source_size,
+            self.source_mtime_ns,
+        ) = _HEADER.unpack_from(mapped)
+        keys_offset = _HEADER.size + (self._bit_count + 63) // 64 * 8
+        self._bloom = memoryview(mapped)[_HEADER.size : keys_offset]
+        # the key table is 8-byte aligned native uint64s, as array("Q")
+        # wrote them, so it can be viewed in place and searched by bisect
+        self._keys = memoryview(mapped)[keys_offset:].cast("Q")
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["BreachFilter"]:
+        """opens a compiled filter, or returns None if it is missing or
+        not a filter file."""
+
+        try:
+            handle = path.open("rb")
+        except FileNotFoundError:
+            return None
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            handle.close()
+            return None
+        if len(mapped) >= _HEADER.size:
+            magic, version = _HEADER.unpack_from(mapped)[:2]
+            if magic == _MAGIC and version == _VERSION:
+                return cls(path, handle, mapped)
+        mapped.close()
+        handle.close()
+        return None
+
+    @classmethod
+    def open_for_list(cls, list_path: Path) -> Optional["BreachFilter"]:
+        """opens the compiled filter next to a text list if it was built
+        from the list as it is now."""
+
+        breach_filter = cls.open(filter_path_for(list_path))
+        if breach_filter is None:
+            return None
+        try:
+            stat = list_path.stat()
+        except FileNotFoundError:
+            return breach_filter
+        if (stat.st_size, stat.st_mtime_ns) == (
+            breach_filter.source_size,
+            breach_filter.source_mtime_ns,
+        ):
+            return breach_filter
+        breach_filter.close()
+        return None
+
+    def close(self) -> None:
+        self._bloom.release()
+        self._keys.release()
+        self._map.close()
+        self._handle.close()
+
+    def __enter__(self) -> "BreachFilter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._key_count
+
+    def __contains__(self, password: object) -> bool:
+        if not isinstance(password, str):
+            return False
+        key = _key(normalize_entry(password))
+        bloom = self._bloom
+        for position in _bloom_positions(key, self._hash_count, self._bit_count):
+            if not bloom[position >> 3] >> (position & 7) & 1:
+                return False
+        position = bisect.bisect_left(self._keys, key)
+        return position < self._key_count and self._keys[position] == key
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for building breach filters."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.breach_filter")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a password list into a filter file")
+    build.add_argument("list_path", type=Path)
+    build.add_argument("-o", "--output", type=Path, default=None)
+    build.add_argument("--bits-per-key", type=int, default=DEFAULT_BITS_PER_KEY)
+    args = parser.parse_args(argv)
+
+    if not args.list_path.exists():
+        print(f"Password list {args.list_path} does not exist.")
+        return 1
+    output = args.output or filter_path_for(args.list_path)
+    count = build_filter(args.list_path, output, bits_per_key=args.bits_per_key)
+    print(f"Compiled {count} passwords from {args.list_path} into {output}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
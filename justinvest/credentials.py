@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Optional
+
+from .hash_params import HashParameters, load_hash_parameters
+
+
+def sanitize_field(value: str, field_name: str) -> str:
+    """trims a username or role and checks it fits on one passwd.txt line."""
+
+    value = value.strip()
+    if not value:
+        raise ValueError(f"{field_name} is required.")
+    if "|" in value or "\n" in value:
+        raise ValueError(f"{field_name} cannot contain '|' or newlines.")
+    return value
+
+
+def hash_password(
+    password: str,
+    *,
+    iterations: Optional[int] = None,
+    salt_bytes: Optional[int] = None,
+    params: Optional[HashParameters] = None,
+) -> str:
+    """hashes a password with the configured parameters unless PBKDF2
+    ``iterations`` or ``params`` are given explicitly."""
+
+    params = params or load_hash_parameters()
+    if iterations is not None:
+        params = replace(params, scheme="pbkdf2_sha256", iterations=iterations)
+    if salt_bytes is not None:
+        params = replace(params, salt_bytes=salt_bytes)
+    return params.hash(password)
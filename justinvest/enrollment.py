@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
+import argparse
+import csv
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
 
-from .models import RoleDefinition
-from .password_file import add_record
+from .credentials import hash_password, sanitize_field
+from .enrollment_log import EnrollmentLog
+from .file_lock import file_lock
+from .hash_params import load_hash_parameters
+from .hashing import HashingPool, HashingPoolSaturated, get_default_pool
+from .models import RoleDefinition, UserRecord, build_role_lookup
+from .password_file import PasswordRecord
 from .password_policy import PasswordPolicy
+from .repository import load_roles
+from .user_journal import UserJournal
+
+if TYPE_CHECKING:
+    from .sqlite_repository import SqliteRepository
 
 DEFAULT_USERS_PATH = Path(__file__).resolve().parents[1] / "data" / "users.json"
 DEFAULT_PASSWD_PATH = Path(__file__).resolve().parents[1] / "passwd.txt"
@@ -26,6 +37,23 @@ class EnrollmentResult:
     users_file: Path
 
 
+@dataclass(frozen=True)
+class EnrollmentFailure:
+    """a row from a bulk enrollment that was rejected."""
+
+    row: int
+    username: str
+    reason: str
+
+
+@dataclass
+class BulkEnrollmentReport:
+    """what happened to each row of a bulk enrollment."""
+
+    enrolled: List[EnrollmentResult] = field(default_factory=list)
+    failures: List[EnrollmentFailure] = field(default_factory=list)
+
+
 def get_self_signup_roles(roles: Iterable[RoleDefinition]) -> List[RoleDefinition]:
     """finds which roles let people sign themselves up."""
 
@@ -40,8 +68,21 @@ def enroll_user(
     policy: PasswordPolicy | None = None,
     passwd_path: Path | None = None,
     users_path: Path | None = None,
+    journal: UserJournal | None = None,
+    pool: HashingPool | None = None,
+    repository: SqliteRepository | None = None,
+    log: EnrollmentLog | None = None,
 ) -> EnrollmentResult:
-    """adds a new user to the system."""
+    """adds a new user to the system.
+
+    the user is written once to the enrollment log, and passwd.txt and
+    users.json catch up when it is applied. without a ``log`` the one
+    next to users.json is used and applied before returning, so both
+    files hold the user either way. long-running callers can pass a
+    shared ``journal`` so the users.json duplicate check is served from
+    its in-memory index. with a ``repository`` the user is inserted into
+    the database in one transaction instead.
+    """
 
     policy = policy or PasswordPolicy()
     check = policy.validate(username, password)
@@ -50,38 +91,238 @@ def enroll_user(
     if not role.allow_self_signup:
         raise EnrollmentError(f"Role '{role.label}' cannot be selected during signup.")
 
-    passwd_file = passwd_path or DEFAULT_PASSWD_PATH
-    users_file = users_path or DEFAULT_USERS_PATH
+    if repository is not None:
+        return _enroll_into_repository(username, role, password, repository, pool)
+    if log is not None:
+        return _enroll_into_log(username, role, password, log, pool)
+    log = _default_log(passwd_path, users_path, journal)
+    result = _enroll_into_log(username, role, password, log, pool)
+    log.apply()
+    return result
+
+
+def _default_log(
+    passwd_path: Path | None, users_path: Path | None, journal: UserJournal | None = None
+) -> EnrollmentLog:
+    """the log used when a caller passes none, kept next to users.json so
+    every process writing the same files shares it."""
+
+    return EnrollmentLog(
+        passwd_path=passwd_path or DEFAULT_PASSWD_PATH,
+        users_path=journal.users_path if journal is not None else users_path or DEFAULT_USERS_PATH,
+        journal=journal,
+    )
+
+
+def _enroll_into_repository(
+    username: str,
+    role: RoleDefinition,
+    password: str,
+    repository: SqliteRepository,
+    pool: HashingPool | None,
+) -> EnrollmentResult:
+    from .sqlite_repository import RepositoryError
+
     try:
-        record = add_record(username, role.name, password, path=passwd_file)
+        username = sanitize_field(username, "username")
+        if username in repository:
+            raise ValueError(f"Username '{username}' already exists.")
+        if pool is not None:
+            password_hash = pool.submit(hash_password, password).result()
+        else:
+            password_hash = hash_password(password)
+        # the insert itself is the authoritative duplicate check, since
+        # another writer may have taken the name while we were hashing
+        repository.add_user(
+            UserRecord(
+                username=username,
+                full_name=username,
+                role=role.name,
+                password_hash=password_hash,
+            )
+        )
     except ValueError as exc:
         raise EnrollmentError(str(exc)) from exc
-    _append_user_json(username, role.name, record.password_hash, users_file)
+    except RepositoryError as exc:
+        raise EnrollmentError(f"Username '{username}' already exists.") from exc
+    except HashingPoolSaturated as exc:
+        raise EnrollmentError("Signup is busy; please try again shortly.") from exc
     return EnrollmentResult(
         username=username,
         role=role.name,
-        password_hash=record.password_hash,
-        password_file=passwd_file,
-        users_file=users_file,
+        password_hash=password_hash,
+        password_file=repository.path,
+        users_file=repository.path,
     )
 
 
-def _append_user_json(
-    username: str, role: str, password_hash: str, path: Path | None = None
-) -> None:
-    file_path = path or DEFAULT_USERS_PATH
-    payload = {"users": []}
-    if file_path.exists():
-        payload = json.loads(file_path.read_text(encoding="utf-8"))
-    if any(entry["username"] == username for entry in payload.get("users", [])):
-        raise EnrollmentError(f"Username '{username}' already exists in users.json.")
-    payload.setdefault("users", []).append(
-        {
-            "username": username,
-            "full_name": username,
-            "role": role,
-            "password_hash": password_hash,
-        }
+def _enroll_into_log(
+    username: str,
+    role: RoleDefinition,
+    password: str,
+    log: EnrollmentLog,
+    pool: HashingPool | None,
+) -> EnrollmentResult:
+    try:
+        username = sanitize_field(username, "username")
+        if username in log:
+            raise ValueError(f"Username '{username}' already exists.")
+        if pool is not None:
+            password_hash = pool.submit(hash_password, password).result()
+        else:
+            password_hash = hash_password(password)
+        # the log checks again under its lock before writing
+        log.append(
+            {
+                "username": username,
+                "full_name": username,
+                "role": role.name,
+                "password_hash": password_hash,
+            }
+        )
+    except ValueError as exc:
+        raise EnrollmentError(str(exc)) from exc
+    except HashingPoolSaturated as exc:
+        raise EnrollmentError("Signup is busy; please try again shortly.") from exc
+    return EnrollmentResult(
+        username=username,
+        role=role.name,
+        password_hash=password_hash,
+        password_file=log.passwd_path,
+        users_file=log.users_path,
     )
-    file_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
 
+
+def enroll_users(
+    rows: Iterable[Tuple[str, str, str]],
+    roles: Iterable[RoleDefinition],
+    *,
+    policy: PasswordPolicy | None = None,
+    passwd_path: Path | None = None,
+    users_path: Path | None = None,
+    pool: HashingPool | None = None,
+    iterations: Optional[int] = None,
+    log: EnrollmentLog | None = None,
+) -> BulkEnrollmentReport:
+    """adds many (username, role name, password) rows at once.
+
+    every row is validated and checked for duplicates up front, with the
+    passwords checked in one ``validate_many`` batch. the accepted
+    passwords are hashed in parallel on the shared hashing pool (or
+    ``pool``), and the results are committed with a single write to the
+    enrollment log. without a ``log`` the one next to users.json is
+    used and applied before returning, as in ``enroll_user``.
+    """
+
+    policy = policy or PasswordPolicy()
+    role_lookup = build_role_lookup(roles)
+    apply = log is None
+    if log is None:
+        log = _default_log(passwd_path, users_path)
+    report = BulkEnrollmentReport()
+
+    rows = list(rows)
+    checks = policy.validate_many((username.strip(), password) for username, _, password in rows)
+    accepted: List[Tuple[int, str, RoleDefinition, str]] = []
+    seen: set[str] = set()
+    for row_number, (raw_username, role_name, password) in enumerate(rows, start=1):
+        reason = None
+        username = raw_username.strip()
+        role = role_lookup.get(role_name.strip())
+        try:
+            username = sanitize_field(raw_username, "username")
+        except ValueError as exc:
+            reason = str(exc)
+        if reason is None and role is None:
+            reason = f"Role '{role_name}' is not recognized."
+        if reason is None and not role.allow_self_signup:
+            reason = f"Role '{role.label}' cannot be selected during signup."
+        if reason is None and not checks.is_valid(row_number - 1):
+            reason = "; ".join(checks.messages(row_number - 1))
+        if reason is None and (username in seen or username in log):
+            reason = f"Username '{username}' already exists."
+        if reason is not None:
+            report.failures.append(EnrollmentFailure(row_number, username, reason))
+            continue
+        seen.add(username)
+        accepted.append((row_number, username, role, password))
+
+    if not accepted:
+        if apply:
+            log.apply()
+        return report
+    pool = pool or get_default_pool()
+    params = load_hash_parameters()
+    hashes = pool.map(
+        lambda item: hash_password(item[3], iterations=iterations, params=params), accepted
+    )
+    records = []
+    with file_lock(log.path):
+        # another writer may have taken a name while we were hashing
+        for (row_number, username, role, _), password_hash in zip(accepted, hashes):
+            if username in log:
+                reason = f"Username '{username}' already exists."
+                report.failures.append(EnrollmentFailure(row_number, username, reason))
+                continue
+            records.append(
+                PasswordRecord(username=username, role=role.name, password_hash=password_hash)
+            )
+        log.extend(_user_entry(record) for record in records)
+    if apply:
+        log.apply()
+    report.enrolled.extend(
+        EnrollmentResult(
+            username=record.username,
+            role=record.role,
+            password_hash=record.password_hash,
+            password_file=log.passwd_path,
+            users_file=log.users_path,
+        )
+        for record in records
+    )
+    return report
+
+
+def _user_entry(record: PasswordRecord) -> dict:
+    return {
+        "username": record.username,
+        "full_name": record.username,
+        "role": record.role,
+        "password_hash": record.password_hash,
+    }
+
+
+def _read_csv_rows(path: Path) -> Iterable[Tuple[str, str, str]]:
+    with path.open(newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            yield row.get("username") or "", row.get("role") or "", row.get("password") or ""
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for bulk enrollment."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.enrollment")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser(
+        "import", help="enroll users from a CSV with username,role,password columns"
+    )
+    importer.add_argument("csv_path", type=Path)
+    importer.add_argument("--passwd", type=Path, default=None)
+    importer.add_argument("--users", type=Path, default=None)
+    importer.add_argument("--roles", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    report = enroll_users(
+        _read_csv_rows(args.csv_path),
+        load_roles(args.roles),
+        passwd_path=args.passwd,
+        users_path=args.users,
+    )
+    print(f"Enrolled {len(report.enrolled)} users.")
+    for failure in report.failures:
+        print(f"Row {failure.row} ({failure.username or '?'}): {failure.reason}")
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
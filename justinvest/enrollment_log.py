@@ -0,0 +1,509 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from itertools import groupby, islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .file_lock import file_lock
+from .password_file import (
+    DEFAULT_PASSWD_PATH,
+    PasswordRecord,
+    PasswordStore,
+    append_records,
+    iter_records,
+)
+from .user_journal import (
+    DEFAULT_USERS_PATH,
+    UserJournal,
+    iter_journal,
+    iter_json_array,
+    journal_path_for,
+)
+
+DEFAULT_LOG_PATH = Path(__file__).resolve().parents[1] / "data" / "enrollments.log"
+DEFAULT_INTERVAL = 0.05
+DEFAULT_COMMIT_WINDOW = 0.002
+DEFAULT_SORT_CHUNK = 100_000
+
+# (username, role, password_hash, sequence) as sorted by the checker
+Row = Tuple[str, str, str, int]
+
+
+def log_path_for(users_path: Path) -> Path:
+    """works out where the enrollment log for a users file lives."""
+
+    return users_path.with_name(DEFAULT_LOG_PATH.name)
+
+
+class EnrollmentLogError(Exception):
+    """raised when the enrollment log cannot be written or applied."""
+
+
+class EnrollmentLog:
+    """the one place enrollments are written.
+
+    each enrollment is a single fsynced JSON line in ``enrollments.log``.
+    passwd.txt and users.json are views derived from it: ``apply`` copies
+    entries that are not in them yet into both files and then drops the
+    log, so a crash between the two writes is repaired by applying again.
+    until then the pending entries still count as taken usernames.
+
+    writes and applies hold ``file_lock`` on the log, so several processes
+    can share it. single appends are group committed: the first writer
+    waits ``commit_window`` seconds, plus however long the lock is busy,
+    and then writes everything queued by then with one write and one
+    fsync.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        *,
+        passwd_path: Optional[Path] = None,
+        users_path: Optional[Path] = None,
+        journal: Optional[UserJournal] = None,
+        commit_window: float = DEFAULT_COMMIT_WINDOW,
+    ) -> None:
+        if users_path is None and journal is not None:
+            users_path = journal.users_path
+        self.users_path = users_path or DEFAULT_USERS_PATH
+        self.path = path or log_path_for(self.users_path)
+        self.passwd_path = passwd_path or DEFAULT_PASSWD_PATH
+        self.commit_window = commit_window
+        self.commits = 0
+        self._store = PasswordStore(self.passwd_path)
+        self._journal = journal or UserJournal(self.users_path)
+        self._lock = threading.RLock()
+        self._appended = threading.Event()
+        self._queue: List[Tuple[dict, Future]] = []
+        self._queue_lock = threading.Lock()
+        self._leading = False
+        self._pending: Dict[str, dict] = {}
+        self._offset = 0
+        self._header: Optional[bytes] = None
+
+    def refresh(self) -> None:
+        """picks up entries appended to the log since the last look.
+
+        every log starts with a header line holding a random token. the
+        log is deleted once applied and a new one may reuse its inode, so
+        the header is what tells a fresh log from a grown one.
+        """
+
+        with self._lock:
+            try:
+                handle = self.path.open("rb")
+            except FileNotFoundError:
+                self._pending, self._offset, self._header = {}, 0, None
+                return
+            with handle:
+                header = handle.readline()
+                if not header.endswith(b"\n"):
+                    # empty, or the writer died inside the header
+                    self._pending, self._offset, self._header = {}, 0, None
+                    return
+                if header == self._header and os.fstat(handle.fileno()).st_size < self._offset:
+                    self._header = None
+                if header != self._header:
+                    try:
+                        valid = "log" in json.loads(header)
+                    except ValueError:
+                        valid = False
+                    if not valid:
+                        raise EnrollmentLogError(f"{self.path} is not an enrollment log.")
+                    self._pending, self._offset, self._header = {}, len(header), header
+                handle.seek(self._offset)
+                for raw_line in handle:
+                    # a torn last line is left for the next look
+                    if not raw_line.endswith(b"\n"):
+                        break
+                    self._offset += len(raw_line)
+                    if not raw_line.strip():
+                        continue
+                    try:
+                        entry = json.loads(raw_line)
+                    except ValueError as exc:
+                        raise EnrollmentLogError(
+                            f"{self.path} has a corrupt entry before byte {self._offset}."
+                        ) from exc
+                    self._pending.setdefault(entry["username"], entry)
+
+    @property
+    def pending_entries(self) -> int:
+        """number of logged enrollments not yet applied to the files."""
+
+        self.refresh()
+        return len(self._pending)
+
+    def __contains__(self, username: object) -> bool:
+        with self._lock:
+            self.refresh()
+            return (
+                username in self._pending or username in self._store or username in self._journal
+            )
+
+    def get(self, username: str) -> Optional[PasswordRecord]:
+        """finds a user's credentials, including ones not yet applied."""
+
+        with self._lock:
+            self.refresh()
+            entry = self._pending.get(username)
+            if entry is None:
+                return self._store.get(username)
+            return PasswordRecord(entry["username"], entry["role"], entry["password_hash"])
+
+    def append(self, entry: dict) -> None:
+        """logs one enrollment, sharing the write and fsync with any others
+        that arrive at about the same time.
+
+        raises ValueError if the username is already taken.
+        """
+
+        future: Future = Future()
+        with self._queue_lock:
+            self._queue.append((entry, future))
+            leading = not self._leading
+            self._leading = True
+        if leading:
+            group: List[Tuple[dict, Future]] = []
+            drained = False
+            try:
+                if self.commit_window:
+                    time.sleep(self.commit_window)
+                with file_lock(self.path):
+                    # appends keep joining the group while the lock is busy
+                    with self._queue_lock:
+                        group, self._queue = self._queue, []
+                        self._leading = False
+                        drained = True
+                    self._commit_group(group)
+            except BaseException as exc:
+                # nobody else will pick up a queue the leader failed to
+                # drain, so hand the failure to every waiting append and
+                # let the next one lead afresh
+                if not drained:
+                    with self._queue_lock:
+                        group, self._queue = self._queue, []
+                        self._leading = False
+                failure = exc
+                if not isinstance(exc, Exception):
+                    failure = EnrollmentLogError("The enrollment log commit was interrupted.")
+                for _, waiting in group:
+                    if not waiting.done():
+                        waiting.set_exception(exc if waiting is future else failure)
+                raise
+        future.result()
+
+    def _commit_group(self, group: List[Tuple[dict, Future]]) -> None:
+        accepted: List[Tuple[dict, Future]] = []
+        try:
+            seen: set[str] = set()
+            for entry, future in group:
+                username = entry["username"]
+                if username in seen or username in self:
+                    future.set_exception(ValueError(f"Username '{username}' already exists."))
+                else:
+                    seen.add(username)
+                    accepted.append((entry, future))
+            self._write([entry for entry, _ in accepted])
+        except BaseException as exc:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for _, future in accepted:
+            future.set_result(None)
+
+    def extend(self, entries: Iterable[dict]) -> None:
+        """logs several enrollments with one write and one fsync.
+
+        raises ValueError, and writes nothing, if any username is already
+        taken.
+        """
+
+        entries = list(entries)
+        if not entries:
+            return
+        with file_lock(self.path):
+            seen: set[str] = set()
+            for entry in entries:
+                username = entry["username"]
+                if username in seen or username in self:
+                    raise ValueError(f"Username '{username}' already exists.")
+                seen.add(username)
+            self._write(entries)
+
+    def _write(self, entries: List[dict]) -> None:
+        if not entries:
+            return
+        payload = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self.refresh()
+            with self.path.open("ab") as handle:
+                if self._header is None:
+                    handle.truncate(0)
+                    header = json.dumps({"log": secrets.token_hex(8)}) + "\n"
+                    payload = header + payload
+                elif handle.tell() > self._offset:
+                    # a writer died mid-line; its entry was never acknowledged
+                    handle.truncate(self._offset)
+                handle.write(payload.encode("utf-8"))
+                handle.flush()
+                os.fsync(handle.fileno())
+            self.commits += 1
+            self.refresh()
+        self._appended.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """blocks until something is appended or ``timeout`` passes."""
+
+        appended = self._appended.wait(timeout)
+        self._appended.clear()
+        return appended
+
+    def apply(self) -> int:
+        """writes pending entries into passwd.txt and users.json and
+        returns how many were applied."""
+
+        with file_lock(self.path), self._lock:
+            self.refresh()
+            entries = list(self._pending.values())
+            if not entries:
+                return 0
+            append_records(
+                [
+                    PasswordRecord(entry["username"], entry["role"], entry["password_hash"])
+                    for entry in entries
+                    if entry["username"] not in self._store
+                ],
+                store=self._store,
+            )
+            self._journal.extend(
+                entry for entry in entries if entry["username"] not in self._journal
+            )
+            # appends wait on the lock, so nothing can land behind our back
+            self.path.unlink()
+            self.refresh()
+            return len(entries)
+
+
+class EnrollmentMaterializer:
+    """background thread that keeps the derived files up to date.
+
+    it applies the log shortly after each append, or every ``interval``
+    seconds at worst. ``flush`` applies synchronously for callers that
+    need the files current, and stopping applies one last time.
+    """
+
+    def __init__(self, log: EnrollmentLog, *, interval: float = DEFAULT_INTERVAL) -> None:
+        self.log = log
+        self.interval = interval
+        self.applied = 0
+        self.last_error: Optional[BaseException] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "EnrollmentMaterializer":
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="enrollment-materializer", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self.log.wait(self.interval)
+            try:
+                self.applied += self.log.apply()
+            except (OSError, EnrollmentLogError) as exc:
+                # the entries stay in the log and are retried next time
+                self.last_error = exc
+
+    def flush(self) -> int:
+        """applies everything logged so far before returning."""
+
+        applied = self.log.apply()
+        self.applied += applied
+        return applied
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def __enter__(self) -> "EnrollmentMaterializer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+@dataclass
+class ConsistencyReport:
+    """differences between passwd.txt and users.json."""
+
+    passwd_records: int = 0
+    users_records: int = 0
+    missing_from_users: List[str] = field(default_factory=list)
+    missing_from_passwd: List[str] = field(default_factory=list)
+    mismatched: List[str] = field(default_factory=list)
+
+    @property
+    def consistent(self) -> bool:
+        return not (self.missing_from_users or self.missing_from_passwd or self.mismatched)
+
+
+def _iter_passwd_rows(path: Path) -> Iterator[Row]:
+    for sequence, record in enumerate(iter_records(path)):
+        yield record.username, record.role, record.password_hash, sequence
+
+
+def _iter_users_rows(path: Path) -> Iterator[Row]:
+    entries = iter_json_array(path, "users") if path.exists() else iter(())
+    sequence = 0
+    for source in (entries, iter_journal(journal_path_for(path))):
+        for entry in source:
+            yield entry["username"], entry["role"], entry.get("password_hash", ""), sequence
+            sequence += 1
+
+
+def _row_order(row: Row) -> Tuple[str, int]:
+    return row[0], row[3]
+
+
+def _sorted_rows(rows: Iterator[Row], scratch: Path, chunk_size: int) -> Iterator[Row]:
+    """sorts rows by username then sequence, spilling sorted runs of
+    ``chunk_size`` rows to ``scratch`` and merging them back. input that
+    fits in one run is sorted in memory."""
+
+    runs: List[Path] = []
+    while True:
+        chunk = sorted(islice(rows, chunk_size), key=_row_order)
+        if not runs and len(chunk) < chunk_size:
+            return iter(chunk)
+        if not chunk:
+            break
+        run = scratch / f"run{len(runs)}"
+        with run.open("w", encoding="utf-8") as handle:
+            handle.writelines(json.dumps(row) + "\n" for row in chunk)
+        runs.append(run)
+
+    def read(run: Path) -> Iterator[Row]:
+        with run.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                yield tuple(json.loads(line))
+
+    return heapq.merge(*(read(run) for run in runs), key=_row_order)
+
+
+def _current(rows: Iterator[Row], *, last_wins: bool) -> Iterator[Row]:
+    """keeps one row per username, matching how each file is read: the
+    first passwd.txt line wins, and later users.json entries win."""
+
+    for _, group in groupby(rows, key=itemgetter(0)):
+        row = next(group)
+        if last_wins:
+            for row in group:
+                pass
+        yield row
+
+
+def check_consistency(
+    passwd_path: Optional[Path] = None,
+    users_path: Optional[Path] = None,
+    *,
+    chunk_size: int = DEFAULT_SORT_CHUNK,
+) -> ConsistencyReport:
+    """compares passwd.txt with users.json and its journal.
+
+    both sides are sorted by username with an external merge sort and then
+    walked together once, so the check is O(N log N) and holds at most
+    ``chunk_size`` rows per side in memory.
+    """
+
+    import tempfile
+
+    passwd_file = passwd_path or DEFAULT_PASSWD_PATH
+    users_file = users_path or DEFAULT_USERS_PATH
+    report = ConsistencyReport()
+    with tempfile.TemporaryDirectory() as scratch:
+        (Path(scratch) / "passwd").mkdir()
+        (Path(scratch) / "users").mkdir()
+        left = _current(
+            _sorted_rows(_iter_passwd_rows(passwd_file), Path(scratch) / "passwd", chunk_size),
+            last_wins=False,
+        )
+        right = _current(
+            _sorted_rows(_iter_users_rows(users_file), Path(scratch) / "users", chunk_size),
+            last_wins=True,
+        )
+        passwd_row = next(left, None)
+        users_row = next(right, None)
+        while passwd_row is not None or users_row is not None:
+            if users_row is None or (passwd_row is not None and passwd_row[0] < users_row[0]):
+                report.passwd_records += 1
+                report.missing_from_users.append(passwd_row[0])
+                passwd_row = next(left, None)
+            elif passwd_row is None or users_row[0] < passwd_row[0]:
+                report.users_records += 1
+                report.missing_from_passwd.append(users_row[0])
+                users_row = next(right, None)
+            else:
+                report.passwd_records += 1
+                report.users_records += 1
+                if passwd_row[1:3] != users_row[1:3]:
+                    report.mismatched.append(passwd_row[0])
+                passwd_row = next(left, None)
+                users_row = next(right, None)
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for the enrollment log."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.enrollment_log")
+    parser.add_argument("--log", type=Path, default=None)
+    parser.add_argument("--passwd", type=Path, default=None)
+    parser.add_argument("--users", type=Path, default=None)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("apply", help="write pending enrollments into passwd.txt and users.json")
+    commands.add_parser("check", help="compare passwd.txt with users.json")
+    args = parser.parse_args(argv)
+
+    if args.command == "apply":
+        log = EnrollmentLog(args.log, passwd_path=args.passwd, users_path=args.users)
+        print(f"Applied {log.apply()} logged enrollments.")
+        return 0
+
+    report = check_consistency(args.passwd, args.users)
+    print(
+        f"Compared {report.passwd_records} passwd.txt records "
+        f"with {report.users_records} users.json records."
+    )
+    for label, usernames in (
+        ("Missing from users.json", report.missing_from_users),
+        ("Missing from passwd.txt", report.missing_from_passwd),
+        ("Role or hash differs", report.mismatched),
+    ):
+        if usernames:
+            print(f"{label}: {', '.join(usernames)}")
+    return 0 if report.consistent else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on windows
+    fcntl = None
+
+LOCK_SUFFIX = ".lock"
+
+
+def lock_path_for(path: Path) -> Path:
+    """works out which lock file guards a data file."""
+
+    return path.with_name(path.name + LOCK_SUFFIX)
+
+
+@dataclass
+class _LockState:
+    mutex: threading.RLock
+    depth: int = 0
+    fd: Optional[int] = None
+
+
+_states: Dict[Path, _LockState] = {}
+_states_guard = threading.Lock()
+
+
+def _state_for(path: Path) -> _LockState:
+    key = Path(os.path.abspath(path))
+    with _states_guard:
+        state = _states.get(key)
+        if state is None:
+            state = _states[key] = _LockState(threading.RLock())
+        return state
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """holds an exclusive lock on ``path`` for the duration of the block.
+
+    threads in this process queue on a mutex and other processes on an
+    ``fcntl.flock`` of ``<path>.lock``. the lock is reentrant for the
+    thread holding it, so a locked section can call helpers that lock the
+    same file. without fcntl only threads are excluded.
+    """
+
+    state = _state_for(path)
+    with state.mutex:
+        if state.depth == 0 and fcntl is not None:
+            lock_path = lock_path_for(path)
+            lock_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+            state.fd = fd
+        state.depth += 1
+        try:
+            yield
+        finally:
+            state.depth -= 1
+            if state.depth == 0 and state.fd is not None:
+                fcntl.flock(state.fd, fcntl.LOCK_UN)
+                os.close(state.fd)
+                state.fd = None
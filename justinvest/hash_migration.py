@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import textwrap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .authentication import LAYERED_ALGORITHM, _layer_digest, _parse_hash
+from .file_lock import file_lock
+from .hashing import HashingPool
+from .password_file import DEFAULT_PASSWD_PATH, parse_record
+from .password_index import build_index, index_path_for
+from .user_journal import (
+    DEFAULT_USERS_PATH,
+    decode_journal_line,
+    iter_json_array,
+    journal_path_for,
+)
+
+CHECKPOINT_SUFFIX = ".migrate"
+OUTPUT_SUFFIX = ".migrating"
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_OUTER_COST = (2**14, 8, 1)
+
+# one unit of a file being migrated: the hash it holds, if any, and how to
+# write it back out given the (possibly upgraded) hash
+Item = Tuple[Optional[str], Callable[[Optional[str]], bytes]]
+
+
+class MigrationError(Exception):
+    """raised when a hash migration cannot continue."""
+
+
+@dataclass(frozen=True)
+class MigrationReport:
+    """what a migration run did to one file."""
+
+    path: Path
+    records: int
+    upgraded: int
+    resumed_from: int
+    finished: bool
+
+
+def layer_hash(stored_hash: str, outer_cost: Tuple[int, ...] = DEFAULT_OUTER_COST) -> str:
+    """wraps a pbkdf2_sha256 hash in scrypt without knowing the password;
+    any other hash is returned unchanged."""
+
+    algorithm, cost, salt, digest = _parse_hash(stored_hash)
+    if algorithm != "pbkdf2_sha256":
+        return stored_hash
+    layered = _layer_digest(digest, salt, outer_cost)
+    cost_text = ":".join(str(part) for part in cost + tuple(outer_cost))
+    return f"{LAYERED_ALGORITHM}${cost_text}${salt.hex()}${layered.hex()}"
+
+
+def _needs_layer(stored_hash: Optional[str]) -> bool:
+    return stored_hash is not None and stored_hash.startswith("pbkdf2_sha256$")
+
+
+def _iter_passwd_items(path: Path) -> Iterator[Item]:
+    with path.open("rb") as handle:
+        for raw_line in handle:
+            if not raw_line.strip():
+                yield None, lambda _, raw_line=raw_line: raw_line
+                continue
+            record = parse_record(raw_line.decode("utf-8"))
+            ending = raw_line[len(raw_line.rstrip(b"\r\n")) :]
+            prefix = f"{record.username}|{record.role}|".encode("utf-8")
+            yield record.password_hash, (
+                lambda new_hash, prefix=prefix, ending=ending: prefix
+                + new_hash.encode("utf-8")
+                + ending
+            )
+
+
+def _iter_journal_items(path: Path) -> Iterator[Item]:
+    with path.open("rb") as handle:
+        for raw_line in handle:
+            entry = decode_journal_line(raw_line)
+            if entry is None or "password_hash" not in entry:
+                yield None, lambda _, raw_line=raw_line: raw_line
+                continue
+            yield entry["password_hash"], (
+                lambda new_hash, entry=entry: json.dumps(
+                    {**entry, "password_hash": new_hash}, separators=(",", ":")
+                ).encode("utf-8")
+                + b"\n"
+            )
+
+
+def _iter_users_items(path: Path) -> Iterator[Item]:
+    # written the way json.dumps(payload, indent=2) lays the file out
+    yield None, lambda _: b'{\n  "users": ['
+    count = 0
+    for entry in iter_json_array(path, "users"):
+        separator = b",\n" if count else b"\n"
+        count += 1
+        yield entry.get("password_hash"), (
+            lambda new_hash, entry=entry, separator=separator: separator
+            + textwrap.indent(
+                json.dumps(
+                    entry if new_hash is None else {**entry, "password_hash": new_hash},
+                    indent=2,
+                ),
+                "    ",
+            ).encode("utf-8")
+        )
+    yield None, lambda _: b"\n  ]\n}\n" if count else b"]\n}\n"
+
+
+def _signature(path: Path) -> List[int]:
+    stat = path.stat()
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _load_checkpoint(checkpoint_path: Path) -> Optional[dict]:
+    try:
+        return json.loads(checkpoint_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _save_checkpoint(checkpoint_path: Path, state: dict) -> None:
+    temp_path = checkpoint_path.with_name(checkpoint_path.name + ".tmp")
+    temp_path.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(temp_path, checkpoint_path)
+
+
+def migrate_file(
+    path: Path,
+    items: Callable[[Path], Iterator[Item]],
+    *,
+    outer_cost: Tuple[int, ...] = DEFAULT_OUTER_COST,
+    pool: Optional[HashingPool] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    lock_path: Optional[Path] = None,
+) -> MigrationReport:
+    """layers every pbkdf2_sha256 hash in one file.
+
+    the file is streamed in batches whose hashes are wrapped in parallel
+    on ``pool``, and the output goes to a side file. after each batch the
+    output is synced and a checkpoint records how far it got, so an
+    interrupted run (or one stopped by ``max_batches``) picks up where it
+    left off. the side file is renamed over the original once complete,
+    holding ``file_lock(lock_path)`` (``path`` itself by default) from the
+    last change check through the rename, so a write that lands meanwhile
+    fails the run instead of being lost.
+    """
+
+    output_path = path.with_name(path.name + OUTPUT_SUFFIX)
+    checkpoint_path = path.with_name(path.name + CHECKPOINT_SUFFIX)
+    state = {
+        "source": _signature(path),
+        "outer_cost": list(outer_cost),
+        "records": 0,
+        "upgraded": 0,
+        "output_bytes": 0,
+    }
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if (
+        checkpoint is not None
+        and checkpoint.get("source") == state["source"]
+        and checkpoint.get("outer_cost") == state["outer_cost"]
+        and output_path.exists()
+        and output_path.stat().st_size >= checkpoint["output_bytes"]
+    ):
+        state = checkpoint
+    resumed_from = state["records"]
+    owns_pool = pool is None
+    pool = pool or HashingPool()
+    batches = 0
+    try:
+        with output_path.open("r+b" if resumed_from else "wb") as output:
+            output.truncate(state["output_bytes"])
+            output.seek(state["output_bytes"])
+            stream = items(path)
+            for _ in range(resumed_from):
+                next(stream)
+            while max_batches is None or batches < max_batches:
+                batch = [item for _, item in zip(range(batch_size), stream)]
+                if not batch:
+                    break
+                upgrades = [stored for stored, _ in batch if _needs_layer(stored)]
+                layered = iter(
+                    pool.map(lambda stored: layer_hash(stored, outer_cost), upgrades)
+                )
+                for stored, render in batch:
+                    output.write(render(next(layered) if _needs_layer(stored) else stored))
+                output.flush()
+                os.fsync(output.fileno())
+                state["records"] += len(batch)
+                state["upgraded"] += len(upgrades)
+                state["output_bytes"] = output.tell()
+                _save_checkpoint(checkpoint_path, state)
+                batches += 1
+            else:
+                finished = next(stream, None) is None
+                if not finished:
+                    return MigrationReport(
+                        path, state["records"], state["upgraded"], resumed_from, False
+                    )
+    finally:
+        if owns_pool:
+            pool.shutdown()
+    with file_lock(lock_path or path):
+        if _signature(path) != state["source"]:
+            raise MigrationError(f"{path} changed during the migration; run it again.")
+        shutil.copymode(path, output_path)
+        os.replace(output_path, path)
+        checkpoint_path.unlink()
+        if index_path_for(path).exists():
+            build_index(path)
+    return MigrationReport(path, state["records"], state["upgraded"], resumed_from, True)
+
+
+def migrate(
+    *,
+    passwd_path: Optional[Path] = None,
+    users_path: Optional[Path] = None,
+    outer_cost: Tuple[int, ...] = DEFAULT_OUTER_COST,
+    pool: Optional[HashingPool] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+) -> List[MigrationReport]:
+    """layers the hashes in passwd.txt, users.json and its journal.
+
+    each file is committed by its own rename. a half-migrated set of files
+    is still consistent, since plain and layered hashes both verify. the
+    journal is written under the users.json lock, so that lock guards the
+    rename of both.
+    """
+
+    passwd_file = passwd_path or DEFAULT_PASSWD_PATH
+    users_file = users_path or DEFAULT_USERS_PATH
+    targets = [
+        (passwd_file, _iter_passwd_items, passwd_file),
+        (users_file, _iter_users_items, users_file),
+        (journal_path_for(users_file), _iter_journal_items, users_file),
+    ]
+    owns_pool = pool is None
+    pool = pool or HashingPool()
+    reports = []
+    try:
+        for path, items, lock_path in targets:
+            if not path.exists():
+                continue
+            report = migrate_file(
+                path,
+                items,
+                outer_cost=outer_cost,
+                pool=pool,
+                batch_size=batch_size,
+                max_batches=max_batches,
+                lock_path=lock_path,
+            )
+            reports.append(report)
+            if not report.finished:
+                break
+    finally:
+        if owns_pool:
+            pool.shutdown()
+    return reports
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for offline hash upgrades."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.hash_migration")
+    commands = parser.add_subparsers(dest="command", required=True)
+    layer = commands.add_parser(
+        "layer", help="wrap every pbkdf2_sha256 hash in scrypt without the passwords"
+    )
+    layer.add_argument("--passwd", type=Path, default=None)
+    layer.add_argument("--users", type=Path, default=None)
+    layer.add_argument("--n", type=int, default=DEFAULT_OUTER_COST[0])
+    layer.add_argument("--r", type=int, default=DEFAULT_OUTER_COST[1])
+    layer.add_argument("--p", type=int, default=DEFAULT_OUTER_COST[2])
+    layer.add_argument("--workers", type=int, default=None)
+    layer.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    layer.add_argument(
+        "--max-batches",
+        type=int,
+        default=None,
+        help="stop after this many batches and resume later",
+    )
+    args = parser.parse_args(argv)
+
+    pool = HashingPool(workers=args.workers)
+    try:
+        reports = migrate(
+            passwd_path=args.passwd,
+            users_path=args.users,
+            outer_cost=(args.n, args.r, args.p),
+            pool=pool,
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+        )
+    finally:
+        pool.shutdown()
+    for report in reports:
+        status = "done" if report.finished else "checkpointed"
+        resumed = f", resumed at {report.resumed_from}" if report.resumed_from else ""
+        print(f"{report.path}: {report.upgraded} hashes layered, {status}{resumed}.")
+    return 0 if all(report.finished for report in reports) else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
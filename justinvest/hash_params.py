@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import argparse
+import json
+import secrets
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .authentication import _derive_digest, _parse_hash
+
+DEFAULT_PARAMS_PATH = Path(__file__).resolve().parents[1] / "data" / "hash_params.json"
+SCHEMES = ("pbkdf2_sha256", "scrypt")
+MIN_PBKDF2_ITERATIONS = 100_000
+MIN_SCRYPT_N = 2**14
+MAX_SCRYPT_N = 2**20
+_DIGEST_BYTES = 32
+
+Signature = Optional[Tuple[int, int, int]]
+_loaded: Dict[Path, Tuple[Signature, "HashParameters"]] = {}
+_loaded_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class HashParameters:
+    """the scheme and cost used for new password hashes."""
+
+    scheme: str = "pbkdf2_sha256"
+    iterations: int = 600_000
+    scrypt_n: int = 2**15
+    scrypt_r: int = 8
+    scrypt_p: int = 1
+    salt_bytes: int = 16
+
+    def __post_init__(self) -> None:
+        if self.scheme not in SCHEMES:
+            raise ValueError(f"Unsupported hash scheme '{self.scheme}'.")
+
+    @property
+    def cost(self) -> Tuple[int, ...]:
+        if self.scheme == "scrypt":
+            return (self.scrypt_n, self.scrypt_r, self.scrypt_p)
+        return (self.iterations,)
+
+    def hash(self, password: str) -> str:
+        """hashes a password with these parameters and a fresh salt."""
+
+        salt = secrets.token_bytes(self.salt_bytes)
+        digest = _derive_digest(self.scheme, self.cost, password, salt, _DIGEST_BYTES)
+        cost = ":".join(str(part) for part in self.cost)
+        return f"{self.scheme}${cost}${salt.hex()}${digest.hex()}"
+
+    def is_current(self, stored_hash: str) -> bool:
+        """checks if a stored hash was made with these parameters."""
+
+        algorithm, cost, salt, _ = _parse_hash(stored_hash)
+        return algorithm == self.scheme and cost == self.cost and len(salt) >= self.salt_bytes
+
+    def describe(self) -> str:
+        if self.scheme == "scrypt":
+            return f"scrypt n={self.scrypt_n} r={self.scrypt_r} p={self.scrypt_p}"
+        return f"pbkdf2_sha256 iterations={self.iterations}"
+
+
+def _stat_signature(path: Path) -> Signature:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def load_hash_parameters(path: Optional[Path] = None) -> HashParameters:
+    """reads the configured hash parameters, falling back to the defaults.
+
+    the result is kept per path along with the file's inode, size and
+    mtime, so repeated calls cost one stat until the file changes.
+    """
+
+    file_path = path or DEFAULT_PARAMS_PATH
+    signature = _stat_signature(file_path)
+    cached = _loaded.get(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    if signature is None:
+        params = HashParameters()
+    else:
+        payload = json.loads(file_path.read_text(encoding="utf-8"))
+        params = HashParameters(**payload)
+    with _loaded_lock:
+        _loaded[file_path] = (signature, params)
+    return params
+
+
+def save_hash_parameters(params: HashParameters, path: Optional[Path] = None) -> Path:
+    """writes the hash parameters used for new and upgraded hashes."""
+
+    file_path = path or DEFAULT_PARAMS_PATH
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text(json.dumps(asdict(params), indent=2) + "\n", encoding="utf-8")
+    with _loaded_lock:
+        # a rewrite within one mtime tick would keep the old signature
+        _loaded.pop(file_path, None)
+    return file_path
+
+
+def measure(params: HashParameters, *, rounds: int = 3) -> float:
+    """times one hash with these parameters, taking the median of a few runs."""
+
+    import statistics
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        params.hash("calibration-password")
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_seconds: float,
+    *,
+    scheme: str = "pbkdf2_sha256",
+    rounds: int = 3,
+) -> Tuple[HashParameters, float]:
+    """picks parameters whose verify time on this host comes closest to
+    ``target_seconds`` without dropping below the minimum cost, and returns
+    them with the measured time."""
+
+    if scheme == "scrypt":
+        # scrypt's cost must be a power of two, so walk up n while the next
+        # doubling would still fit
+        params = HashParameters(scheme="scrypt", scrypt_n=MIN_SCRYPT_N)
+        elapsed = measure(params, rounds=rounds)
+        while params.scrypt_n < MAX_SCRYPT_N and elapsed * 2 <= target_seconds:
+            params = replace(params, scrypt_n=params.scrypt_n * 2)
+            elapsed = measure(params, rounds=rounds)
+        return params, elapsed
+
+    probe = HashParameters(iterations=MIN_PBKDF2_ITERATIONS)
+    elapsed = measure(probe, rounds=rounds)
+    # PBKDF2 time is linear in the iteration count; scale from the probe
+    # and then once more from a run at the estimate
+    for _ in range(2):
+        estimate = int(probe.iterations * target_seconds / elapsed) // 1000 * 1000
+        probe = replace(probe, iterations=max(estimate, MIN_PBKDF2_ITERATIONS))
+        elapsed = measure(probe, rounds=rounds)
+    return probe, elapsed
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for hash cost calibration."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.hash_params")
+    commands = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = commands.add_parser(
+        "calibrate", help="pick hash parameters for a target verify latency on this host"
+    )
+    calibrate_parser.add_argument("--target-ms", type=float, default=250.0)
+    calibrate_parser.add_argument("--scheme", choices=SCHEMES, default="pbkdf2_sha256")
+    calibrate_parser.add_argument("--rounds", type=int, default=3)
+    calibrate_parser.add_argument(
+        "--write", action="store_true", help="save the result for new and upgraded hashes"
+    )
+    calibrate_parser.add_argument("--path", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    current = load_hash_parameters(args.path)
+    params, elapsed = calibrate(args.target_ms / 1000, scheme=args.scheme, rounds=args.rounds)
+    print(f"Current: {current.describe()}")
+    print(f"Calibrated: {params.describe()} ({elapsed * 1000:.1f} ms per verify)")
+    if args.write:
+        print(f"Saved to {save_hash_parameters(params, args.path)}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+from .authentication import verify_password
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class HashingPoolSaturated(Exception):
+    """raised when the hashing pool has no room for more work."""
+
+
+@dataclass(frozen=True)
+class HashingPoolStats:
+    """a snapshot of how busy the hashing pool is."""
+
+    workers: int
+    max_pending: int
+    queue_depth: int
+    in_flight: int
+    completed: int
+    rejected: int
+    average_wait_seconds: float
+    max_wait_seconds: float
+
+
+class HashingPool:
+    """shared worker pool for PBKDF2 hashing and verification.
+
+    hashlib releases the GIL while it runs pbkdf2_hmac, so plain threads
+    use every core. at most ``max_pending`` jobs may be queued or running;
+    interactive callers are rejected straight away when it is full, while
+    bulk calls wait for room instead.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        # imported here so that modules which only need the exception
+        # below do not pay for concurrent.futures at startup
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="justinvest-hash"
+        )
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def submit(
+        self, fn: Callable[..., R], *args: Any, block: bool = False, **kwargs: Any
+    ) -> "Future[R]":
+        """queues ``fn`` on the pool, raising HashingPoolSaturated if it is
+        full and ``block`` is False."""
+
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self._rejected += 1
+            raise HashingPoolSaturated(
+                f"Hashing pool is saturated ({self.max_pending} jobs pending)."
+            )
+        with self._lock:
+            self._queued += 1
+            self._in_flight += 1
+        future = self._executor.submit(self._run, time.perf_counter(), fn, args, kwargs)
+        future.add_done_callback(self._release_cancelled)
+        return future
+
+    def _run(self, enqueued_at: float, fn: Callable[..., R], args: tuple, kwargs: dict) -> R:
+        waited = time.perf_counter() - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # free the slot before the result is published so a caller that
+            # has just seen its answer can submit again straight away
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+            self._slots.release()
+
+    def _release_cancelled(self, future: Future) -> None:
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+                self._in_flight -= 1
+            self._slots.release()
+
+    def verify(self, password: str, stored_hash: str) -> bool:
+        """checks one password on the pool and waits for the answer."""
+
+        return self.submit(verify_password, password, stored_hash).result()
+
+    def verify_many(self, pairs: Iterable[Tuple[str, str]]) -> List[bool]:
+        """checks many (password, stored hash) pairs, waiting for room in
+        the queue rather than failing when it is full."""
+
+        futures = [
+            self.submit(verify_password, password, stored_hash, block=True)
+            for password, stored_hash in pairs
+        ]
+        return [future.result() for future in futures]
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """runs ``fn`` over every item on the pool, waiting for room in the
+        queue as needed, and returns the results in order."""
+
+        futures = [self.submit(fn, item, block=True) for item in items]
+        return [future.result() for future in futures]
+
+    def stats(self) -> HashingPoolStats:
+        """returns a snapshot of the pool's counters."""
+
+        with self._lock:
+            started = self._completed + self._in_flight - self._queued
+            return HashingPoolStats(
+                workers=self.workers,
+                max_pending=self.max_pending,
+                queue_depth=self._queued,
+                in_flight=self._in_flight,
+                completed=self._completed,
+                rejected=self._rejected,
+                average_wait_seconds=self._total_wait / started if started else 0.0,
+                max_wait_seconds=self._max_wait,
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """stops the workers, dropping queued jobs unless ``wait`` is set."""
+
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_default_pool: Optional[HashingPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> HashingPool:
+    """returns the process-wide pool, creating it on first use."""
+
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = HashingPool()
+        return _default_pool
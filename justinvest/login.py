@@ -1,18 +1,38 @@
 from __future__ import annotations
 
+import functools
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import TYPE_CHECKING, Iterable, List, Sequence
 
 from .access_control import AccessControlEngine
+from .authentication import verify_password
+from .hash_params import HashParameters
+from .hashing import HashingPool, HashingPoolSaturated
 from .models import RoleDefinition, SessionContext
 from .operations import ALL_OPERATIONS, OPERATIONS_BY_CODE
-from .password_file import PasswordRecord, get_record, verify_credentials
+from .password_file import (
+    DEFAULT_PASSWD_PATH,
+    PasswordRecord,
+    PasswordStore,
+    get_record,
+    replace_password_hash,
+)
+from .rate_limit import RateLimitExceeded
+from .user_journal import DEFAULT_USERS_PATH, UserJournal
+
+if TYPE_CHECKING:
+    from .rate_limit import LoginRateLimiter
+    from .single_flight import SingleFlightVerifier
+    from .sqlite_repository import SqliteRepository
 
 class LoginError(Exception):
     """raised when login fails."""
 
+class LoginRateLimited(LoginError):
+    """raised when a login is refused by the rate limiter."""
+
 @dataclass(frozen=True)
 class LoginResult:
     username: str
@@ -36,20 +56,141 @@ def perform_login(
     roles: Iterable[RoleDefinition],
     passwd_path: Path | None = None,
     as_of: datetime | None = None,
+    store: PasswordStore | None = None,
+    pool: HashingPool | None = None,
+    single_flight: SingleFlightVerifier | None = None,
+    limiter: LoginRateLimiter | None = None,
+    source: str | None = None,
+    rehash: HashParameters | None = None,
+    users_path: Path | None = None,
+    repository: SqliteRepository | None = None,
 ) -> LoginResult:
-    """logs someone in and figures out what they're allowed to do."""
+    """logs someone in and figures out what they're allowed to do.
+
+    with a ``pool`` the password check runs on the shared hashing workers
+    and is refused straight away if they are saturated. a
+    ``single_flight`` verifier lets identical concurrent logins share one
+    check. a ``limiter`` admits the attempt, keyed on the username and
+    ``source``, before the password file is even read. with ``rehash``,
+    a stored hash made with other parameters is replaced in passwd.txt
+    once the password has been verified, and in users.json too when
+    ``users_path`` is given or passwd.txt is the default one. with a
+    ``repository`` the credentials are read from and upgraded in the
+    database instead of the flat files.
+    """
 
     username = username.strip()
     if not username:
         raise LoginError("Username is required.")
+    verify = functools.partial(
+        _verify_login,
+        username,
+        password,
+        engine,
+        roles=roles,
+        passwd_path=passwd_path,
+        as_of=as_of,
+        store=store,
+        pool=pool,
+        single_flight=single_flight,
+        rehash=rehash,
+        users_path=users_path,
+        repository=repository,
+    )
+    if limiter is None:
+        return verify()
+    try:
+        with limiter.attempt(username, source):
+            return verify()
+    except RateLimitExceeded as exc:
+        raise LoginRateLimited(exc.reason) from exc
 
-    record = get_record(username, path=passwd_path)
+def _verify_login(
+    username: str,
+    password: str,
+    engine: AccessControlEngine,
+    *,
+    roles: Iterable[RoleDefinition],
+    passwd_path: Path | None,
+    as_of: datetime | None,
+    store: PasswordStore | None,
+    pool: HashingPool | None,
+    single_flight: SingleFlightVerifier | None,
+    rehash: HashParameters | None,
+    users_path: Path | None,
+    repository: SqliteRepository | None,
+) -> LoginResult:
+    if repository is not None:
+        record = repository.get_password_record(username)
+    else:
+        record = get_record(username, path=passwd_path, store=store)
     if record is None:
         raise LoginError("Invalid username or password.")
-    if not verify_credentials(username, password, path=passwd_path):
+    try:
+        if single_flight is not None:
+            verified = single_flight.verify(username, password, record.password_hash)
+        elif pool is not None:
+            verified = pool.verify(password, record.password_hash)
+        else:
+            verified = verify_password(password, record.password_hash)
+    except HashingPoolSaturated as exc:
+        raise LoginError("Login service is busy; please try again shortly.") from exc
+    if not verified:
         raise LoginError("Invalid username or password.")
+    if rehash is not None and not rehash.is_current(record.password_hash):
+        _upgrade_hash(
+            record, password, rehash, passwd_path, store, pool, users_path, repository
+        )
+    return _build_login_result(username, record.role, engine, roles, as_of)
 
-    role = _find_role(record.role, roles)
+def _upgrade_hash(
+    record: PasswordRecord,
+    password: str,
+    params: HashParameters,
+    passwd_path: Path | None,
+    store: PasswordStore | None,
+    pool: HashingPool | None,
+    users_path: Path | None,
+    repository: SqliteRepository | None,
+) -> None:
+    """rewrites an outdated hash after a successful login.
+
+    this is best effort: the old hash still verifies, so a busy pool or a
+    failed write just leaves the upgrade for the next login.
+    """
+
+    expected: tuple = (HashingPoolSaturated, OSError)
+    if repository is not None:
+        # sqlite3 is only loaded by the repository, so only look it up then
+        import sqlite3
+
+        expected += (sqlite3.Error,)
+    try:
+        if pool is not None:
+            new_hash = pool.submit(params.hash, password).result()
+        else:
+            new_hash = params.hash(password)
+        if repository is not None:
+            repository.update_password_hash(record.username, new_hash)
+            return
+        replace_password_hash(record.username, new_hash, path=passwd_path, store=store)
+        passwd_file = store.path if store is not None else passwd_path or DEFAULT_PASSWD_PATH
+        # only the default passwd.txt implies a users.json to go with it
+        if users_path is None and passwd_file == DEFAULT_PASSWD_PATH:
+            users_path = DEFAULT_USERS_PATH
+        if users_path is not None:
+            UserJournal(users_path).update(record.username, {"password_hash": new_hash})
+    except expected:
+        return
+
+def _build_login_result(
+    username: str,
+    role_name: str,
+    engine: AccessControlEngine,
+    roles: Iterable[RoleDefinition],
+    as_of: datetime | None,
+) -> LoginResult:
+    role = _find_role(role_name, roles)
     context = SessionContext(as_of=as_of or datetime.now())
     permitted_codes = engine.permitted_operations(role.name, context)
     return LoginResult(
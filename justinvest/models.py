@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Iterable, List, Optional, Sequence, Set
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 
 @dataclass(frozen=True)
@@ -37,6 +38,64 @@ class UserRecord:
     password_hash: str
 
 
+_COSTS: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+
+class CompactUser:
+    """a user record that holds its password hash already decoded.
+
+    the algorithm, cost, salt and digest are split out once at load time
+    so verifying skips the parse. role and algorithm names are interned
+    and equal cost tuples shared, so millions of users cost little more
+    than their usernames, salts and digests. a full name equal to the
+    username is not stored twice.
+    """
+
+    __slots__ = ("username", "_full_name", "role", "algorithm", "cost", "salt", "digest")
+
+    def __init__(
+        self,
+        username: str,
+        full_name: Optional[str],
+        role: str,
+        algorithm: str,
+        cost: Tuple[int, ...],
+        salt: bytes,
+        digest: bytes,
+    ) -> None:
+        self.username = username
+        self._full_name = None if full_name == username else full_name
+        self.role = sys.intern(role)
+        self.algorithm = sys.intern(algorithm)
+        self.cost = _COSTS.setdefault(cost, cost)
+        self.salt = salt
+        self.digest = digest
+
+    @property
+    def full_name(self) -> str:
+        return self.username if self._full_name is None else self._full_name
+
+    @property
+    def password_hash(self) -> str:
+        """the hash in its stored text form."""
+
+        cost = ":".join(str(part) for part in self.cost)
+        return f"{self.algorithm}${cost}${self.salt.hex()}${self.digest.hex()}"
+
+    def to_user_record(self) -> "UserRecord":
+        return UserRecord(self.username, self.full_name, self.role, self.password_hash)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactUser):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"CompactUser(username={self.username!r}, role={self.role!r})"
+
+
 @dataclass
 class SessionContext:
     """stores info about when this request happened."""
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, Iterable, List
 
 
 @dataclass(frozen=True)
@@ -52,6 +52,23 @@ ALL_OPERATIONS: List[Operation] = [
 
 OPERATIONS_BY_CODE: Dict[str, Operation] = {op.code: op for op in ALL_OPERATIONS}
 
+OPERATION_BITS: Dict[str, int] = {op.code: index for index, op in enumerate(ALL_OPERATIONS)}
+
+
+def operations_mask(codes: Iterable[str], bits: Dict[str, int] = OPERATION_BITS) -> int:
+    """packs operation codes into an integer bitmask."""
+
+    mask = 0
+    for code in codes:
+        mask |= 1 << bits[code]
+    return mask
+
+
+def codes_from_mask(mask: int, bits: Dict[str, int] = OPERATION_BITS) -> List[str]:
+    """unpacks a bitmask back into sorted operation codes."""
+
+    return sorted(code for code, bit in bits.items() if mask >> bit & 1)
+
 
 def format_operations_menu() -> str:
     """builds the menu that shows what operations are available."""
@@ -1,12 +1,26 @@
 from __future__ import annotations
 
-import hashlib
-import secrets
+import argparse
+import os
+import shutil
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Sequence, Tuple
 
 from .authentication import verify_password
+from .credentials import hash_password, sanitize_field
+from .file_lock import file_lock
+from .password_index import (
+    PasswordIndex,
+    append_to_index,
+    build_index,
+    index_path_for,
+    restamp_index,
+)
+
+if TYPE_CHECKING:
+    from .hashing import HashingPool
+    from .single_flight import SingleFlightVerifier
 
 DEFAULT_PASSWD_PATH = Path(__file__).resolve().parents[1] / "passwd.txt"
 
@@ -24,50 +38,61 @@ def _resolve_path(path: Optional[Path]) -> Path:
     return path or DEFAULT_PASSWD_PATH
 
 
-def _sanitize(value: str, field_name: str) -> str:
-    value = value.strip()
-    if not value:
-        raise ValueError(f"{field_name} is required.")
-    if "|" in value or "\n" in value:
-        raise ValueError(f"{field_name} cannot contain '|' or newlines.")
-    return value
-
-
 def parse_record(line: str) -> PasswordRecord:
     """reads one line from the password file."""
 
-    username, role, password_hash = line.rstrip("\n").split("|", maxsplit=2)
+    username, role, password_hash = line.rstrip("\r\n").split("|", maxsplit=2)
     return PasswordRecord(username=username, role=role, password_hash=password_hash)
 
 
 def iter_records(path: Optional[Path] = None) -> Iterator[PasswordRecord]:
-    """reads all users from the password file."""
+    """reads all users from the password file, one line at a time."""
 
     file_path = _resolve_path(path)
     if not file_path.exists():
-        return iter(())
-    for line in file_path.read_text(encoding="utf-8").splitlines():
-        if not line.strip():
-            continue
-        yield parse_record(line)
+        return
+    with file_path.open("rb") as handle:
+        for raw_line in handle:
+            line = raw_line.decode("utf-8")
+            if not line.strip():
+                continue
+            yield parse_record(line)
 
 
-def get_record(username: str, path: Optional[Path] = None) -> Optional[PasswordRecord]:
-    """finds a user's record if they exist."""
+def _scan_for_record(file_path: Path, username: str) -> Optional[PasswordRecord]:
+    """streams the file and stops at the first line for this username.
 
-    username = username.strip()
-    for record in iter_records(path):
-        if record.username == username:
-            return record
+    lines are compared as raw bytes so only the match gets decoded.
+    """
+
+    if not file_path.exists():
+        return None
+    prefix = username.encode("utf-8") + b"|"
+    with file_path.open("rb") as handle:
+        for raw_line in handle:
+            if raw_line.startswith(prefix):
+                return parse_record(raw_line.decode("utf-8"))
     return None
 
 
-def _hash_password(
-    password: str, *, iterations: int = 600_000, salt_bytes: int = 16
-) -> str:
-    salt = secrets.token_bytes(salt_bytes)
-    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
-    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+def get_record(
+    username: str,
+    path: Optional[Path] = None,
+    *,
+    store: Optional["PasswordStore"] = None,
+) -> Optional[PasswordRecord]:
+    """finds a user's record if they exist."""
+
+    username = username.strip()
+    if store is not None:
+        return store.get(username)
+    file_path = _resolve_path(path)
+    index = PasswordIndex.open(file_path)
+    if index is not None:
+        with index:
+            line = index.find_line(username)
+        return parse_record(line) if line is not None else None
+    return _scan_for_record(file_path, username)
 
 
 def add_record(
@@ -76,29 +101,77 @@ def add_record(
     password: str,
     *,
     path: Optional[Path] = None,
-    iterations: int = 600_000,
-    salt_bytes: int = 16,
+    iterations: Optional[int] = None,
+    salt_bytes: Optional[int] = None,
+    store: Optional["PasswordStore"] = None,
+    pool: Optional["HashingPool"] = None,
 ) -> PasswordRecord:
-    """adds a new user to the password file."""
+    """adds a new user to the password file.
 
-    username = _sanitize(username, "username")
-    role = _sanitize(role, "role")
-    if get_record(username, path):
+    the username is checked before hashing so a taken name fails fast,
+    and checked again under the file lock right before the append.
+    """
+
+    username = sanitize_field(username, "username")
+    role = sanitize_field(role, "role")
+    file_path = store.path if store is not None else _resolve_path(path)
+    if get_record(username, file_path, store=store):
         raise ValueError(f"Username '{username}' already exists.")
-    password_hash = _hash_password(password, iterations=iterations, salt_bytes=salt_bytes)
+    if pool is not None:
+        password_hash = pool.submit(
+            hash_password, password, iterations=iterations, salt_bytes=salt_bytes
+        ).result()
+    else:
+        password_hash = hash_password(password, iterations=iterations, salt_bytes=salt_bytes)
     record = PasswordRecord(username=username, role=role, password_hash=password_hash)
-    file_path = _resolve_path(path)
-    file_path.parent.mkdir(parents=True, exist_ok=True)
-    needs_leading_newline = (
-        file_path.exists() and file_path.stat().st_size > 0 and not _ends_with_newline(file_path)
-    )
-    with file_path.open("a", encoding="utf-8") as handle:
-        if needs_leading_newline:
-            handle.write("\n")
-        handle.write(f"{record.username}|{record.role}|{record.password_hash}\n")
+    with file_lock(file_path):
+        if get_record(username, file_path, store=store):
+            raise ValueError(f"Username '{username}' already exists.")
+        append_records([record], path=file_path, store=store)
     return record
 
 
+def append_records(
+    records: Sequence[PasswordRecord],
+    *,
+    path: Optional[Path] = None,
+    store: Optional["PasswordStore"] = None,
+) -> None:
+    """writes already-hashed records with a single append.
+
+    callers are responsible for checking usernames for duplicates first,
+    holding ``file_lock(path)`` across the check and this call.
+    """
+
+    if not records:
+        return
+    file_path = store.path if store is not None else _resolve_path(path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(file_path):
+        size = file_path.stat().st_size if file_path.exists() else 0
+        needs_leading_newline = size > 0 and not _ends_with_newline(file_path)
+        offset = size + int(needs_leading_newline)
+        lines = []
+        index_entries = []
+        for record in records:
+            line = f"{record.username}|{record.role}|{record.password_hash}\n"
+            lines.append(line)
+            index_entries.append((record.username, offset))
+            offset += len(line.encode("utf-8"))
+        with file_path.open("a", encoding="utf-8", newline="\n") as handle:
+            if needs_leading_newline:
+                handle.write("\n")
+            handle.write("".join(lines))
+        if not append_to_index(file_path, index_entries, size, offset):
+            # an index that does not end where we appended is missing lines
+            # written behind its back, so build it afresh rather than
+            # leaving lookups to scan an ever longer unindexed tail
+            if index_path_for(file_path).exists():
+                build_index(file_path)
+    if store is not None:
+        store.refresh()
+
+
 def _ends_with_newline(path: Path) -> bool:
     """checks if the file ends with a newline."""
 
@@ -110,12 +183,252 @@ def _ends_with_newline(path: Path) -> bool:
         return handle.read(1) == b"\n"
 
 
+def _locate_line(file_path: Path, username: str) -> Optional[Tuple[int, bytes]]:
+    index = PasswordIndex.open(file_path)
+    if index is not None:
+        with index:
+            return index.locate(username)
+    prefix = username.encode("utf-8") + b"|"
+    offset = 0
+    with file_path.open("rb") as handle:
+        for raw_line in handle:
+            if raw_line.startswith(prefix):
+                return offset, raw_line
+            offset += len(raw_line)
+    return None
+
+
+def replace_password_hash(
+    username: str,
+    password_hash: str,
+    *,
+    path: Optional[Path] = None,
+    store: Optional["PasswordStore"] = None,
+) -> bool:
+    """swaps the hash on a user's line, returning False if they have none.
+
+    a line that keeps its length is overwritten where it is, which leaves
+    the index valid. otherwise the file is copied with the new line and
+    renamed over the original, and an existing index is rebuilt.
+    """
+
+    file_path = store.path if store is not None else _resolve_path(path)
+    if not file_path.exists():
+        return False
+    # a rewrite would drop lines appended while it copies, so it holds the
+    # same lock as appends
+    with file_lock(file_path):
+        located = _locate_line(file_path, username.strip())
+        if located is None:
+            return False
+        offset, old_line = located
+        record = parse_record(old_line.decode("utf-8"))
+        ending = old_line[len(old_line.rstrip(b"\r\n")) :]
+        new_line = f"{record.username}|{record.role}|{password_hash}".encode("utf-8") + ending
+        if len(new_line) == len(old_line):
+            index = PasswordIndex.open(file_path)
+            if index is not None:
+                index.close()
+            with file_path.open("r+b") as handle:
+                handle.seek(offset)
+                handle.write(new_line)
+            if index is not None:
+                # the index records the file's mtime and tail, both of
+                # which the overwrite may have changed
+                restamp_index(file_path)
+        else:
+            _rewrite_line(file_path, offset, len(old_line), new_line)
+    if store is not None:
+        store.refresh()
+    return True
+
+
+def _rewrite_line(file_path: Path, offset: int, old_length: int, new_line: bytes) -> None:
+    temp_path = file_path.with_name(file_path.name + ".tmp")
+    with file_path.open("rb") as source, temp_path.open("wb") as target:
+        remaining = offset
+        while remaining:
+            chunk = source.read(min(remaining, 1 << 20))
+            target.write(chunk)
+            remaining -= len(chunk)
+        target.write(new_line)
+        source.seek(offset + old_length)
+        shutil.copyfileobj(source, target, 1 << 20)
+    shutil.copymode(file_path, temp_path)
+    os.replace(temp_path, file_path)
+    if index_path_for(file_path).exists():
+        build_index(file_path)
+
+
 def verify_credentials(
-    username: str, password: str, *, path: Optional[Path] = None
+    username: str,
+    password: str,
+    *,
+    path: Optional[Path] = None,
+    store: Optional["PasswordStore"] = None,
+    single_flight: Optional["SingleFlightVerifier"] = None,
 ) -> bool:
     """checks if the password is correct for this user."""
 
-    record = get_record(username, path)
+    record = get_record(username, path, store=store)
     if record is None:
         return False
-    return verify_password(password, record.password_hash)
\ No newline at end of file
+    if single_flight is not None:
+        return single_flight.verify(record.username, password, record.password_hash)
+    return verify_password(password, record.password_hash)
+
+
+class PasswordStore:
+    """keeps the password file in memory so lookups don't rescan it.
+
+    passwd.txt is append-only, so the store remembers how many bytes it
+    has consumed and only parses the new tail when the file grows. a
+    shrunk file, a new inode, or a same-size rewrite triggers a full
+    rebuild.
+    """
+
+    _TAIL_CHECK_BYTES = 64
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = _resolve_path(path)
+        self._records: Dict[str, PasswordRecord] = {}
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._offset = 0
+        self._tail = b""
+        self._partial_username: Optional[str] = None
+        self._loaded = False
+
+    @property
+    def offset(self) -> int:
+        """number of bytes of the file that have been indexed."""
+
+        return self._offset
+
+    def _stat_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def refresh(self) -> None:
+        """picks up changes to the file since the last look."""
+
+        signature = self._stat_signature()
+        if self._loaded and signature == self._signature:
+            return
+        previous = self._signature
+        self._signature = signature
+        self._loaded = True
+        if signature is None:
+            self._reset()
+            return
+        appended = (
+            previous is not None
+            and signature[0] == previous[0]
+            and signature[1] > previous[1]
+            and signature[1] >= self._offset
+        )
+        if not (appended and self._read_tail()):
+            self._reset()
+            self._read_tail()
+
+    def _reset(self) -> None:
+        self._records = {}
+        self._offset = 0
+        self._tail = b""
+        self._partial_username = None
+
+    def _read_tail(self) -> bool:
+        """parses bytes past the current offset, or returns False if the
+        already indexed part of the file no longer matches."""
+
+        with self.path.open("rb") as handle:
+            handle.seek(self._offset - len(self._tail))
+            if handle.read(len(self._tail)) != self._tail:
+                return False
+            data = handle.read()
+        # only complete lines advance the offset; an unterminated last
+        # line is indexed provisionally and parsed again on the next read
+        if self._partial_username is not None:
+            self._records.pop(self._partial_username, None)
+            self._partial_username = None
+        end = data.rfind(b"\n") + 1
+        for raw_line in data[:end].split(b"\n"):
+            line = raw_line.decode("utf-8")
+            if line.strip():
+                record = parse_record(line)
+                self._records.setdefault(record.username, record)
+        partial = data[end:].decode("utf-8", errors="replace")
+        if partial.strip() and partial.count("|") >= 2:
+            record = parse_record(partial)
+            if record.username not in self._records:
+                self._records[record.username] = record
+                self._partial_username = record.username
+        if end:
+            self._offset += end
+            self._tail = (self._tail + data[:end])[-self._TAIL_CHECK_BYTES :]
+        return True
+
+    def get(self, username: str) -> Optional[PasswordRecord]:
+        """finds a user's record if they exist."""
+
+        self.refresh()
+        return self._records.get(username.strip())
+
+    def verify(self, username: str, password: str) -> bool:
+        """checks if the password is correct for this user."""
+
+        record = self.get(username)
+        if record is None:
+            return False
+        return verify_password(password, record.password_hash)
+
+    def add(
+        self,
+        username: str,
+        role: str,
+        password: str,
+        *,
+        iterations: Optional[int] = None,
+        salt_bytes: Optional[int] = None,
+    ) -> PasswordRecord:
+        """adds a new user to the password file."""
+
+        return add_record(
+            username,
+            role,
+            password,
+            iterations=iterations,
+            salt_bytes=salt_bytes,
+            store=self,
+        )
+
+    def __contains__(self, username: object) -> bool:
+        return isinstance(username, str) and self.get(username) is not None
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._records)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for password file maintenance."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.password_file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    reindex = commands.add_parser("reindex", help="rebuild the on-disk lookup index")
+    reindex.add_argument("path", nargs="?", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    file_path = _resolve_path(args.path)
+    if not file_path.exists():
+        print(f"Password file {file_path} does not exist.")
+        return 1
+    count = build_index(file_path)
+    print(f"Indexed {count} records from {file_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
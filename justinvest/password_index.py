@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Sequence, Tuple
+
+INDEX_SUFFIX = ".idx"
+_MAGIC = b"JIPX"
+_VERSION = 2
+# magic, version, reserved, sorted entry count, indexed passwd size, passwd
+# inode, passwd mtime in nanoseconds, digest of the bytes just before the
+# indexed size
+_HEADER = struct.Struct("<4sHHQQQQ8s")
+_TAIL_CHECK_BYTES = 64
+# username hash, byte offset of the line in passwd.txt
+_ENTRY = struct.Struct("<QQ")
+
+
+def index_path_for(passwd_path: Path) -> Path:
+    """works out where the index for a password file lives."""
+
+    return passwd_path.with_name(passwd_path.name + INDEX_SUFFIX)
+
+
+def _hash_username(username: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(username, digest_size=8).digest(), "little")
+
+
+def _tail_digest(handle: BinaryIO, size: int) -> bytes:
+    start = max(0, size - _TAIL_CHECK_BYTES)
+    handle.seek(start)
+    return hashlib.blake2b(handle.read(size - start), digest_size=8).digest()
+
+
+def _stamp(passwd_path: Path, size: int) -> Tuple[int, bytes]:
+    """returns the mtime and tail digest an index covering ``size`` bytes
+    of the password file records."""
+
+    with passwd_path.open("rb") as handle:
+        return passwd_path.stat().st_mtime_ns, _tail_digest(handle, size)
+
+
+def _header_matches(passwd_path: Path, header: tuple) -> bool:
+    """checks an index header against the password file as it is now.
+
+    the file may only have grown since the index was written. an unchanged
+    mtime is trusted as is; otherwise the bytes the index ends on must
+    still be there, which catches a rewrite in place that keeps the inode.
+    """
+
+    magic, version, _, _, indexed_size, inode, mtime_ns, tail = header
+    if magic != _MAGIC or version != _VERSION:
+        return False
+    try:
+        stat = passwd_path.stat()
+        if stat.st_ino != inode or stat.st_size < indexed_size:
+            return False
+        if stat.st_mtime_ns == mtime_ns and stat.st_size == indexed_size:
+            return True
+        with passwd_path.open("rb") as handle:
+            return _tail_digest(handle, indexed_size) == tail
+    except FileNotFoundError:
+        return False
+
+
+def _iter_line_offsets(passwd_path: Path) -> Iterator[Tuple[int, bytes]]:
+    offset = 0
+    with passwd_path.open("rb") as handle:
+        for line in handle:
+            if line.strip():
+                yield offset, line
+            offset += len(line)
+
+
+def build_index(passwd_path: Path) -> int:
+    """writes a fresh sorted index for the password file and returns how
+    many lines it covers."""
+
+    stat = passwd_path.stat()
+    keys = sorted(
+        (_hash_username(line.split(b"|", 1)[0]) << 64) | offset
+        for offset, line in _iter_line_offsets(passwd_path)
+    )
+    mtime_ns, tail = _stamp(passwd_path, stat.st_size)
+    index_path = index_path_for(passwd_path)
+    temp_path = index_path.with_name(index_path.name + ".tmp")
+    with temp_path.open("wb") as handle:
+        handle.write(
+            _HEADER.pack(
+                _MAGIC, _VERSION, 0, len(keys), stat.st_size, stat.st_ino, mtime_ns, tail
+            )
+        )
+        mask = (1 << 64) - 1
+        for key in keys:
+            handle.write(_ENTRY.pack(key >> 64, key & mask))
+    os.replace(temp_path, index_path)
+    return len(keys)
+
+
+def append_to_index(
+    passwd_path: Path, entries: Sequence[Tuple[str, int]], start: int, end: int
+) -> bool:
+    """records lines that were just appended, given as (username, offset)
+    pairs, with ``start`` and ``end`` the size of the password file before
+    and after the append. returns False if there is no index ending exactly
+    at ``start``, since extending one that lags would leave the lines in
+    between unindexed."""
+
+    index_path = index_path_for(passwd_path)
+    try:
+        handle = index_path.open("r+b")
+    except FileNotFoundError:
+        return False
+    with handle:
+        header = handle.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return False
+        header = _HEADER.unpack(header)
+        _, _, _, sorted_count, indexed_size, inode, _, _ = header
+        if not entries or indexed_size != start or not _header_matches(passwd_path, header):
+            return False
+        handle.seek(0, os.SEEK_END)
+        handle.write(
+            b"".join(
+                _ENTRY.pack(_hash_username(username.encode("utf-8")), offset)
+                for username, offset in entries
+            )
+        )
+        handle.seek(0)
+        handle.write(
+            _HEADER.pack(_MAGIC, _VERSION, 0, sorted_count, end, inode, *_stamp(passwd_path, end))
+        )
+    return True
+
+
+def restamp_index(passwd_path: Path) -> bool:
+    """records the password file's current mtime and tail in its index
+    after an edit that left every line where it was. returns False if
+    there is no index to update."""
+
+    try:
+        handle = index_path_for(passwd_path).open("r+b")
+    except FileNotFoundError:
+        return False
+    with handle:
+        header = handle.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return False
+        magic, version, _, sorted_count, indexed_size, inode, _, _ = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            return False
+        handle.seek(0)
+        handle.write(
+            _HEADER.pack(
+                _MAGIC,
+                _VERSION,
+                0,
+                sorted_count,
+                indexed_size,
+                inode,
+                *_stamp(passwd_path, indexed_size),
+            )
+        )
+    return True
+
+
+class PasswordIndex:
+    """looks up single lines of the password file through its mmap'd index.
+
+    the index holds a sorted table of username hash -> byte offset plus an
+    unsorted run of entries appended since the last reindex. bytes of
+    passwd.txt past the indexed size are scanned directly, so lookups stay
+    correct when something appends without updating the index.
+    """
+
+    def __init__(self, passwd_path: Path, index_file, mapped: mmap.mmap) -> None:
+        self._passwd_path = passwd_path
+        self._index_file = index_file
+        self._map = mapped
+        _, _, _, self._sorted_count, self._indexed_size, _, _, _ = _HEADER.unpack_from(mapped)
+        self._entry_count = (len(mapped) - _HEADER.size) // _ENTRY.size
+
+    @classmethod
+    def open(cls, passwd_path: Path) -> Optional["PasswordIndex"]:
+        """opens the index, or returns None if it is missing or stale."""
+
+        try:
+            index_file = index_path_for(passwd_path).open("rb")
+        except FileNotFoundError:
+            return None
+        try:
+            mapped = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            index_file.close()
+            return None
+        if len(mapped) >= _HEADER.size and _header_matches(
+            passwd_path, _HEADER.unpack_from(mapped)
+        ):
+            return cls(passwd_path, index_file, mapped)
+        mapped.close()
+        index_file.close()
+        return None
+
+    def close(self) -> None:
+        self._map.close()
+        self._index_file.close()
+
+    def __enter__(self) -> "PasswordIndex":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _entry(self, position: int) -> Tuple[int, int]:
+        return _ENTRY.unpack_from(self._map, _HEADER.size + position * _ENTRY.size)
+
+    def _candidate_offsets(self, key: int) -> Iterator[int]:
+        low, high = 0, self._sorted_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        position = low
+        while position < self._sorted_count:
+            entry_key, offset = self._entry(position)
+            if entry_key != key:
+                break
+            yield offset
+            position += 1
+        for position in range(self._sorted_count, self._entry_count):
+            entry_key, offset = self._entry(position)
+            if entry_key == key:
+                yield offset
+
+    def locate(self, username: str) -> Optional[Tuple[int, bytes]]:
+        """returns the byte offset and raw bytes of the first line for this
+        username, if there is one."""
+
+        prefix = username.encode("utf-8") + b"|"
+        with self._passwd_path.open("rb") as passwd:
+            offset = self._indexed_size
+            for candidate in self._candidate_offsets(_hash_username(prefix[:-1])):
+                passwd.seek(candidate)
+                line = passwd.readline()
+                if line.startswith(prefix):
+                    return candidate, line
+                # a hash match whose line is elsewhere means the index may
+                # be out of date, so scan the whole file instead of the tail
+                offset = 0
+            passwd.seek(offset)
+            for line in passwd:
+                if line.startswith(prefix):
+                    return offset, line
+                offset += len(line)
+        return None
+
+    def find_line(self, username: str) -> Optional[str]:
+        """returns the first line for this username, if there is one."""
+
+        located = self.locate(username)
+        return located[1].decode("utf-8") if located is not None else None
@@ -1,22 +1,115 @@
 from __future__ import annotations
 
+import functools
+from array import array
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, Optional, Set
+from typing import Container, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
 
+from .breach_filter import normalize_entry
+from .policy_resources import PolicyResourceRegistry, get_policy_registry
 
 DEFAULT_WEAK_PASSWORDS = Path(__file__).resolve().parents[1] / "data" / "weak_passwords.txt"
 SPECIAL_CHARS = "!@#$%*&"
 
+# violation codes, one bit each; messages are always listed in bit order
+VIOLATION_WHITESPACE = 1 << 0
+VIOLATION_LENGTH = 1 << 1
+VIOLATION_LOWERCASE = 1 << 2
+VIOLATION_UPPERCASE = 1 << 3
+VIOLATION_DIGIT = 1 << 4
+VIOLATION_SPECIAL = 1 << 5
+VIOLATION_USERNAME = 1 << 6
+VIOLATION_BLACKLIST = 1 << 7
+_CLASS_VIOLATIONS = (
+    ("l", VIOLATION_LOWERCASE),
+    ("u", VIOLATION_UPPERCASE),
+    ("d", VIOLATION_DIGIT),
+    ("s", VIOLATION_SPECIAL),
+)
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def _classify(char: str, special_characters: str) -> str:
+    """returns the class letters for one character; a configured special
+    character may also be a letter or digit."""
+
+    if char.islower():
+        letters = "l"
+    elif char.isupper():
+        letters = "u"
+    elif char.isdigit():
+        letters = "d"
+    else:
+        letters = ""
+    return letters + "s" if char in special_characters else letters
+
+
+@functools.lru_cache(maxsize=None)
+def _class_table(special_characters: str) -> Dict[int, Optional[str]]:
+    """builds the str.translate table mapping every ASCII character to its
+    class letters, once per set of special characters."""
+
+    return str.maketrans(
+        {code: _classify(chr(code), special_characters) or None for code in range(128)}
+    )
+
+
+def _missing_classes() -> Dict[FrozenSet[str], int]:
+    """maps each set of class letters found in a password to the class
+    rules it breaks."""
+
+    letters = [letter for letter, _ in _CLASS_VIOLATIONS]
+    table = {}
+    for mask in range(1 << len(letters)):
+        present = frozenset(letter for bit, letter in enumerate(letters) if mask >> bit & 1)
+        table[present] = sum(code for letter, code in _CLASS_VIOLATIONS if letter not in present)
+    return table
+
+
+_MISSING_BY_PRESENT = _missing_classes()
+
 
 @dataclass(frozen=True)
 class PasswordCheckResult:
     is_valid: bool
     violations: list[str]
+    codes: int = 0
+
+
+@dataclass(frozen=True)
+class PolicyBatchResult:
+    """violation codes for a batch of passwords, in input order.
+
+    a code of 0 means the password passed; messages are only built when
+    asked for.
+    """
+
+    policy: "PasswordPolicy"
+    codes: array
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def is_valid(self, position: int) -> bool:
+        return not self.codes[position]
+
+    @property
+    def valid_count(self) -> int:
+        return self.codes.count(0)
+
+    def messages(self, position: int) -> List[str]:
+        return self.policy.describe(self.codes[position])
 
 
 class PasswordPolicy:
-    """checks if passwords meet our rules."""
+    """checks if passwords meet our rules.
+
+    blacklists named by path are loaded on first use through a shared
+    registry, so building a policy does no I/O and every policy in the
+    process reuses the same data.
+    """
 
     def __init__(
         self,
@@ -26,54 +119,138 @@ class PasswordPolicy:
         special_characters: str = SPECIAL_CHARS,
         weak_passwords: Optional[Iterable[str]] = None,
         weak_passwords_path: Optional[Path] = None,
+        breach_filter_path: Optional[Path] = None,
+        registry: Optional[PolicyResourceRegistry] = None,
     ) -> None:
         self.min_length = min_length
         self.max_length = max_length
         self.special_characters = special_characters
-        self._weak_passwords = self._load_weak_passwords(
-            weak_passwords, weak_passwords_path
-        )
-
-    def _load_weak_passwords(
-        self,
-        weak_passwords: Optional[Iterable[str]],
-        weak_passwords_path: Optional[Path],
-    ) -> Set[str]:
+        self._registry = registry or get_policy_registry()
+        self._weak_passwords: Optional[Set[str]] = None
+        self._weak_passwords_path: Optional[Path] = None
         if weak_passwords is not None:
-            return {entry.strip().lower() for entry in weak_passwords if entry.strip()}
-        path = weak_passwords_path or DEFAULT_WEAK_PASSWORDS
-        if path.exists():
-            return {
-                line.strip().lower()
-                for line in path.read_text(encoding="utf-8").splitlines()
-                if line.strip()
-            }
-        return set()
+            self._weak_passwords = set(map(normalize_entry, weak_passwords)) - {""}
+        else:
+            self._weak_passwords_path = weak_passwords_path or DEFAULT_WEAK_PASSWORDS
+        self._breach_filter_path = breach_filter_path
+        # str.translate classifies every ASCII character in C; the table is
+        # shared by all policies with the same special characters
+        self._class_table = _class_table(special_characters)
 
-    def validate(self, username: str, password: str) -> PasswordCheckResult:
-        """checks the password and tells you what's wrong if anything."""
+    def _class_violations(self, password: str) -> int:
+        if password.isascii():
+            present = frozenset(password.translate(self._class_table))
+        else:
+            specials = self.special_characters
+            present = frozenset("".join(_classify(char, specials) for char in password))
+        return _MISSING_BY_PRESENT[present]
+
+    def _blacklists(self) -> List[Container[str]]:
+        blacklists: List[Container[str]] = []
+        if self._weak_passwords is not None:
+            blacklists.append(self._weak_passwords)
+        else:
+            blacklists.append(self._registry.weak_passwords(self._weak_passwords_path))
+        if self._breach_filter_path is not None:
+            blacklists.append(self._registry.breach_filter(self._breach_filter_path))
+        return blacklists
 
-        violations: list[str] = []
-        trimmed = password.strip()
-        if len(password) != len(trimmed):
-            violations.append("Password cannot start or end with whitespace.")
-        if len(password) < self.min_length or len(password) > self.max_length:
-            violations.append(
+    def describe(self, codes: int) -> List[str]:
+        """turns violation codes into messages, in the usual order."""
+
+        messages = []
+        if codes & VIOLATION_WHITESPACE:
+            messages.append("Password cannot start or end with whitespace.")
+        if codes & VIOLATION_LENGTH:
+            messages.append(
                 f"Password must be between {self.min_length} and {self.max_length} characters."
             )
-        if not any(c.islower() for c in password):
-            violations.append("Password must include at least one lowercase letter.")
-        if not any(c.isupper() for c in password):
-            violations.append("Password must include at least one uppercase letter.")
-        if not any(c.isdigit() for c in password):
-            violations.append("Password must include at least one digit.")
-        if not any(c in self.special_characters for c in password):
-            violations.append(
+        if codes & VIOLATION_LOWERCASE:
+            messages.append("Password must include at least one lowercase letter.")
+        if codes & VIOLATION_UPPERCASE:
+            messages.append("Password must include at least one uppercase letter.")
+        if codes & VIOLATION_DIGIT:
+            messages.append("Password must include at least one digit.")
+        if codes & VIOLATION_SPECIAL:
+            messages.append(
                 f"Password must include at least one special character from {self.special_characters}."
             )
-        if username and password.lower() == username.lower():
-            violations.append("Password cannot match the username.")
-        if password.lower() in self._weak_passwords:
-            violations.append("Password appears on the weak password blacklist.")
+        if codes & VIOLATION_USERNAME:
+            messages.append("Password cannot match the username.")
+        if codes & VIOLATION_BLACKLIST:
+            messages.append("Password appears on the weak password blacklist.")
+        return messages
+
+    def validate(self, username: str, password: str) -> PasswordCheckResult:
+        """checks the password and tells you what's wrong if anything."""
+
+        codes = self._check_chunk([username], [password], short_circuit=False)[0]
+        return PasswordCheckResult(
+            is_valid=not codes, violations=self.describe(codes), codes=codes
+        )
+
+    def validate_many(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        *,
+        short_circuit: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> PolicyBatchResult:
+        """checks many (username, password) pairs and returns their
+        violation codes.
+
+        pairs are taken ``chunk_size`` at a time and each rule runs over a
+        whole chunk before the next. with ``short_circuit`` a password
+        stops at its first failing rule, cheapest first, so the code holds
+        just that one violation.
+        """
+
+        codes = array("H")
+        iterator = iter(pairs)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            usernames, passwords = zip(*chunk)
+            codes.extend(self._check_chunk(usernames, passwords, short_circuit=short_circuit))
+        return PolicyBatchResult(policy=self, codes=codes)
 
-        return PasswordCheckResult(is_valid=not violations, violations=violations)
\ No newline at end of file
+    def _check_chunk(
+        self, usernames: Sequence[str], passwords: Sequence[str], *, short_circuit: bool
+    ) -> List[int]:
+        # rules run cheapest first: length, whitespace, character classes,
+        # username, then the blacklist probe
+        low, high = self.min_length, self.max_length
+        codes = [0 if low <= size <= high else VIOLATION_LENGTH for size in map(len, passwords)]
+        if short_circuit:
+            codes = [
+                code or (VIOLATION_WHITESPACE if password != trimmed else 0)
+                for code, password, trimmed in zip(codes, passwords, map(str.strip, passwords))
+            ]
+            codes = [
+                code or self._class_violations(password)
+                for code, password in zip(codes, passwords)
+            ]
+            # keep only the first of several missing character classes
+            codes = [code & -code for code in codes]
+        else:
+            codes = [
+                code | (VIOLATION_WHITESPACE if password != trimmed else 0)
+                | self._class_violations(password)
+                for code, password, trimmed in zip(codes, passwords, map(str.strip, passwords))
+            ]
+        lowered = list(map(str.lower, passwords))
+        codes = [
+            code | VIOLATION_USERNAME
+            if (not short_circuit or not code) and username and password == username.lower()
+            else code
+            for code, username, password in zip(codes, usernames, lowered)
+        ]
+        blacklists = self._blacklists()
+        return [
+            code | VIOLATION_BLACKLIST
+            if (not short_circuit or not code)
+            and any(candidate in blacklist for blacklist in blacklists)
+            else code
+            for code, candidate in zip(codes, map(normalize_entry, passwords))
+        ]
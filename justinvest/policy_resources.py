@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Container, Dict, Optional, Tuple
+
+from .breach_filter import BreachFilter, filter_path_for, normalize_entry
+
+Signature = Tuple[Optional[Tuple[int, int, int]], ...]
+
+
+@dataclass(frozen=True)
+class ResourceLoadStats:
+    """how often a policy resource was loaded and how long that took."""
+
+    path: Path
+    kind: str
+    loads: int
+    hits: int
+    entries: int
+    last_load_seconds: float
+    total_load_seconds: float
+
+
+def _stat_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _list_signature(path: Path) -> Signature:
+    return _stat_signature(path), _stat_signature(filter_path_for(path))
+
+
+def _read_list(path: Path) -> Container[str]:
+    breach_filter = BreachFilter.open_for_list(path)
+    if breach_filter is not None:
+        return breach_filter
+    if not path.exists():
+        return frozenset()
+    with path.open("r", encoding="utf-8", errors="replace") as handle:
+        entries = frozenset(map(normalize_entry, handle))
+    return entries - {""}
+
+
+def _open_filter(path: Path) -> Container[str]:
+    breach_filter = BreachFilter.open(path)
+    if breach_filter is None:
+        raise ValueError(f"{path} is not a compiled breach filter.")
+    return breach_filter
+
+
+class _Entry:
+    __slots__ = ("signature", "value", "loads", "hits", "last_load", "total_load")
+
+    def __init__(self) -> None:
+        self.signature: Optional[Signature] = None
+        self.value: Optional[Container[str]] = None
+        self.loads = 0
+        self.hits = 0
+        self.last_load = 0.0
+        self.total_load = 0.0
+
+
+class PolicyResourceRegistry:
+    """loads blacklist data on first use and shares it between policies.
+
+    each resource is keyed by its path and remembers the inode, size and
+    mtime of the files it came from; a lookup that finds them changed
+    loads it again. a word list is served from its compiled filter when
+    that filter is up to date, so building one is picked up without a
+    restart.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[str, Path], _Entry] = {}
+        self._lock = threading.Lock()
+
+    def weak_passwords(self, path: Path) -> Container[str]:
+        """returns the weak-password list at ``path``."""
+
+        return self._get("list", path, lambda: _list_signature(path), _read_list)
+
+    def preload_weak_passwords(self, path: Path, value: Container[str]) -> None:
+        """seeds the weak-password list at ``path`` with data read elsewhere,
+        such as a startup snapshot. it is kept until the files change and is
+        not counted as a load."""
+
+        with self._lock:
+            entry = self._entries.setdefault(("list", path), _Entry())
+            entry.signature = _list_signature(path)
+            entry.value = value
+
+    def breach_filter(self, path: Path) -> Container[str]:
+        """returns the compiled breach filter at ``path``."""
+
+        return self._get("filter", path, lambda: (_stat_signature(path),), _open_filter)
+
+    def _get(
+        self,
+        kind: str,
+        path: Path,
+        signature: Callable[[], Signature],
+        load: Callable[[Path], Container[str]],
+    ) -> Container[str]:
+        key = (kind, path)
+        current = signature()
+        entry = self._entries.get(key)
+        if entry is not None and entry.signature == current and entry.value is not None:
+            entry.hits += 1
+            return entry.value
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+            if entry.signature != current or entry.value is None:
+                started = time.perf_counter()
+                # a replaced filter is left for the garbage collector rather
+                # than closed, since another thread may still be reading it
+                entry.value = load(path)
+                elapsed = time.perf_counter() - started
+                entry.signature = current
+                entry.loads += 1
+                entry.last_load = elapsed
+                entry.total_load += elapsed
+            else:
+                entry.hits += 1
+            return entry.value
+
+    def stats(self) -> Dict[Tuple[str, Path], ResourceLoadStats]:
+        """returns load counts and timings for every resource seen so far,
+        keyed by kind ("list" or "filter") and path, since one file may be
+        used as both."""
+
+        with self._lock:
+            return {
+                (kind, path): ResourceLoadStats(
+                    path=path,
+                    kind=kind,
+                    loads=entry.loads,
+                    hits=entry.hits,
+                    entries=len(entry.value) if entry.value is not None else 0,
+                    last_load_seconds=entry.last_load,
+                    total_load_seconds=entry.total_load,
+                )
+                for (kind, path), entry in self._entries.items()
+            }
+
+    def clear(self) -> None:
+        """forgets every loaded resource."""
+
+        with self._lock:
+            self._entries.clear()
+
+
+_default_registry = PolicyResourceRegistry()
+
+
+def get_policy_registry() -> PolicyResourceRegistry:
+    """returns the process-wide registry shared by every PasswordPolicy."""
+
+    return _default_registry
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+from .authentication import AuthenticationError
+
+
+class RateLimitExceeded(AuthenticationError):
+    """raised when a login attempt is refused before any hashing."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class TokenBucketTable:
+    """token buckets for many keys, stored as one float per key.
+
+    each bucket is kept in GCRA form: the time at which it would be full
+    again. a key whose bucket has refilled carries no state and is dropped,
+    and the table never holds more than ``max_keys`` entries; the least
+    recently used key is evicted first, which at worst hands it a fresh
+    bucket.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float,
+        burst: int,
+        max_keys: int = 1_000_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self._interval = 1.0 / rate
+        self._tolerance = (burst - 1) * self._interval
+        self._max_keys = max_keys
+        self._clock = clock
+        self._full_at: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def take(self, key: str) -> bool:
+        """spends one token from ``key``'s bucket if there is one."""
+
+        with self._lock:
+            now = self._clock()
+            full_at = max(self._full_at.pop(key, now), now)
+            if full_at - now > self._tolerance:
+                self._full_at[key] = full_at
+                return False
+            self._full_at[key] = full_at + self._interval
+            self._expire(now)
+            return True
+
+    def _expire(self, now: float) -> None:
+        while self._full_at:
+            oldest_key, oldest_full_at = next(iter(self._full_at.items()))
+            if oldest_full_at > now and len(self._full_at) <= self._max_keys:
+                break
+            del self._full_at[oldest_key]
+
+
+@dataclass(frozen=True)
+class LoginRateLimitStats:
+    """counters for the login rate limiter."""
+
+    allowed: int
+    rejected: int
+    tracked_users: int
+    tracked_sources: int
+    active: int
+
+
+class LoginRateLimiter:
+    """sheds login load before any password hashing happens.
+
+    every attempt spends a token from its username's bucket and, if a
+    source key such as a client address is given, from that source's
+    bucket too. a global cap bounds how many attempts may be hashing at
+    once; anything over it is refused rather than queued.
+    """
+
+    def __init__(
+        self,
+        *,
+        user_rate: float = 5 / 60,
+        user_burst: int = 5,
+        source_rate: float = 1.0,
+        source_burst: int = 20,
+        max_concurrent: Optional[int] = None,
+        max_keys: int = 1_000_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._users = TokenBucketTable(
+            rate=user_rate, burst=user_burst, max_keys=max_keys, clock=clock
+        )
+        self._sources = TokenBucketTable(
+            rate=source_rate, burst=source_burst, max_keys=max_keys, clock=clock
+        )
+        self.max_concurrent = max_concurrent or (os.cpu_count() or 1) * 2
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._allowed = 0
+        self._rejected = 0
+        self._active = 0
+
+    def _reject(self, reason: str) -> RateLimitExceeded:
+        with self._lock:
+            self._rejected += 1
+        return RateLimitExceeded(reason)
+
+    @contextmanager
+    def attempt(self, username: str, source: Optional[str] = None) -> Iterator[None]:
+        """admits one login attempt or raises RateLimitExceeded."""
+
+        if source is not None and not self._sources.take(source):
+            raise self._reject("Too many login attempts from this source; try again later.")
+        if not self._users.take(username):
+            raise self._reject("Too many login attempts for this user; try again later.")
+        if not self._slots.acquire(blocking=False):
+            raise self._reject("Too many logins in progress; try again shortly.")
+        with self._lock:
+            self._allowed += 1
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def stats(self) -> LoginRateLimitStats:
+        """returns a snapshot of the limiter's counters."""
+
+        with self._lock:
+            return LoginRateLimitStats(
+                allowed=self._allowed,
+                rejected=self._rejected,
+                tracked_users=len(self._users),
+                tracked_sources=len(self._sources),
+                active=self._active,
+            )
@@ -4,7 +4,9 @@ import json
 from pathlib import Path
 from typing import Iterable, List
 
-from .models import ConstraintDefinition, RoleDefinition, UserRecord
+from .authentication import compact_user
+from .models import CompactUser, ConstraintDefinition, RoleDefinition, UserRecord
+from .user_journal import iter_user_payloads
 
 
 def _ensure_path(path: Path | None, default_filename: str) -> Path:
@@ -16,36 +18,41 @@ def _ensure_path(path: Path | None, default_filename: str) -> Path:
     return project_root / "data" / default_filename
 
 
+def role_from_payload(role_payload: dict) -> RoleDefinition:
+    """builds a role from its entry in roles.json."""
+
+    constraints = [
+        ConstraintDefinition(type=constraint["type"], params=constraint)
+        for constraint in role_payload.get("constraints", [])
+    ]
+    return RoleDefinition(
+        name=role_payload["name"],
+        label=role_payload.get("label", role_payload["name"]),
+        permissions=set(role_payload.get("permissions", [])),
+        constraints=constraints,
+        allow_self_signup=role_payload.get("allow_self_signup", False),
+    )
+
+
+def load_role_payloads(path: Path | None = None) -> List[dict]:
+    """reads the raw role entries from the config file."""
+
+    file_path = _ensure_path(path, "roles.json")
+    return json.loads(file_path.read_text(encoding="utf-8")).get("roles", [])
+
+
 def load_roles(path: Path | None = None) -> List[RoleDefinition]:
     """reads the roles from the config file."""
 
-    file_path = _ensure_path(path, "roles.json")
-    payload = json.loads(file_path.read_text(encoding="utf-8"))
-    role_defs = []
-    for role_payload in payload.get("roles", []):
-        constraints = [
-            ConstraintDefinition(type=constraint["type"], params=constraint)
-            for constraint in role_payload.get("constraints", [])
-        ]
-        role_defs.append(
-            RoleDefinition(
-                name=role_payload["name"],
-                label=role_payload.get("label", role_payload["name"]),
-                permissions=set(role_payload.get("permissions", [])),
-                constraints=constraints,
-                allow_self_signup=role_payload.get("allow_self_signup", False),
-            )
-        )
-    return role_defs
+    return [role_from_payload(role_payload) for role_payload in load_role_payloads(path)]
 
 
 def load_users(path: Path | None = None) -> List[UserRecord]:
-    """reads the users from the config file."""
+    """reads the users from the config file and its pending journal."""
 
     file_path = _ensure_path(path, "users.json")
-    payload = json.loads(file_path.read_text(encoding="utf-8"))
     users = []
-    for user_payload in payload.get("users", []):
+    for user_payload in iter_user_payloads(file_path):
         users.append(
             UserRecord(
                 username=user_payload["username"],
@@ -54,4 +61,20 @@ def load_users(path: Path | None = None) -> List[UserRecord]:
                 password_hash=user_payload["password_hash"],
             )
         )
-    return users
\ No newline at end of file
+    return users
+
+
+def load_compact_users(path: Path | None = None) -> List[CompactUser]:
+    """reads the users like ``load_users`` but as compact records with
+    their hashes decoded."""
+
+    file_path = _ensure_path(path, "users.json")
+    return [
+        compact_user(
+            user_payload["username"],
+            user_payload["role"],
+            user_payload["password_hash"],
+            user_payload.get("full_name"),
+        )
+        for user_payload in iter_user_payloads(file_path)
+    ]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import secrets
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from .authentication import verify_password
+
+
+@dataclass(frozen=True)
+class SingleFlightStats:
+    """how many verifications were asked for and how many were shared."""
+
+    calls: int
+    computations: int
+    coalesced: int
+
+
+class SingleFlightVerifier:
+    """shares one password check between identical concurrent requests.
+
+    requests are keyed on the username plus an HMAC of the candidate
+    password and stored hash under a per-process key, so the plaintext
+    never sits in the table. entries only live while a check is running;
+    a request that arrives after it finishes starts a fresh one.
+    """
+
+    def __init__(
+        self,
+        verify: Callable[[str, str], bool] = verify_password,
+        *,
+        key: Optional[bytes] = None,
+    ) -> None:
+        self._verify = verify
+        self._key = key or secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[str, bytes], Future] = {}
+        self._calls = 0
+        self._computations = 0
+
+    def _request_key(self, username: str, password: str, stored_hash: str) -> Tuple[str, bytes]:
+        message = password.encode("utf-8") + b"\0" + stored_hash.encode("utf-8")
+        return username, hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def verify(self, username: str, password: str, stored_hash: str) -> bool:
+        """checks the password, joining an identical check already running."""
+
+        key = self._request_key(username, password, stored_hash)
+        with self._lock:
+            self._calls += 1
+            shared = self._in_flight.get(key)
+            if shared is None:
+                self._computations += 1
+                shared = self._in_flight[key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            return shared.result()
+        try:
+            result = self._verify(password, stored_hash)
+        except BaseException as exc:
+            shared.set_exception(exc)
+            raise
+        else:
+            shared.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def stats(self) -> SingleFlightStats:
+        """returns a snapshot of the call counters."""
+
+        with self._lock:
+            return SingleFlightStats(
+                calls=self._calls,
+                computations=self._computations,
+                coalesced=self._calls - self._computations,
+            )
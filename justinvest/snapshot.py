@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .access_control import AccessControlEngine
+from .authentication import CredentialStore
+from .breach_filter import filter_path_for
+from .models import CompactUser, RoleDefinition
+from .password_policy import DEFAULT_WEAK_PASSWORDS, PasswordPolicy
+from .policy_resources import PolicyResourceRegistry, _read_list, get_policy_registry
+from .repository import _ensure_path, load_compact_users, load_role_payloads, role_from_payload
+from .user_journal import journal_path_for
+
+DEFAULT_SNAPSHOT_PATH = Path(__file__).resolve().parents[1] / "data" / "startup.snapshot"
+_MAGIC = b"JISS"
+_VERSION = 2
+# magic, version, reserved, then the lengths of the sources, roles and
+# users JSON sections; the salt and digest bytes fill the rest of the file
+_HEADER = struct.Struct("<4sHHQQQ")
+_DIGEST_CHUNK = 1 << 20
+# the modules whose code decides what goes into a snapshot; editing one
+# makes existing snapshots stale just like editing a data file
+_CODE_SOURCES = (
+    "authentication.py",
+    "breach_filter.py",
+    "models.py",
+    "policy_resources.py",
+    "repository.py",
+    "snapshot.py",
+    "user_journal.py",
+)
+
+# size, mtime in nanoseconds, and a hex content digest (None for stat-only sources)
+Fingerprint = Optional[Tuple[int, int, Optional[str]]]
+
+
+class SnapshotError(Exception):
+    """raised when a snapshot file cannot be used."""
+
+
+@dataclass
+class StartupState:
+    """everything the entry points build before their first prompt."""
+
+    roles: List[RoleDefinition]
+    engine: AccessControlEngine
+    users: Optional[Dict[str, CompactUser]]
+    weak_passwords: Optional[FrozenSet[str]]
+    weak_passwords_path: Path
+    from_snapshot: bool = False
+
+    def credential_store(self, **options) -> CredentialStore:
+        """returns a store over the snapshot's users."""
+
+        if self.users is None:
+            raise ValueError("This startup state was loaded without users.")
+        return CredentialStore.from_users(self.users, **options)
+
+    def password_policy(
+        self, *, registry: Optional[PolicyResourceRegistry] = None, **options
+    ) -> PasswordPolicy:
+        """returns a policy whose weak-password list is already loaded.
+
+        when the list has a compiled filter the snapshot does not hold it,
+        and the registry opens the filter on first use as usual.
+        """
+
+        registry = registry or get_policy_registry()
+        if self.weak_passwords is not None:
+            registry.preload_weak_passwords(self.weak_passwords_path, self.weak_passwords)
+        return PasswordPolicy(
+            weak_passwords_path=self.weak_passwords_path, registry=registry, **options
+        )
+
+
+def _digest(path: Path) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(_DIGEST_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _fingerprint(path: Path, known: Fingerprint = None, *, content: bool = True) -> Fingerprint:
+    """stats ``path`` and hashes it only if the stat differs from ``known``."""
+
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+        return known
+    return stat.st_size, stat.st_mtime_ns, _digest(path) if content else None
+
+
+def _same_content(current: Fingerprint, known: Fingerprint) -> bool:
+    if current == known:
+        return True
+    if current is None or known is None or current[2] is None:
+        return False
+    return current[0] == known[0] and current[2] == known[2]
+
+
+def _sources(roles_path: Path, users_path: Path, weak_passwords_path: Path) -> Dict[str, Path]:
+    package = Path(__file__).resolve().parent
+    sources = {
+        "roles": roles_path,
+        "users": users_path,
+        "journal": journal_path_for(users_path),
+        "weak_passwords": weak_passwords_path,
+        "filter": filter_path_for(weak_passwords_path),
+    }
+    sources.update((f"code:{name}", package / name) for name in _CODE_SOURCES)
+    return sources
+
+
+def _fingerprints(
+    sources: Dict[str, Path], known: Dict[str, Fingerprint]
+) -> Dict[str, Fingerprint]:
+    # a compiled filter can be very large and its header already records
+    # which list it was built from, so it is only stat'd
+    return {
+        name: _fingerprint(path, known.get(name), content=name != "filter")
+        for name, path in sources.items()
+    }
+
+
+def _read_weak_passwords(path: Path) -> Optional[List[str]]:
+    # a list with a compiled filter is left to the registry, which opens
+    # the filter itself; otherwise it is read just as the registry would
+    if filter_path_for(path).exists():
+        return None
+    return sorted(_read_list(path))
+
+
+def _encode_users(users: List[CompactUser]) -> Tuple[bytes, bytes]:
+    """lays the users out as JSON columns plus one blob of salts and
+    digests. role, algorithm and cost repeat across users, so each user
+    stores an index into a small table of those combinations."""
+
+    kinds: Dict[Tuple[str, str, Tuple[int, ...]], int] = {}
+    names, full_names, user_kinds, salt_sizes, digest_sizes = [], [], [], [], []
+    blob = bytearray()
+    for user in users:
+        names.append(user.username)
+        full_names.append(None if user.full_name == user.username else user.full_name)
+        user_kinds.append(kinds.setdefault((user.role, user.algorithm, user.cost), len(kinds)))
+        salt_sizes.append(len(user.salt))
+        digest_sizes.append(len(user.digest))
+        blob += user.salt
+        blob += user.digest
+    columns = {
+        "kind_table": list(kinds),
+        "names": names,
+        "full_names": full_names,
+        "kinds": user_kinds,
+        "salt_sizes": salt_sizes,
+        "digest_sizes": digest_sizes,
+    }
+    return json.dumps(columns, separators=(",", ":")).encode("utf-8"), bytes(blob)
+
+
+def _decode_users(payload: bytes, blob: bytes) -> Dict[str, CompactUser]:
+    columns = json.loads(payload)
+    kind_table = [(role, algorithm, tuple(cost)) for role, algorithm, cost in columns["kind_table"]]
+    users: Dict[str, CompactUser] = {}
+    end = 0
+    for name, full_name, kind, salt_size, digest_size in zip(
+        columns["names"],
+        columns["full_names"],
+        columns["kinds"],
+        columns["salt_sizes"],
+        columns["digest_sizes"],
+    ):
+        role, algorithm, cost = kind_table[kind]
+        start, middle = end, end + salt_size
+        end = middle + digest_size
+        users[name] = CompactUser(
+            name, full_name, role, algorithm, cost, blob[start:middle], blob[middle:end]
+        )
+    if end != len(blob):
+        raise SnapshotError("Snapshot user data does not match its index.")
+    return users
+
+
+def _encode(fingerprints: Dict[str, Fingerprint], body: bytes, lengths: Tuple[int, int]) -> bytes:
+    sources = json.dumps(fingerprints, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(_MAGIC, _VERSION, 0, len(sources), *lengths) + sources + body
+
+
+def _decode(data: bytes) -> Tuple[Dict[str, Fingerprint], bytes, Tuple[int, int]]:
+    if len(data) < _HEADER.size:
+        raise SnapshotError("Snapshot is truncated.")
+    magic, version, _, sources_length, roles_length, users_length = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise SnapshotError("Snapshot has an unknown format or version.")
+    start = _HEADER.size + sources_length
+    if len(data) < start + roles_length + users_length:
+        raise SnapshotError("Snapshot is truncated.")
+    try:
+        fingerprints = {
+            name: tuple(fingerprint) if fingerprint is not None else None
+            for name, fingerprint in json.loads(data[_HEADER.size : start]).items()
+        }
+    except (ValueError, TypeError, AttributeError) as exc:
+        raise SnapshotError("Snapshot header is unreadable.") from exc
+    return fingerprints, data[start:], (roles_length, users_length)
+
+
+def _write(path: Path, data: bytes) -> None:
+    """replaces the snapshot atomically, giving up quietly if the data
+    directory is read-only since the snapshot is only a cache."""
+
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    except OSError:
+        temp_path.unlink(missing_ok=True)
+
+
+def _write_snapshot(sources: Dict[str, Path], target: Path) -> Tuple[bytes, Tuple[int, int]]:
+    # fingerprint before reading, so a change made mid-build is seen as
+    # stale on the next start rather than hidden
+    fingerprints = _fingerprints(sources, {})
+    meta = json.dumps(
+        {
+            "roles": load_role_payloads(sources["roles"]),
+            "weak_passwords": _read_weak_passwords(sources["weak_passwords"]),
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    users, blob = _encode_users(load_compact_users(sources["users"]))
+    body, lengths = meta + users + blob, (len(meta), len(users))
+    _write(target, _encode(fingerprints, body, lengths))
+    return body, lengths
+
+
+def _state_from_body(
+    body: bytes, lengths: Tuple[int, int], weak_path: Path, include_users: bool
+) -> StartupState:
+    meta_length, users_length = lengths
+    meta = json.loads(body[:meta_length])
+    roles = [role_from_payload(role_payload) for role_payload in meta["roles"]]
+    users = None
+    if include_users:
+        users_end = meta_length + users_length
+        users = _decode_users(body[meta_length:users_end], body[users_end:])
+    weak_passwords = meta["weak_passwords"]
+    return StartupState(
+        roles=roles,
+        engine=AccessControlEngine(roles),
+        users=users,
+        weak_passwords=frozenset(weak_passwords) if weak_passwords is not None else None,
+        weak_passwords_path=weak_path,
+    )
+
+
+def build_snapshot(
+    roles_path: Optional[Path] = None,
+    users_path: Optional[Path] = None,
+    weak_passwords_path: Optional[Path] = None,
+    snapshot_path: Optional[Path] = None,
+) -> StartupState:
+    """parses the source files, writes a fresh snapshot and returns the
+    state it holds."""
+
+    weak_path = weak_passwords_path or DEFAULT_WEAK_PASSWORDS
+    sources = _sources(
+        _ensure_path(roles_path, "roles.json"), _ensure_path(users_path, "users.json"), weak_path
+    )
+    body, lengths = _write_snapshot(sources, snapshot_path or DEFAULT_SNAPSHOT_PATH)
+    return _state_from_body(body, lengths, weak_path, True)
+
+
+def load_startup_state(
+    roles_path: Optional[Path] = None,
+    users_path: Optional[Path] = None,
+    weak_passwords_path: Optional[Path] = None,
+    snapshot_path: Optional[Path] = None,
+    *,
+    include_users: bool = True,
+) -> StartupState:
+    """returns the roles, compiled engine, users and weak-password list,
+    from the snapshot if it still matches the source files.
+
+    the snapshot is read in one go and each source is stat'd; a file is
+    only hashed when its size or mtime moved, so touching a file without
+    changing it keeps the snapshot. the package modules that shape the
+    snapshot count as sources too. a missing, corrupt or stale snapshot is
+    rebuilt. it holds only JSON and raw salt and digest bytes, and the
+    engine is compiled afresh from the roles, so a tampered snapshot can
+    change data but never run code.
+    """
+
+    weak_path = weak_passwords_path or DEFAULT_WEAK_PASSWORDS
+    target = snapshot_path or DEFAULT_SNAPSHOT_PATH
+    sources = _sources(
+        _ensure_path(roles_path, "roles.json"), _ensure_path(users_path, "users.json"), weak_path
+    )
+    state = _read_snapshot(target, sources, weak_path, include_users)
+    if state is not None:
+        return state
+    body, lengths = _write_snapshot(sources, target)
+    return _state_from_body(body, lengths, weak_path, include_users)
+
+
+def _read_snapshot(
+    target: Path, sources: Dict[str, Path], weak_path: Path, include_users: bool
+) -> Optional[StartupState]:
+    """returns the state held in the snapshot, or None if it is missing,
+    unreadable or out of date."""
+
+    try:
+        known, body, lengths = _decode(target.read_bytes())
+    except (OSError, SnapshotError):
+        return None
+    current = _fingerprints(sources, known)
+    if set(current) != set(known) or not all(
+        _same_content(current[name], known[name]) for name in current
+    ):
+        return None
+    try:
+        state = _state_from_body(body, lengths, weak_path, include_users)
+    except (SnapshotError, ValueError, KeyError, TypeError, IndexError):
+        return None
+    if current != known:
+        # only mtimes moved; record them so the next start skips hashing
+        _write(target, _encode(current, body, lengths))
+    state.from_snapshot = True
+    return state
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for the startup snapshot."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.snapshot")
+    parser.add_argument("--snapshot", type=Path, default=DEFAULT_SNAPSHOT_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="rebuild the snapshot from the data files")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        state = build_snapshot(snapshot_path=args.snapshot)
+        print(f"Wrote a snapshot of {len(state.users or {})} users to {args.snapshot}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
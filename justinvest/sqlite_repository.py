@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from .file_lock import file_lock
+from .models import ConstraintDefinition, RoleDefinition, UserRecord
+from .password_file import PasswordRecord, iter_records
+from .password_index import build_index, index_path_for
+from .repository import load_roles
+from .user_journal import iter_user_payloads, journal_path_for
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parents[1] / "data" / "justinvest.db"
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+DEFAULT_PASSWD_PATH = Path(__file__).resolve().parents[1] / "passwd.txt"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roles (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    allow_self_signup INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS role_permissions (
+    role TEXT NOT NULL REFERENCES roles(name) ON DELETE CASCADE,
+    permission TEXT NOT NULL,
+    PRIMARY KEY (role, permission)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS role_constraints (
+    role TEXT NOT NULL REFERENCES roles(name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    params TEXT NOT NULL,
+    PRIMARY KEY (role, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    full_name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    password_hash TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS users_by_role ON users(role);
+"""
+
+# statements are kept as constants so sqlite3's per-connection statement
+# cache prepares each of them once
+_SELECT_USER = "SELECT username, full_name, role, password_hash FROM users WHERE username = ?"
+_SELECT_USERS = "SELECT username, full_name, role, password_hash FROM users ORDER BY username"
+_COUNT_USERS = "SELECT COUNT(*) FROM users"
+_INSERT_USER = (
+    "INSERT INTO users (username, full_name, role, password_hash) VALUES (?, ?, ?, ?)"
+)
+_UPSERT_USER = (
+    "INSERT INTO users (username, full_name, role, password_hash) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(username) DO UPDATE SET full_name = excluded.full_name, "
+    "role = excluded.role, password_hash = excluded.password_hash"
+)
+_INSERT_MISSING_USER = (
+    "INSERT OR IGNORE INTO users (username, full_name, role, password_hash) VALUES (?, ?, ?, ?)"
+)
+_UPDATE_HASH = "UPDATE users SET password_hash = ? WHERE username = ?"
+_SELECT_ROLES = "SELECT name, label, allow_self_signup FROM roles ORDER BY position"
+_SELECT_ROLE = "SELECT name, label, allow_self_signup FROM roles WHERE name = ?"
+_SELECT_PERMISSIONS = "SELECT permission FROM role_permissions WHERE role = ?"
+_SELECT_CONSTRAINTS = (
+    "SELECT type, params FROM role_constraints WHERE role = ? ORDER BY position"
+)
+
+
+class RepositoryError(Exception):
+    """raised when the database rejects a change."""
+
+
+class SqliteUserTable:
+    """a read-only, dict-like view of the users table.
+
+    CredentialStore only needs ``get``, so it can look users up through
+    this view one indexed query at a time instead of loading them all.
+    """
+
+    def __init__(self, repository: "SqliteRepository") -> None:
+        self._repository = repository
+
+    def get(self, username: str, default: Optional[UserRecord] = None) -> Optional[UserRecord]:
+        record = self._repository.get_user(username)
+        return record if record is not None else default
+
+    def __contains__(self, username: object) -> bool:
+        return isinstance(username, str) and self._repository.get_user(username) is not None
+
+    def __len__(self) -> int:
+        return len(self._repository)
+
+
+class SqliteRepository:
+    """stores users, roles, permissions and constraints in one SQLite file.
+
+    the database runs in WAL mode so readers never wait for the writer.
+    each thread gets its own connection, every lookup is a primary-key
+    query, and enrollment is a single transaction.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or DEFAULT_DB_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.users = SqliteUserTable(self)
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, cached_statements=64)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """closes this thread's connection."""
+
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __enter__(self) -> "SqliteRepository":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    # users
+
+    def get_user(self, username: str) -> Optional[UserRecord]:
+        """finds a user's record if they exist."""
+
+        row = self._connection().execute(_SELECT_USER, (username.strip(),)).fetchone()
+        return UserRecord(*row) if row is not None else None
+
+    def get_password_record(self, username: str) -> Optional[PasswordRecord]:
+        """finds a user's credentials in the shape passwd.txt lookups return."""
+
+        user = self.get_user(username)
+        if user is None:
+            return None
+        return PasswordRecord(
+            username=user.username, role=user.role, password_hash=user.password_hash
+        )
+
+    def iter_users(self) -> Iterator[UserRecord]:
+        """yields every user, ordered by username."""
+
+        for row in self._connection().execute(_SELECT_USERS):
+            yield UserRecord(*row)
+
+    def load_users(self) -> List[UserRecord]:
+        return list(self.iter_users())
+
+    def __contains__(self, username: object) -> bool:
+        return isinstance(username, str) and self.get_user(username) is not None
+
+    def __len__(self) -> int:
+        return self._connection().execute(_COUNT_USERS).fetchone()[0]
+
+    def add_user(self, record: UserRecord) -> None:
+        """inserts a new user, raising RepositoryError if the name is taken."""
+
+        self.add_users([record])
+
+    def add_users(self, records: Iterable[UserRecord]) -> None:
+        """inserts several users in one transaction; none are added if any
+        name is taken."""
+
+        connection = self._connection()
+        try:
+            with connection:
+                connection.executemany(
+                    _INSERT_USER,
+                    (
+                        (record.username, record.full_name, record.role, record.password_hash)
+                        for record in records
+                    ),
+                )
+        except sqlite3.IntegrityError as exc:
+            raise RepositoryError("Username already exists.") from exc
+
+    def update_password_hash(self, username: str, password_hash: str) -> bool:
+        """replaces a user's stored hash, returning False if there is no
+        such user."""
+
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(_UPDATE_HASH, (password_hash, username))
+        return cursor.rowcount > 0
+
+    # roles
+
+    def _build_role(self, row: tuple) -> RoleDefinition:
+        connection = self._connection()
+        name, label, allow_self_signup = row
+        permissions = {
+            permission for (permission,) in connection.execute(_SELECT_PERMISSIONS, (name,))
+        }
+        constraints = [
+            ConstraintDefinition(type=constraint_type, params=json.loads(params))
+            for constraint_type, params in connection.execute(_SELECT_CONSTRAINTS, (name,))
+        ]
+        return RoleDefinition(
+            name=name,
+            label=label,
+            permissions=permissions,
+            constraints=constraints,
+            allow_self_signup=bool(allow_self_signup),
+        )
+
+    def get_role(self, name: str) -> Optional[RoleDefinition]:
+        """finds one role with its permissions and constraints."""
+
+        row = self._connection().execute(_SELECT_ROLE, (name,)).fetchone()
+        return self._build_role(row) if row is not None else None
+
+    def load_roles(self) -> List[RoleDefinition]:
+        """reads every role, in the order they were imported."""
+
+        rows = self._connection().execute(_SELECT_ROLES).fetchall()
+        return [self._build_role(row) for row in rows]
+
+    def replace_roles(self, roles: Iterable[RoleDefinition]) -> None:
+        """swaps the whole role configuration in one transaction."""
+
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM roles")
+            for position, role in enumerate(roles):
+                connection.execute(
+                    "INSERT INTO roles (name, position, label, allow_self_signup) "
+                    "VALUES (?, ?, ?, ?)",
+                    (role.name, position, role.label, int(role.allow_self_signup)),
+                )
+                connection.executemany(
+                    "INSERT INTO role_permissions (role, permission) VALUES (?, ?)",
+                    ((role.name, permission) for permission in sorted(role.permissions)),
+                )
+                connection.executemany(
+                    "INSERT INTO role_constraints (role, position, type, params) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        (role.name, position, constraint.type, json.dumps(constraint.params))
+                        for position, constraint in enumerate(role.constraints)
+                    ),
+                )
+
+    # bridge to the flat files
+
+    def import_files(
+        self,
+        *,
+        roles_path: Optional[Path] = None,
+        users_path: Optional[Path] = None,
+        passwd_path: Optional[Path] = None,
+    ) -> int:
+        """loads roles.json, users.json (with its journal) and passwd.txt.
+
+        users.json entries overwrite existing rows; passwd.txt only adds
+        users that users.json does not have. returns the number of users
+        afterwards.
+        """
+
+        self.replace_roles(load_roles(roles_path))
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                _UPSERT_USER,
+                (
+                    (
+                        entry["username"],
+                        entry.get("full_name", entry["username"]),
+                        entry["role"],
+                        entry["password_hash"],
+                    )
+                    for entry in iter_user_payloads(users_path or DATA_DIR / "users.json")
+                ),
+            )
+            connection.executemany(
+                _INSERT_MISSING_USER,
+                (
+                    (record.username, record.username, record.role, record.password_hash)
+                    for record in iter_records(passwd_path or DEFAULT_PASSWD_PATH)
+                ),
+            )
+        return len(self)
+
+    def export_files(
+        self,
+        *,
+        roles_path: Path,
+        users_path: Path,
+        passwd_path: Path,
+    ) -> int:
+        """writes the database back out in the flat-file formats and
+        returns the number of users written."""
+
+        roles_payload = {
+            "roles": [
+                {
+                    "name": role.name,
+                    "label": role.label,
+                    "allow_self_signup": role.allow_self_signup,
+                    "permissions": sorted(role.permissions),
+                    "constraints": [dict(constraint.params) for constraint in role.constraints],
+                }
+                for role in self.load_roles()
+            ]
+        }
+        _replace_file(roles_path, (json.dumps(roles_payload, indent=2) + "\n").encode("utf-8"))
+        users = self.load_users()
+        users_payload = {
+            "users": [
+                {
+                    "username": user.username,
+                    "full_name": user.full_name,
+                    "role": user.role,
+                    "password_hash": user.password_hash,
+                }
+                for user in users
+            ]
+        }
+        # the same locks as enrollment and journal appends, so none of
+        # them lands in a file between its rewrite and the rename
+        with file_lock(users_path):
+            _replace_file(
+                users_path, (json.dumps(users_payload, indent=2) + "\n").encode("utf-8")
+            )
+            # the snapshot now holds everything, so older journal entries
+            # must not be layered over it
+            journal_path_for(users_path).unlink(missing_ok=True)
+        with file_lock(passwd_path):
+            _replace_file(
+                passwd_path,
+                "".join(
+                    f"{user.username}|{user.role}|{user.password_hash}\n" for user in users
+                ).encode("utf-8"),
+            )
+            # an index left over from the old file points at the wrong lines
+            if index_path_for(passwd_path).exists():
+                build_index(passwd_path)
+        return len(users)
+
+
+def _replace_file(path: Path, payload: bytes) -> None:
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_bytes(payload)
+    os.replace(temp_path, path)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for the SQLite bridge."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.sqlite_repository")
+    parser.add_argument("--db", type=Path, default=None)
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("import", "load roles.json, users.json and passwd.txt into the database"),
+        ("export", "write the database out as roles.json, users.json and passwd.txt"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--roles", type=Path, default=None)
+        command.add_argument("--users", type=Path, default=None)
+        command.add_argument("--passwd", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    with SqliteRepository(args.db) as repository:
+        if args.command == "import":
+            count = repository.import_files(
+                roles_path=args.roles, users_path=args.users, passwd_path=args.passwd
+            )
+            print(f"Imported {count} users into {repository.path}.")
+        else:
+            count = repository.export_files(
+                roles_path=args.roles or DATA_DIR / "roles.json",
+                users_path=args.users or DATA_DIR / "users.json",
+                passwd_path=args.passwd or DEFAULT_PASSWD_PATH,
+            )
+            print(f"Exported {count} users from {repository.path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
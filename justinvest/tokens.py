@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import hmac
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from .access_control import AccessControlEngine
+from .login import LoginResult
+from .operations import OPERATION_BITS, codes_from_mask, operations_mask
+
+_VERSION = "v1"
+
+
+class TokenError(Exception):
+    """raised when a session token is invalid or expired."""
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    """what a verified session token says about its holder."""
+
+    username: str
+    role_name: str
+    permission_mask: int
+    expires_at: int
+
+    def allows(self, operation_code: str) -> bool:
+        bit = OPERATION_BITS.get(operation_code)
+        return bit is not None and bool(self.permission_mask >> bit & 1)
+
+    @property
+    def allowed_operation_codes(self) -> List[str]:
+        return codes_from_mask(self.permission_mask)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TokenService:
+    """issues and checks HMAC-signed session tokens.
+
+    a token carries the username, role, permitted-operation bitmask and an
+    expiry, so later requests can be authorized without touching
+    passwd.txt or hashing again. the expiry never runs past the role's
+    next time-window boundary, which keeps the bitmask accurate for the
+    token's whole life.
+    """
+
+    def __init__(
+        self,
+        secret: bytes,
+        engine: AccessControlEngine,
+        *,
+        ttl: timedelta = timedelta(minutes=15),
+    ) -> None:
+        if len(secret) < 16:
+            raise ValueError("Token secret must be at least 16 bytes.")
+        self._secret = secret
+        self._engine = engine
+        self.ttl = ttl
+
+    @staticmethod
+    def generate_secret() -> bytes:
+        return secrets.token_bytes(32)
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()
+
+    def issue(self, result: LoginResult, as_of: Optional[datetime] = None) -> str:
+        """creates a token for a successful login."""
+
+        as_of = as_of or datetime.now()
+        expires = as_of + self.ttl
+        boundary = self._engine.next_transition(result.role_name, as_of)
+        if boundary is not None and boundary < expires:
+            expires = boundary
+        mask = operations_mask(
+            code for code in result.allowed_operation_codes if code in OPERATION_BITS
+        )
+        payload = (
+            f"{result.username}|{result.role_name}|{mask:x}|{int(expires.timestamp())}"
+        ).encode("utf-8")
+        return f"{_VERSION}.{_b64encode(payload)}.{_b64encode(self._sign(payload))}"
+
+    def verify_token(self, token: str, now: Optional[datetime] = None) -> TokenClaims:
+        """checks a token's signature and expiry and returns its claims."""
+
+        try:
+            version, payload_text, signature_text = token.split(".")
+            payload = _b64decode(payload_text)
+            signature = _b64decode(signature_text)
+        except (ValueError, binascii.Error) as exc:
+            raise TokenError("Malformed session token.") from exc
+        if version != _VERSION or not hmac.compare_digest(signature, self._sign(payload)):
+            raise TokenError("Invalid session token signature.")
+        username, role_name, mask_hex, expires_text = payload.decode("utf-8").split("|")
+        expires_at = int(expires_text)
+        if (time.time() if now is None else now.timestamp()) >= expires_at:
+            raise TokenError("Session token has expired.")
+        return TokenClaims(
+            username=username,
+            role_name=role_name,
+            permission_mask=int(mask_hex, 16),
+            expires_at=expires_at,
+        )
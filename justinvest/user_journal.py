@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .file_lock import file_lock
+
+DEFAULT_USERS_PATH = Path(__file__).resolve().parents[1] / "data" / "users.json"
+JOURNAL_SUFFIX = ".journal"
+DEFAULT_COMPACT_THRESHOLD = 256
+_CHUNK_BYTES = 1 << 20
+
+
+def journal_path_for(users_path: Path) -> Path:
+    """works out where the journal for a users file lives."""
+
+    return users_path.with_name(users_path.name + JOURNAL_SUFFIX)
+
+
+def _read_snapshot(users_path: Path) -> List[dict]:
+    if not users_path.exists():
+        return []
+    return json.loads(users_path.read_text(encoding="utf-8")).get("users", [])
+
+
+def decode_journal_line(raw_line: bytes) -> Optional[dict]:
+    """parses one journal line, skipping blanks and torn writes left by
+    an interrupted append."""
+
+    if not raw_line.endswith(b"\n") or not raw_line.strip():
+        return None
+    try:
+        return json.loads(raw_line)
+    except ValueError:
+        return None
+
+
+def iter_journal(journal_path: Path) -> Iterator[dict]:
+    """yields the entries of a journal file in order, skipping torn lines."""
+
+    if not journal_path.exists():
+        return
+    with journal_path.open("rb") as handle:
+        for raw_line in handle:
+            entry = decode_journal_line(raw_line)
+            if entry is not None:
+                yield entry
+
+
+def iter_json_array(path: Path, key: str) -> Iterator[dict]:
+    """yields the objects in a top-level JSON array one at a time, reading
+    the file in chunks so memory does not grow with its size. raises
+    ValueError if the array is missing or malformed."""
+
+    decoder = json.JSONDecoder()
+    with path.open("r", encoding="utf-8") as handle:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, position, eof
+            chunk = handle.read(_CHUNK_BYTES)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            return bool(chunk)
+
+        marker = f'"{key}"'
+        while marker not in buffer:
+            if not fill():
+                return
+        position = buffer.index(marker) + len(marker)
+        while "[" not in buffer[position:]:
+            position = len(buffer)
+            if not fill():
+                raise ValueError(f"{path} has no '{key}' array.")
+        position = buffer.index("[", position) + 1
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                if fill():
+                    continue
+                raise ValueError(f"{path} ended inside the '{key}' array.")
+            if buffer[position] == "]":
+                return
+            try:
+                entry, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ValueError(f"{path} is not valid JSON.") from exc
+                fill()
+                continue
+            position = end
+            yield entry
+
+
+def iter_user_payloads(users_path: Optional[Path] = None) -> Iterator[dict]:
+    """yields the current user entries, with journal entries layered over
+    the snapshot. a later entry for the same username replaces the earlier
+    one but keeps its position."""
+
+    file_path = users_path or DEFAULT_USERS_PATH
+    merged: Dict[str, dict] = {}
+    for entry in _read_snapshot(file_path):
+        merged[entry["username"]] = entry
+    for entry in iter_journal(journal_path_for(file_path)):
+        merged[entry["username"]] = entry
+    yield from merged.values()
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class UserJournal:
+    """append-only log of users.json changes with a username index.
+
+    enrollments append one JSON line to ``users.json.journal`` instead of
+    rewriting users.json. once the journal holds ``compact_threshold``
+    entries it is folded back into the snapshot, so the cost of a rewrite
+    is spread over many enrollments.
+    """
+
+    def __init__(
+        self,
+        users_path: Optional[Path] = None,
+        *,
+        compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+    ) -> None:
+        self.users_path = users_path or DEFAULT_USERS_PATH
+        self.journal_path = journal_path_for(self.users_path)
+        self.compact_threshold = compact_threshold
+        self._usernames: Set[str] = set()
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._journal_signature: Optional[Tuple[int, int, int]] = None
+        self._loaded = False
+
+    def refresh(self) -> None:
+        """brings the username index up to date with both files."""
+
+        snapshot_signature = _signature(self.users_path)
+        journal_signature = _signature(self.journal_path)
+        if (
+            self._loaded
+            and snapshot_signature == self._snapshot_signature
+            and journal_signature == self._journal_signature
+        ):
+            return
+        journal_grew = (
+            self._loaded
+            and snapshot_signature == self._snapshot_signature
+            and journal_signature is not None
+            and (
+                self._journal_signature is None
+                or (
+                    journal_signature[0] == self._journal_signature[0]
+                    and journal_signature[1] >= self._journal_offset
+                )
+            )
+        )
+        if not journal_grew:
+            self._usernames = {entry["username"] for entry in _read_snapshot(self.users_path)}
+            self._journal_entries = 0
+            self._journal_offset = 0
+        self._read_journal_tail()
+        self._snapshot_signature = snapshot_signature
+        self._journal_signature = journal_signature
+        self._loaded = True
+
+    def _read_journal_tail(self) -> None:
+        if not self.journal_path.exists():
+            return
+        with self.journal_path.open("rb") as handle:
+            handle.seek(self._journal_offset)
+            for raw_line in handle:
+                if not raw_line.endswith(b"\n"):
+                    break
+                self._journal_offset += len(raw_line)
+                entry = decode_journal_line(raw_line)
+                if entry is not None:
+                    self._usernames.add(entry["username"])
+                    self._journal_entries += 1
+
+    def __contains__(self, username: object) -> bool:
+        self.refresh()
+        return username in self._usernames
+
+    @property
+    def pending_entries(self) -> int:
+        """number of journal entries not yet compacted into users.json."""
+
+        self.refresh()
+        return self._journal_entries
+
+    def append(self, entry: dict) -> None:
+        """records one user entry."""
+
+        self.extend([entry])
+
+    def extend(self, entries: Iterable[dict]) -> None:
+        """records several user entries with a single write."""
+
+        payload = "".join(
+            json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries
+        )
+        if not payload:
+            return
+        with file_lock(self.users_path):
+            self.refresh()
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.journal_path.open("a+b") as handle:
+                handle.seek(0, os.SEEK_END)
+                if handle.tell() > 0:
+                    handle.seek(-1, os.SEEK_END)
+                    if handle.read(1) != b"\n":
+                        payload = "\n" + payload
+                handle.write(payload.encode("utf-8"))
+            if self.compact_threshold and self.pending_entries >= self.compact_threshold:
+                self.compact()
+
+    def update(self, username: str, changes: dict) -> bool:
+        """records new values for some of a user's fields, returning False
+        if there is no such user."""
+
+        with file_lock(self.users_path):
+            if username not in self:
+                return False
+            current = next(
+                entry
+                for entry in iter_user_payloads(self.users_path)
+                if entry["username"] == username
+            )
+            self.append({**current, **changes})
+            return True
+
+    def compact(self) -> int:
+        """folds the journal into users.json and returns how many entries
+        were merged.
+
+        this holds the users.json lock, since an entry appended between
+        reading the journal and unlinking it would otherwise be lost.
+        """
+
+        with file_lock(self.users_path):
+            self.refresh()
+            merged = self._journal_entries
+            if not merged:
+                return 0
+            payload = {"users": list(iter_user_payloads(self.users_path))}
+            temp_path = self.users_path.with_name(self.users_path.name + ".tmp")
+            temp_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+            os.replace(temp_path, self.users_path)
+            # replaying entries already in the snapshot is harmless, so a
+            # crash between the rename and the unlink loses nothing
+            self.journal_path.unlink()
+            self.refresh()
+            return merged
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """command line entry point for journal maintenance."""
+
+    parser = argparse.ArgumentParser(prog="python -m justinvest.user_journal")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact = commands.add_parser("compact", help="fold the journal into users.json")
+    compact.add_argument("path", nargs="?", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    journal = UserJournal(args.path)
+    merged = journal.compact()
+    print(f"Compacted {merged} journal entries into {journal.users_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,9 +4,9 @@ from datetime import datetime
 
 import pytest
 
-from justinvest.access_control import AccessControlEngine
+from justinvest.access_control import AccessControlEngine, ConstraintFactory
 from justinvest.authentication import CredentialStore
-from justinvest.models import SessionContext
+from justinvest.models import ConstraintDefinition, RoleDefinition, SessionContext
 from justinvest.operations import ALL_OPERATIONS
 from justinvest.repository import load_roles, load_users
 
@@ -94,3 +94,127 @@ def test_access_denied_for_disallowed_operation(engine: AccessControlEngine) ->
     )
     assert not decision.granted
     assert "lacks 'MODIFY_INVESTMENT_PORTFOLIO'" in (decision.reason or "")
+
+
+def test_constraints_compiled_once(monkeypatch) -> None:
+    """verifies that constraints are built when roles load, not on every check."""
+    calls = []
+    original_build = ConstraintFactory.build
+
+    def counting_build(self, definition):
+        calls.append(definition.type)
+        return original_build(self, definition)
+
+    monkeypatch.setattr(ConstraintFactory, "build", counting_build)
+    engine = AccessControlEngine(load_roles())
+    assert calls == ["time_window"]
+    context = SessionContext(as_of=datetime(2025, 1, 1, 10, 0))
+    for _ in range(3):
+        assert engine.is_operation_allowed("teller", "VIEW_ACCOUNT_BALANCE", context).granted
+    assert calls == ["time_window"]
+
+
+def test_reload_replaces_roles() -> None:
+    """verifies that reloading swaps in the new role set."""
+    reloaded = AccessControlEngine(load_roles())
+    reloaded.reload(
+        [
+            RoleDefinition(
+                name="auditor",
+                label="Auditor",
+                permissions={"VIEW_MONEY_MARKET_INSTRUMENTS", "VIEW_ACCOUNT_BALANCE"},
+                constraints=(),
+            )
+        ]
+    )
+    assert reloaded.permitted_operations("auditor") == [
+        "VIEW_ACCOUNT_BALANCE",
+        "VIEW_MONEY_MARKET_INSTRUMENTS",
+    ]
+    with pytest.raises(KeyError):
+        reloaded.get_role("teller")
+
+
+BATCH_ROWS = [
+    ("teller", "VIEW_ACCOUNT_BALANCE", datetime(2025, 1, 1, 10, 0)),
+    ("teller", "VIEW_ACCOUNT_BALANCE", datetime(2025, 1, 1, 17, 0, 0, 1)),
+    ("teller", "MODIFY_INVESTMENT_PORTFOLIO", datetime(2025, 1, 1, 10, 0)),
+    ("client", "VIEW_ACCOUNT_BALANCE", datetime(2025, 1, 1, 23, 0)),
+    ("client", "NOT_AN_OPERATION", datetime(2025, 1, 1, 10, 0)),
+]
+
+
+def expected_batch(engine: AccessControlEngine) -> list[bool]:
+    return [
+        engine.is_operation_allowed(role, code, SessionContext(as_of=as_of)).granted
+        for role, code, as_of in BATCH_ROWS
+    ]
+
+
+def test_authorize_many_matches_single_checks(engine: AccessControlEngine) -> None:
+    """verifies that batch decisions agree with one-at-a-time checks."""
+    assert engine.authorize_many(BATCH_ROWS) == expected_batch(engine)
+    assert engine.authorize_many(BATCH_ROWS) == [True, False, False, True, False]
+
+
+def test_authorize_arrays(engine: AccessControlEngine) -> None:
+    """verifies that the numpy path returns the same decisions as the row path."""
+    numpy = pytest.importorskip("numpy")
+    roles, codes, stamps = zip(*BATCH_ROWS)
+    decisions = engine.authorize_arrays(
+        numpy.array(roles),
+        numpy.array(codes),
+        numpy.array(stamps, dtype="datetime64[us]"),
+    )
+    assert decisions.tolist() == expected_batch(engine)
+
+
+def test_next_transition() -> None:
+    """verifies that the engine knows when the teller window opens and closes."""
+    engine = AccessControlEngine(load_roles())
+    assert engine.next_transition("teller", datetime(2025, 1, 1, 8, 0)) == datetime(2025, 1, 1, 9, 0)
+    assert engine.next_transition("teller", datetime(2025, 1, 1, 10, 0)) == datetime(
+        2025, 1, 1, 17, 0, 0, 1
+    )
+    assert engine.next_transition("teller", datetime(2025, 1, 1, 20, 0)) == datetime(2025, 1, 2, 9, 0)
+    assert engine.next_transition("client", datetime(2025, 1, 1, 20, 0)) is None
+
+
+def test_decision_cache_hits_until_transition() -> None:
+    """verifies that repeated checks inside one window are served from the cache."""
+    engine = AccessControlEngine(load_roles())
+    morning = SessionContext(as_of=datetime(2025, 1, 1, 10, 0))
+    later = SessionContext(as_of=datetime(2025, 1, 1, 16, 59))
+    evening = SessionContext(as_of=datetime(2025, 1, 1, 17, 0, 0, 1))
+    assert engine.permitted_operations("teller", morning)
+    assert engine.is_operation_allowed("teller", "VIEW_ACCOUNT_BALANCE", later).granted
+    stats = engine.cache_stats()
+    assert (stats.hits, stats.misses) == (1, 1)
+    decision = engine.is_operation_allowed("teller", "VIEW_ACCOUNT_BALANCE", evening)
+    assert not decision.granted
+    assert "business hours" in (decision.reason or "")
+    assert engine.cache_stats().misses == 2
+    assert engine.permitted_operations("teller", morning)
+    assert engine.cache_stats().misses == 3
+
+
+def test_reload_invalidates_decision_cache() -> None:
+    """verifies that cached outcomes do not survive a role reload."""
+    engine = AccessControlEngine(load_roles())
+    context = SessionContext(as_of=datetime(2025, 1, 1, 10, 0))
+    assert engine.permitted_operations("teller", context)
+    engine.reload(
+        [
+            RoleDefinition(
+                name="teller",
+                label="Teller",
+                permissions={"VIEW_ACCOUNT_BALANCE"},
+                constraints=[
+                    ConstraintDefinition(
+                        type="time_window", params={"start": "12:00", "end": "13:00"}
+                    )
+                ],
+            )
+        ]
+    )
+    assert engine.permitted_operations("teller", context) == []
@@ -0,0 +1,171 @@
+"""Tests for the asyncio login API."""
+
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from justinvest import async_login
+from justinvest.access_control import AccessControlEngine
+from justinvest.async_login import AsyncCredentialStore, async_perform_login
+from justinvest.authentication import AuthenticationError
+from justinvest.credentials import hash_password
+from justinvest.hashing import HashingPool, HashingPoolSaturated
+from justinvest.login import LoginError
+from justinvest.models import UserRecord
+from justinvest.password_file import add_record
+from justinvest.repository import load_roles
+
+
+@pytest.fixture(scope="module")
+def roles():
+    return load_roles()
+
+
+@pytest.fixture(scope="module")
+def engine(roles):
+    return AccessControlEngine(roles)
+
+
+@pytest.fixture()
+def passwd_file(tmp_path: Path) -> Path:
+    path = tmp_path / "passwd.txt"
+    for index in range(5):
+        add_record(f"user{index}", "client", "Valid@123", path=path, iterations=1000, salt_bytes=8)
+    return path
+
+
+def test_concurrent_async_logins(roles, engine, passwd_file: Path) -> None:
+    """verifies that many logins can be awaited together under a concurrency cap."""
+
+    async def run():
+        limit = asyncio.Semaphore(2)
+        attempts = [
+            async_perform_login(
+                f"user{index % 5}",
+                "Valid@123",
+                engine,
+                roles=roles,
+                passwd_path=passwd_file,
+                as_of=datetime(2025, 1, 1, 10, 0),
+                limit=limit,
+            )
+            for index in range(20)
+        ]
+        return await asyncio.gather(*attempts)
+
+    results = asyncio.run(run())
+    assert [result.username for result in results] == [f"user{i % 5}" for i in range(20)]
+    assert all(result.role_name == "client" for result in results)
+
+
+def test_default_cap_matches_pool(roles, engine, passwd_file: Path) -> None:
+    """verifies that without a limit a burst is held to the pool's size
+    rather than overflowing its queue."""
+    pool = HashingPool(workers=2, max_pending=2)
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                async_perform_login(
+                    f"user{index % 5}",
+                    "Valid@123",
+                    engine,
+                    roles=roles,
+                    passwd_path=passwd_file,
+                    pool=pool,
+                )
+                for index in range(20)
+            )
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert len(results) == 20
+    assert pool.stats().rejected == 0
+
+
+def test_async_login_rejects_bad_password(roles, engine, passwd_file: Path) -> None:
+    """verifies that wrong passwords raise LoginError from the async path."""
+    with pytest.raises(LoginError):
+        asyncio.run(
+            async_perform_login("user0", "wrong", engine, roles=roles, passwd_path=passwd_file)
+        )
+
+
+def test_cancelled_login_never_hashes(monkeypatch) -> None:
+    """verifies that a task cancelled while waiting for a slot skips hashing."""
+    calls = []
+    monkeypatch.setattr(
+        async_login, "verify_password", lambda password, stored: calls.append(password) or True
+    )
+
+    async def run():
+        limit = asyncio.Semaphore(1)
+        await limit.acquire()
+        task = asyncio.create_task(
+            async_login._verify_off_loop("Valid@123", "hash", pool=None, limit=limit)
+        )
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        limit.release()
+
+    asyncio.run(run())
+    assert calls == []
+
+
+def test_async_credential_store() -> None:
+    """verifies that the async store authenticates like the blocking one."""
+    users = [
+        UserRecord(
+            username="async.user",
+            full_name="Async User",
+            role="client",
+            password_hash=hash_password("Valid@123", iterations=1000, salt_bytes=8),
+        )
+    ]
+    store = AsyncCredentialStore(users, max_concurrent=2)
+
+    async def run():
+        return await asyncio.gather(
+            store.authenticate("async.user", "Valid@123"),
+            store.authenticate("async.user", "wrong"),
+            store.authenticate("nobody", "Valid@123"),
+        )
+
+    good, bad, missing = asyncio.run(run())
+    assert good is not None and good.full_name == "Async User"
+    assert bad is None
+    assert missing is None
+
+
+def test_async_store_reports_a_full_pool() -> None:
+    """verifies that a saturated pool surfaces as AuthenticationError, not the pool's error."""
+    users = [
+        UserRecord(
+            username="async.user",
+            full_name="Async User",
+            role="client",
+            password_hash=hash_password("Valid@123", iterations=1000, salt_bytes=8),
+        )
+    ]
+    pool = HashingPool(workers=1, max_pending=1)
+    store = AsyncCredentialStore(users, max_concurrent=4, pool=pool)
+
+    async def run():
+        return await asyncio.gather(
+            *(store.authenticate("async.user", "Valid@123") for _ in range(4)),
+            return_exceptions=True,
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert any(isinstance(result, AuthenticationError) for result in results)
+    assert not any(isinstance(result, HashingPoolSaturated) for result in results)
@@ -0,0 +1,76 @@
+"""Tests for JSONL batch authorization."""
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from justinvest.access_control import AccessControlEngine
+from justinvest.batch import authorize_stream, build_role_index, main, write_decisions
+from justinvest.repository import load_roles
+
+
+@pytest.fixture(scope="module")
+def engine() -> AccessControlEngine:
+    return AccessControlEngine(load_roles())
+
+
+@pytest.fixture(scope="module")
+def role_index() -> dict:
+    return build_role_index()
+
+
+def run(lines: list[str], engine, role_index) -> list[dict]:
+    output = io.StringIO()
+    write_decisions(authorize_stream(lines, engine, role_index.get), output, chunk_size=2)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_batch_decisions(engine, role_index) -> None:
+    """verifies that each request line yields a decision with a reason when denied."""
+    teller = next(name for name, role in role_index.items() if role == "teller")
+    lines = [
+        json.dumps({"username": "sasha.kim", "operation": "VIEW_ACCOUNT_BALANCE", "timestamp": "2025-01-01T10:00:00"}),
+        json.dumps({"username": "sasha.kim", "operation": "MODIFY_INVESTMENT_PORTFOLIO", "timestamp": "2025-01-01T10:00:00"}),
+        json.dumps({"username": teller, "operation": "VIEW_ACCOUNT_BALANCE", "timestamp": "2025-01-01T20:00:00"}),
+        "",
+    ]
+    results = run(lines, engine, role_index)
+    assert [row["granted"] for row in results] == [True, False, False]
+    assert results[0]["reason"] is None
+    assert "lacks" in results[1]["reason"]
+    assert "business hours" in results[2]["reason"]
+
+
+def test_batch_bad_rows(engine, role_index) -> None:
+    """verifies that malformed rows and unknown users are reported instead of aborting."""
+    lines = [
+        "{not json",
+        json.dumps({"username": "sasha.kim", "operation": "VIEW_ACCOUNT_BALANCE"}),
+        json.dumps({"username": "ghost", "operation": "VIEW_ACCOUNT_BALANCE", "timestamp": "2025-01-01T10:00:00"}),
+        json.dumps({"username": "sasha.kim", "operation": ["X"], "timestamp": "2025-01-01T10:00:00"}),
+        json.dumps({"username": ["a"], "operation": "VIEW_ACCOUNT_BALANCE", "timestamp": "2025-01-01T10:00:00"}),
+        json.dumps(["not", "an", "object"]),
+    ]
+    results = run(lines, engine, role_index)
+    assert [row["line"] for row in results] == [1, 2, 3, 4, 5, 6]
+    assert results[0]["reason"].startswith("Malformed request")
+    assert results[1]["reason"].startswith("Malformed request")
+    assert results[2]["reason"] == "Unknown user 'ghost'."
+    assert results[3]["reason"] == "Malformed request: 'operation' must be a string"
+    assert results[4]["reason"] == "Malformed request: 'username' must be a string"
+    assert results[5]["reason"].startswith("Malformed request")
+
+
+def test_batch_cli(tmp_path: Path) -> None:
+    """verifies that the command line entry point reads and writes JSONL files."""
+    source = tmp_path / "requests.jsonl"
+    target = tmp_path / "decisions.jsonl"
+    source.write_text(
+        json.dumps({"username": "sasha.kim", "operation": "VIEW_ACCOUNT_BALANCE", "timestamp": "2025-01-01T10:00:00"})
+        + "\n",
+        encoding="utf-8",
+    )
+    assert main([str(source), "-o", str(target)]) == 0
+    assert json.loads(target.read_text(encoding="utf-8"))["granted"] is True
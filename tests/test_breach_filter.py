@@ -0,0 +1,88 @@
+"""Tests for the compiled breached-password filter."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from justinvest.breach_filter import BreachFilter, build_filter, filter_path_for, main
+from justinvest.password_policy import VIOLATION_BLACKLIST, PasswordPolicy
+from justinvest.policy_resources import PolicyResourceRegistry
+
+
+@pytest.fixture()
+def password_list(tmp_path: Path) -> Path:
+    path = tmp_path / "breached.txt"
+    entries = [f"Leaked{number}!" for number in range(2000)]
+    path.write_text("\n".join(entries + ["PASSWORD", "  password  ", ""]) + "\n")
+    return path
+
+
+def test_membership(password_list: Path) -> None:
+    """verifies that listed passwords match case-insensitively and others do not."""
+    assert build_filter(password_list) == 2001
+    with BreachFilter.open(filter_path_for(password_list)) as breach_filter:
+        assert len(breach_filter) == 2001
+        assert "password" in breach_filter
+        assert "leaked1999!" in breach_filter
+        assert "LEAKED7!" in breach_filter
+        assert not any(f"Unlisted{number}?" in breach_filter for number in range(5000))
+
+
+def test_chunked_build_matches(password_list: Path, tmp_path: Path) -> None:
+    """verifies that spilling sorted runs to disk gives the same file."""
+    single = tmp_path / "single.filter"
+    chunked = tmp_path / "chunked.filter"
+    build_filter(password_list, single)
+    build_filter(password_list, chunked, chunk_keys=7)
+    assert single.read_bytes() == chunked.read_bytes()
+
+
+def test_stale_filter_is_ignored(password_list: Path) -> None:
+    """verifies that a filter built from an older list is not used for it."""
+    build_filter(password_list)
+    with password_list.open("a") as handle:
+        handle.write("newleak\n")
+    stat = password_list.stat()
+    os.utime(password_list, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert BreachFilter.open_for_list(password_list) is None
+    policy = PasswordPolicy(weak_passwords_path=password_list)
+    assert not policy.validate("alice", "NewLeak").is_valid
+    assert "blacklist" in policy.validate("alice", "newleak").violations[-1]
+
+
+def test_policy_uses_compiled_filter(password_list: Path, tmp_path: Path) -> None:
+    """verifies that the policy screens against a filter without its text list."""
+    corpus = tmp_path / "corpus.filter"
+    build_filter(password_list, corpus)
+    policy = PasswordPolicy(weak_passwords=[], breach_filter_path=corpus)
+    result = policy.validate("alice", "Leaked42!")
+    assert result.violations == ["Password appears on the weak password blacklist."]
+    assert policy.validate("alice", "Unlisted4!").is_valid
+    with pytest.raises(ValueError):
+        PasswordPolicy(breach_filter_path=password_list).validate("alice", "Unlisted4!")
+
+
+def test_list_and_filter_normalize_alike(password_list: Path) -> None:
+    """verifies that the plain list and its compiled filter match the same
+    candidates, whitespace and case included."""
+    candidates = ["password", "  PASSWORD ", "Leaked7!", " leaked7! ", "Unlisted4!"]
+    plain = PasswordPolicy(weak_passwords_path=password_list, registry=PolicyResourceRegistry())
+    expected = [bool(plain.validate("alice", c).codes & VIOLATION_BLACKLIST) for c in candidates]
+    build_filter(password_list)
+    compiled = PasswordPolicy(weak_passwords_path=password_list, registry=PolicyResourceRegistry())
+    assert [
+        bool(compiled.validate("alice", c).codes & VIOLATION_BLACKLIST) for c in candidates
+    ] == expected == [True, True, True, True, False]
+    given = PasswordPolicy(weak_passwords=password_list.read_text().splitlines())
+    assert [
+        bool(given.validate("alice", c).codes & VIOLATION_BLACKLIST) for c in candidates
+    ] == expected
+
+
+def test_build_command(password_list: Path, capsys) -> None:
+    """verifies that the build command writes the filter next to the list."""
+    assert main(["build", str(password_list)]) == 0
+    assert "Compiled 2001 passwords" in capsys.readouterr().out
+    assert BreachFilter.open_for_list(password_list) is not None
+    assert main(["build", str(password_list.with_name("missing.txt"))]) == 1
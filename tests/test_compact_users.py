@@ -0,0 +1,47 @@
+"""Tests for compact user records with decoded hashes."""
+
+import sys
+
+from justinvest.authentication import CredentialStore, compact_user, verify_compact
+from justinvest.hashing import HashingPool
+from justinvest.repository import load_compact_users, load_users
+
+
+def test_compact_users_match_full_records() -> None:
+    """verifies that compact records round-trip to the loaded user records."""
+    users = load_users()
+    compact = load_compact_users()
+    assert [user.to_user_record() for user in compact] == users
+    assert all(not hasattr(user, "__dict__") for user in compact)
+    first = compact[0]
+    assert first.password_hash == users[0].password_hash
+    assert first.algorithm == "pbkdf2_sha256" and first.cost == (600_000,)
+    assert len(first.salt) == 16 and len(first.digest) == 32
+
+
+def test_shared_fields_are_interned() -> None:
+    """verifies that role, algorithm and cost are shared between records."""
+    hash_text = "pbkdf2_sha256$1000$" + "00" * 16 + "$" + "11" * 32
+    first = compact_user("alpha", "".join(["cli", "ent"]), hash_text)
+    second = compact_user("beta", "".join(["cli", "ent"]), hash_text, "Beta Person")
+    assert first.role is second.role is sys.intern("client")
+    assert first.cost is second.cost
+    assert first.full_name == "alpha"
+    assert second.full_name == "Beta Person"
+
+
+def test_compact_credential_store() -> None:
+    """verifies that a compact store authenticates with and without a pool."""
+    users = load_users()
+    credentials = CredentialStore(users, compact=True)
+    user = credentials.authenticate("sasha.kim", "Aster!1A")
+    assert (user.username, user.role) == ("sasha.kim", "client")
+    assert credentials.authenticate("sasha.kim", "wrong") is None
+    pool = HashingPool(workers=1)
+    try:
+        pooled = CredentialStore(load_compact_users(), pool=pool, compact=True)
+        assert pooled.authenticate("sasha.kim", "Aster!1A") is not None
+    finally:
+        pool.shutdown()
+    sasha = next(user for user in load_compact_users() if user.username == "sasha.kim")
+    assert verify_compact("Aster!1A", sasha)
@@ -2,12 +2,12 @@
 
 from pathlib import Path
 
-import json
 import pytest
 
-from justinvest.enrollment import EnrollmentError, enroll_user
+from justinvest.enrollment import EnrollmentError, enroll_user, enroll_users, main
 from justinvest.models import ConstraintDefinition, RoleDefinition
 from justinvest.password_policy import PasswordPolicy
+from justinvest.repository import load_users
 
 
 @pytest.fixture()
@@ -57,8 +57,8 @@ def test_successful_enrollment(
     assert passwd_path.read_text(encoding="utf-8").startswith(
         "new.client|client|pbkdf2_sha256$"
     )
-    users = json.loads(users_path.read_text(encoding="utf-8"))
-    assert users["users"][0]["username"] == "new.client"
+    users = load_users(users_path)
+    assert users[0].username == "new.client"
 
 
 def test_duplicate_username(
@@ -118,3 +118,96 @@ def test_weak_password(
             passwd_path=passwd_path,
             users_path=users_path,
         )
+
+
+def test_bulk_enrollment(
+    client_role: RoleDefinition, teller_role: RoleDefinition, files: tuple[Path, Path]
+) -> None:
+    """verifies that bulk enrollment commits good rows and reports each bad one."""
+    passwd_path, users_path = files
+    policy = PasswordPolicy(weak_passwords={"password"})
+    enroll_user(
+        "old.client",
+        client_role,
+        "Valid@123",
+        policy=policy,
+        passwd_path=passwd_path,
+        users_path=users_path,
+    )
+    rows = [
+        ("bulk.one", "client", "Valid@123"),
+        ("bulk.two", "client", "Other@456"),
+        ("bulk.one", "client", "Valid@123"),
+        ("old.client", "client", "Valid@123"),
+        ("weak.one", "client", "password"),
+        ("teller.one", "teller", "Valid@123"),
+        ("ghost.one", "ghost", "Valid@123"),
+        ("bad|name", "client", "Valid@123"),
+    ]
+    report = enroll_users(
+        rows,
+        [client_role, teller_role],
+        policy=policy,
+        passwd_path=passwd_path,
+        users_path=users_path,
+        iterations=1000,
+    )
+    assert [result.username for result in report.enrolled] == ["bulk.one", "bulk.two"]
+    assert [failure.row for failure in report.failures] == [3, 4, 5, 6, 7, 8]
+    assert "already exists" in report.failures[0].reason
+    assert "blacklist" in report.failures[2].reason
+    lines = passwd_path.read_text(encoding="utf-8").splitlines()
+    assert [line.split("|")[0] for line in lines] == ["old.client", "bulk.one", "bulk.two"]
+    assert [user.username for user in load_users(users_path)] == [
+        "old.client",
+        "bulk.one",
+        "bulk.two",
+    ]
+
+
+def test_csv_import_command(files: tuple[Path, Path], tmp_path: Path, capsys) -> None:
+    """verifies that the import entry point reads a CSV and reports failed rows."""
+    passwd_path, users_path = files
+    csv_path = tmp_path / "clients.csv"
+    csv_path.write_text(
+        "username,role,password\n"
+        "csv.client,client,Valid@123\n"
+        "csv.weak,client,short\n",
+        encoding="utf-8",
+    )
+    exit_code = main(
+        ["import", str(csv_path), "--passwd", str(passwd_path), "--users", str(users_path)]
+    )
+    assert exit_code == 1
+    output = capsys.readouterr().out
+    assert "Enrolled 1 users." in output
+    assert "Row 2 (csv.weak)" in output
+    assert load_users(users_path)[0].username == "csv.client"
+
+
+def test_bulk_enrollment_validates_in_one_batch(
+    client_role: RoleDefinition, files: tuple[Path, Path], monkeypatch
+) -> None:
+    """verifies that bulk enrollment checks every password with a single validate_many call."""
+    passwd_path, users_path = files
+    policy = PasswordPolicy(weak_passwords={"password"})
+    batches = []
+    validate_many = policy.validate_many
+
+    def recording_validate_many(pairs):
+        batches.append(list(pairs))
+        return validate_many(batches[-1])
+
+    monkeypatch.setattr(policy, "validate_many", recording_validate_many)
+    monkeypatch.setattr(policy, "validate", None)
+    report = enroll_users(
+        [("batch.one", "client", "Valid@123"), ("batch.two", "client", "password")],
+        [client_role],
+        policy=policy,
+        passwd_path=passwd_path,
+        users_path=users_path,
+        iterations=1000,
+    )
+    assert batches == [[("batch.one", "Valid@123"), ("batch.two", "password")]]
+    assert [result.username for result in report.enrolled] == ["batch.one"]
+    assert "blacklist" in report.failures[0].reason
@@ -0,0 +1,160 @@
+"""Tests for the enrollment log and the consistency checker."""
+
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from justinvest.enrollment import EnrollmentError, enroll_user, enroll_users
+from justinvest.enrollment_log import (
+    EnrollmentLog,
+    EnrollmentLogError,
+    EnrollmentMaterializer,
+    check_consistency,
+    main,
+)
+from justinvest.models import RoleDefinition
+from justinvest.password_file import PasswordRecord, append_records, get_record
+from justinvest.password_policy import PasswordPolicy
+from justinvest.repository import load_users
+from justinvest.user_journal import UserJournal
+
+CLIENT = RoleDefinition(
+    name="client", label="Client", permissions=set(), constraints=[], allow_self_signup=True
+)
+POLICY = PasswordPolicy(weak_passwords=[])
+
+
+def entry(username: str, role: str = "client", password_hash: str = "h") -> dict:
+    return {
+        "username": username,
+        "full_name": username,
+        "role": role,
+        "password_hash": password_hash,
+    }
+
+
+@pytest.fixture()
+def log(tmp_path: Path) -> EnrollmentLog:
+    (tmp_path / "users.json").write_text(json.dumps({"users": []}))
+    return EnrollmentLog(
+        tmp_path / "enrollments.log",
+        passwd_path=tmp_path / "passwd.txt",
+        users_path=tmp_path / "users.json",
+    )
+
+
+def test_enrollment_writes_only_the_log(log: EnrollmentLog) -> None:
+    """verifies that enrolling touches the log alone until it is applied."""
+    result = enroll_user("new.user", CLIENT, "Secure@123", policy=POLICY, log=log)
+    assert result.password_file == log.passwd_path
+    assert not log.passwd_path.exists()
+    assert load_users(log.users_path) == []
+    assert log.pending_entries == 1
+    assert log.get("new.user").password_hash == result.password_hash
+    with pytest.raises(EnrollmentError, match="already exists"):
+        enroll_user("new.user", CLIENT, "Secure@123", policy=POLICY, log=log)
+
+    assert log.apply() == 1
+    assert not log.path.exists()
+    assert get_record("new.user", log.passwd_path).password_hash == result.password_hash
+    assert [user.username for user in load_users(log.users_path)] == ["new.user"]
+    assert check_consistency(log.passwd_path, log.users_path).consistent
+
+
+def test_apply_repairs_a_half_written_entry(log: EnrollmentLog) -> None:
+    """verifies that replaying the log after a crash fills in only what is missing."""
+    log.append(entry("half.done"))
+    append_records([PasswordRecord("half.done", "client", "h")], path=log.passwd_path)
+    restarted = EnrollmentLog(log.path, passwd_path=log.passwd_path, users_path=log.users_path)
+    assert restarted.apply() == 1
+    assert log.passwd_path.read_text().count("half.done") == 1
+    assert [user.username for user in load_users(log.users_path)] == ["half.done"]
+
+
+def test_torn_and_corrupt_lines(log: EnrollmentLog) -> None:
+    """verifies that a torn tail is cut off by the next write and a corrupt
+    line is reported."""
+    log.append(entry("first"))
+    with log.path.open("ab") as handle:
+        handle.write(b'{"username":"sec')
+    assert log.pending_entries == 1
+    log.append(entry("second"))
+    assert log.pending_entries == 2
+    assert log.path.read_bytes().count(b"\n") == 3
+    header = log.path.read_bytes().split(b"\n")[0]
+    log.path.write_bytes(header + b"\nnot json\n")
+    with pytest.raises(EnrollmentLogError, match="corrupt"):
+        log.refresh()
+    log.path.write_bytes(b"not json\n")
+    with pytest.raises(EnrollmentLogError, match="not an enrollment log"):
+        log.refresh()
+
+
+def test_materializer_applies_in_background(log: EnrollmentLog) -> None:
+    """verifies that concurrent enrollments all reach both files."""
+    with EnrollmentMaterializer(log, interval=0.01) as materializer:
+        threads = [
+            threading.Thread(
+                target=enroll_users,
+                args=(
+                    [(f"user{thread}.{row}", "client", "Secure@123") for row in range(5)],
+                    [CLIENT],
+                ),
+                kwargs={"policy": POLICY, "log": log, "iterations": 1},
+            )
+            for thread in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert materializer.applied == 20
+    assert materializer.last_error is None
+    assert len(load_users(log.users_path)) == 20
+    assert check_consistency(log.passwd_path, log.users_path, chunk_size=3).consistent
+
+
+def test_checker_reports_every_kind_of_drift(tmp_path: Path, capsys) -> None:
+    """verifies that the merge join finds missing and mismatched users."""
+    passwd = tmp_path / "passwd.txt"
+    users = tmp_path / "users.json"
+    passwd.write_text("a|client|h\nb|client|h\nb|admin|x\nd|client|h\ne|client|old\n")
+    users.write_text(
+        json.dumps({"users": [entry("a"), entry("c"), entry("d", role="teller"), entry("e")]})
+    )
+    UserJournal(users, compact_threshold=0).append(entry("e", password_hash="old"))
+    report = check_consistency(passwd, users, chunk_size=2)
+    assert (report.passwd_records, report.users_records) == (4, 4)
+    assert report.missing_from_users == ["b"]
+    assert report.missing_from_passwd == ["c"]
+    assert report.mismatched == ["d"]
+    assert not report.consistent
+    assert main(["--passwd", str(passwd), "--users", str(users), "check"]) == 1
+    assert "Missing from users.json: b" in capsys.readouterr().out
+
+
+def test_pending_name_blocks_enrollment_without_a_log(log: EnrollmentLog) -> None:
+    """verifies that a logged but unapplied name cannot be enrolled again directly."""
+    log.append(entry("pending.user", password_hash="logged"))
+    with pytest.raises(EnrollmentError, match="already exists"):
+        enroll_user(
+            "pending.user",
+            CLIENT,
+            "Secure@123",
+            policy=POLICY,
+            passwd_path=log.passwd_path,
+            users_path=log.users_path,
+        )
+    report = enroll_users(
+        [("pending.user", "client", "Secure@123")],
+        [CLIENT],
+        policy=POLICY,
+        passwd_path=log.passwd_path,
+        users_path=log.users_path,
+        iterations=1,
+    )
+    assert not report.enrolled
+    assert get_record("pending.user", log.passwd_path).password_hash == "logged"
+    assert not log.path.exists()
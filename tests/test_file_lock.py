@@ -0,0 +1,125 @@
+"""Tests for cross-process file locking and group-committed enrollment."""
+
+import json
+import multiprocessing
+import threading
+from pathlib import Path
+
+import pytest
+
+from justinvest import enrollment_log
+from justinvest.enrollment_log import EnrollmentLog
+from justinvest.file_lock import file_lock, lock_path_for
+from justinvest.repository import load_users
+from justinvest.user_journal import UserJournal
+
+
+def entry(username: str) -> dict:
+    return {"username": username, "full_name": username, "role": "client", "password_hash": "h"}
+
+
+def bump_counter(path: Path, times: int) -> None:
+    for _ in range(times):
+        with file_lock(path):
+            with file_lock(path):
+                value = int(path.read_text())
+            path.write_text(str(value + 1))
+
+
+def journal_worker(users_path: Path, worker: int, count: int) -> None:
+    journal = UserJournal(users_path, compact_threshold=8)
+    for number in range(count):
+        journal.append(entry(f"w{worker}.{number}"))
+
+
+def run_processes(target, args_list) -> None:
+    processes = [multiprocessing.Process(target=target, args=args) for args in args_list]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+
+def test_lock_excludes_other_processes(tmp_path: Path) -> None:
+    """verifies that read-modify-write under the lock loses no updates."""
+    counter = tmp_path / "counter"
+    counter.write_text("0")
+    run_processes(bump_counter, [(counter, 50) for _ in range(4)])
+    assert counter.read_text() == "200"
+    assert lock_path_for(counter).exists()
+
+
+def test_concurrent_journal_appends_survive_compaction(tmp_path: Path) -> None:
+    """verifies that appends racing with users.json rewrites are all kept."""
+    users = tmp_path / "users.json"
+    users.write_text(json.dumps({"users": []}))
+    run_processes(journal_worker, [(users, worker, 40) for worker in range(4)])
+    assert len(load_users(users)) == 160
+
+
+def test_appends_are_group_committed(tmp_path: Path) -> None:
+    """verifies that concurrent appends share fsyncs and duplicates fail alone."""
+    log = EnrollmentLog(
+        tmp_path / "enrollments.log",
+        passwd_path=tmp_path / "passwd.txt",
+        users_path=tmp_path / "users.json",
+        commit_window=0.05,
+    )
+    errors = []
+    barrier = threading.Barrier(9)
+
+    def append(username: str) -> None:
+        barrier.wait()
+        try:
+            log.append(entry(username))
+        except ValueError as exc:
+            errors.append(str(exc))
+
+    names = [f"user{number}" for number in range(8)] + ["user0"]
+    threads = [threading.Thread(target=append, args=(name,)) for name in names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ["Username 'user0' already exists."]
+    assert log.pending_entries == 8
+    assert log.commits < 8
+    with pytest.raises(ValueError):
+        log.append(entry("user3"))
+
+
+def test_failed_leader_releases_followers(tmp_path: Path, monkeypatch) -> None:
+    """verifies that a leader failing before it commits fails the whole
+    group instead of leaving followers and later appends waiting."""
+    log = EnrollmentLog(
+        tmp_path / "enrollments.log",
+        passwd_path=tmp_path / "passwd.txt",
+        users_path=tmp_path / "users.json",
+        commit_window=0.2,
+    )
+
+    def broken_lock(path: Path):
+        raise OSError("lock directory is read-only")
+
+    monkeypatch.setattr(enrollment_log, "file_lock", broken_lock)
+    errors = []
+
+    def append(username: str) -> None:
+        try:
+            log.append(entry(username))
+        except OSError as exc:
+            errors.append(exc)
+
+    threads = [
+        threading.Thread(target=append, args=(f"user{n}",), daemon=True) for n in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive()
+    assert len(errors) == 3
+    monkeypatch.undo()
+    log.append(entry("user0"))
+    assert log.pending_entries == 1
@@ -0,0 +1,141 @@
+"""Tests for the offline hash-layering migration."""
+
+import json
+import shutil
+import threading
+from pathlib import Path
+from shutil import copyfile
+
+import pytest
+
+from justinvest.authentication import LAYERED_ALGORITHM, verify_password
+from justinvest.hash_migration import (
+    CHECKPOINT_SUFFIX,
+    _iter_passwd_items,
+    layer_hash,
+    migrate,
+    migrate_file,
+)
+from justinvest.hash_params import HashParameters
+from justinvest.hashing import HashingPool
+from justinvest.password_file import add_record, get_record, iter_records
+from justinvest.password_index import PasswordIndex, build_index
+from justinvest.repository import load_users
+from justinvest.user_journal import UserJournal
+
+OUTER = (2**8, 8, 1)
+PLAIN = HashParameters(iterations=1000, salt_bytes=8)
+
+
+@pytest.fixture()
+def pool():
+    pool = HashingPool(workers=2)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture()
+def files(tmp_path: Path):
+    passwd = tmp_path / "passwd.txt"
+    users = tmp_path / "users.json"
+    entries = []
+    for number in range(7):
+        username = f"user{number}"
+        record = add_record(username, "client", f"Secret@{number}", path=passwd, iterations=1000)
+        entries.append(
+            {
+                "username": username,
+                "full_name": f"User {number}",
+                "role": "client",
+                "password_hash": record.password_hash,
+            }
+        )
+    scrypt_hash = HashParameters(scheme="scrypt", scrypt_n=2**8).hash("Secret@9")
+    add_record("user9", "client", "unused", path=passwd, iterations=1000)
+    users.write_text(json.dumps({"users": entries[:5]}, indent=2) + "\n")
+    UserJournal(users).extend(entries[5:])
+    UserJournal(users).append(
+        {"username": "user9", "full_name": "User 9", "role": "client", "password_hash": scrypt_hash}
+    )
+    return passwd, users, scrypt_hash
+
+
+def test_layered_hash_verifies_with_original_password() -> None:
+    """verifies that a layered hash accepts exactly the old password."""
+    layered = layer_hash(PLAIN.hash("Secure@123"), OUTER)
+    assert layered.startswith(f"{LAYERED_ALGORITHM}$1000:256:8:1$")
+    assert verify_password("Secure@123", layered)
+    assert not verify_password("wrong", layered)
+    assert layer_hash(layered, OUTER) == layered
+
+
+def test_migrate_layers_every_file(files, pool) -> None:
+    """verifies that passwd.txt, users.json and the journal are all upgraded."""
+    passwd, users, scrypt_hash = files
+    build_index(passwd)
+    reports = migrate(passwd_path=passwd, users_path=users, outer_cost=OUTER, pool=pool)
+    assert [report.upgraded for report in reports] == [8, 5, 2]
+    assert all(report.finished for report in reports)
+    for record in iter_records(passwd):
+        assert record.password_hash.startswith(LAYERED_ALGORITHM)
+    assert verify_password("Secret@3", get_record("user3", passwd).password_hash)
+    by_name = {user.username: user for user in load_users(users)}
+    assert verify_password("Secret@6", by_name["user6"].password_hash)
+    assert by_name["user9"].password_hash == scrypt_hash
+    assert by_name["user0"].full_name == "User 0"
+    assert json.loads(users.read_text())["users"][0]["username"] == "user0"
+    with PasswordIndex.open(passwd) as index:
+        assert index.find_line("user4").startswith("user4|")
+    assert not list(passwd.parent.glob(f"*{CHECKPOINT_SUFFIX}"))
+
+
+def test_interrupted_migration_resumes(files, pool, tmp_path: Path) -> None:
+    """verifies that a checkpointed run picks up where it stopped."""
+    passwd, _, _ = files
+    reference = tmp_path / "reference.txt"
+    copyfile(passwd, reference)
+    migrate_file(reference, _iter_passwd_items, outer_cost=OUTER, pool=pool)
+
+    first = migrate_file(
+        passwd, _iter_passwd_items, outer_cost=OUTER, pool=pool, batch_size=3, max_batches=1
+    )
+    assert (first.finished, first.records) == (False, 3)
+    assert passwd.with_name(passwd.name + CHECKPOINT_SUFFIX).exists()
+    assert get_record("user0", passwd).password_hash.startswith("pbkdf2_sha256$")
+    second = migrate_file(passwd, _iter_passwd_items, outer_cost=OUTER, pool=pool, batch_size=3)
+    assert (second.finished, second.resumed_from, second.records) == (True, 3, 8)
+    assert passwd.read_bytes() == reference.read_bytes()
+
+
+def test_changed_source_restarts(files, pool) -> None:
+    """verifies that a checkpoint for an older version of the file is ignored."""
+    passwd, _, _ = files
+    migrate_file(
+        passwd, _iter_passwd_items, outer_cost=OUTER, pool=pool, batch_size=3, max_batches=1
+    )
+    add_record("late", "client", "Late@1234", path=passwd, iterations=1000)
+    report = migrate_file(passwd, _iter_passwd_items, outer_cost=OUTER, pool=pool)
+    assert (report.resumed_from, report.upgraded) == (0, 9)
+    assert verify_password("Late@1234", get_record("late", passwd).password_hash)
+
+
+def test_append_during_commit_is_not_lost(files, pool, monkeypatch) -> None:
+    """verifies that an append racing the final rename waits for it instead of being lost."""
+    passwd, _, _ = files
+    appender = threading.Thread(
+        target=add_record,
+        args=("late", "client", "Late@1234"),
+        kwargs={"path": passwd, "iterations": 1000},
+    )
+    copymode = shutil.copymode
+
+    def racing_copymode(source, target):
+        appender.start()
+        appender.join(timeout=0.5)
+        copymode(source, target)
+
+    monkeypatch.setattr(shutil, "copymode", racing_copymode)
+    report = migrate_file(passwd, _iter_passwd_items, outer_cost=OUTER, pool=pool)
+    appender.join()
+    assert report.finished
+    assert verify_password("Late@1234", get_record("late", passwd).password_hash)
@@ -0,0 +1,193 @@
+"""Tests for hash parameters, calibration and rehash-on-login."""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from justinvest.access_control import AccessControlEngine
+from justinvest.authentication import AuthenticationError, verify_password
+from justinvest.hash_params import (
+    MIN_PBKDF2_ITERATIONS,
+    HashParameters,
+    calibrate,
+    load_hash_parameters,
+    main,
+    save_hash_parameters,
+)
+from justinvest import login as login_module
+from justinvest.login import perform_login
+from justinvest.password_file import add_record, get_record, replace_password_hash
+from justinvest.password_index import PasswordIndex, build_index
+from justinvest.repository import load_roles, load_users
+from justinvest.user_journal import journal_path_for
+
+FAST_SCRYPT = HashParameters(scheme="scrypt", scrypt_n=2**10, scrypt_r=8, scrypt_p=1)
+
+
+def test_scrypt_hashes_verify() -> None:
+    """verifies that scrypt hashes are produced and checked."""
+    stored = FAST_SCRYPT.hash("Secure@123")
+    assert stored.startswith("scrypt$1024:8:1$")
+    assert verify_password("Secure@123", stored)
+    assert not verify_password("wrong", stored)
+
+
+def test_unknown_scheme_is_rejected() -> None:
+    """verifies that unsupported algorithms fail loudly."""
+    with pytest.raises(AuthenticationError):
+        verify_password("x", "md5$1$00$00")
+    with pytest.raises(ValueError):
+        HashParameters(scheme="md5")
+
+
+def test_is_current() -> None:
+    """verifies that only hashes with matching scheme and cost are current."""
+    params = HashParameters(iterations=1000, salt_bytes=8)
+    assert params.is_current(params.hash("pw"))
+    assert not HashParameters(iterations=2000, salt_bytes=8).is_current(params.hash("pw"))
+    assert not FAST_SCRYPT.is_current(params.hash("pw"))
+
+
+def test_parameters_round_trip(tmp_path: Path) -> None:
+    """verifies that saved parameters load back and defaults apply when absent."""
+    path = tmp_path / "hash_params.json"
+    assert load_hash_parameters(path) == HashParameters()
+    save_hash_parameters(FAST_SCRYPT, path)
+    assert load_hash_parameters(path) == FAST_SCRYPT
+
+
+def test_parameters_are_cached_until_the_file_changes(tmp_path: Path, monkeypatch) -> None:
+    """verifies that loads reuse the parsed file until it is edited."""
+    path = tmp_path / "hash_params.json"
+    save_hash_parameters(FAST_SCRYPT, path)
+    first = load_hash_parameters(path)
+    monkeypatch.setattr(Path, "read_text", lambda *args, **kwargs: pytest.fail("re-read"))
+    assert load_hash_parameters(path) is first
+    monkeypatch.undo()
+    path.write_text('{"scheme": "pbkdf2_sha256", "iterations": 123456}\n', encoding="utf-8")
+    assert load_hash_parameters(path).iterations == 123456
+
+
+def test_calibrate_respects_floor() -> None:
+    """verifies that calibration never goes below the minimum cost."""
+    params, elapsed = calibrate(0.001, rounds=1)
+    assert params.scheme == "pbkdf2_sha256"
+    assert params.iterations == MIN_PBKDF2_ITERATIONS
+    assert elapsed > 0
+
+
+def test_calibrate_command_writes(tmp_path: Path, capsys) -> None:
+    """verifies that the calibrate command saves its choice when asked."""
+    path = tmp_path / "hash_params.json"
+    argv = ["calibrate", "--target-ms", "1", "--rounds", "1", "--write", "--path", str(path)]
+    assert main(argv) == 0
+    assert json.loads(path.read_text())["iterations"] == MIN_PBKDF2_ITERATIONS
+    assert "Calibrated" in capsys.readouterr().out
+
+
+def test_replace_hash_in_place_keeps_index(tmp_path: Path) -> None:
+    """verifies that a same-length hash is overwritten without moving lines."""
+    passwd = tmp_path / "passwd.txt"
+    for name in ("alice", "bob", "carol"):
+        add_record(name, "client", "Secure@123", path=passwd, iterations=1000, salt_bytes=8)
+    build_index(passwd)
+    inode = passwd.stat().st_ino
+    new_hash = HashParameters(iterations=1001, salt_bytes=8).hash("Secure@123")
+    assert replace_password_hash("bob", new_hash, path=passwd)
+    assert passwd.stat().st_ino == inode
+    with PasswordIndex.open(passwd) as index:
+        assert index.find_line("carol").startswith("carol|")
+    assert get_record("bob", passwd).password_hash == new_hash
+    assert not replace_password_hash("dave", new_hash, path=passwd)
+
+
+def test_replace_hash_with_new_length_rewrites(tmp_path: Path) -> None:
+    """verifies that a longer hash rewrites the file and rebuilds the index."""
+    passwd = tmp_path / "passwd.txt"
+    for name in ("alice", "bob", "carol"):
+        add_record(name, "client", "Secure@123", path=passwd, iterations=1000, salt_bytes=8)
+    build_index(passwd)
+    new_hash = FAST_SCRYPT.hash("Secure@123")
+    assert replace_password_hash("alice", new_hash, path=passwd)
+    assert get_record("alice", passwd).password_hash == new_hash
+    assert get_record("carol", passwd).role == "client"
+    assert PasswordIndex.open(passwd) is not None
+
+
+def test_login_upgrades_outdated_hash(tmp_path: Path) -> None:
+    """verifies that a successful login rewrites an outdated hash in both files."""
+    passwd = tmp_path / "passwd.txt"
+    users = tmp_path / "users.json"
+    record = add_record("sasha.kim", "client", "Secure@123", path=passwd, iterations=1000)
+    users.write_text(
+        json.dumps(
+            {
+                "users": [
+                    {
+                        "username": "sasha.kim",
+                        "full_name": "Sasha Kim",
+                        "role": "client",
+                        "password_hash": record.password_hash,
+                    }
+                ]
+            }
+        )
+    )
+    roles = load_roles()
+    engine = AccessControlEngine(roles)
+
+    def login(password: str):
+        return perform_login(
+            "sasha.kim",
+            password,
+            engine,
+            roles=roles,
+            passwd_path=passwd,
+            as_of=datetime(2025, 1, 1, 10, 0),
+            rehash=FAST_SCRYPT,
+            users_path=users,
+        )
+
+    login("Secure@123")
+    upgraded = get_record("sasha.kim", passwd).password_hash
+    assert FAST_SCRYPT.is_current(upgraded)
+    (user,) = load_users(users)
+    assert user.password_hash == upgraded
+    assert user.full_name == "Sasha Kim"
+    login("Secure@123")
+    assert get_record("sasha.kim", passwd).password_hash == upgraded
+
+
+def test_custom_passwd_leaves_default_users_alone(tmp_path: Path, monkeypatch) -> None:
+    """verifies that upgrading a hash in a custom passwd.txt never writes the default users.json."""
+    passwd = tmp_path / "passwd.txt"
+    default_users = tmp_path / "default" / "users.json"
+    default_users.parent.mkdir()
+    record = add_record("sasha.kim", "client", "Secure@123", path=passwd, iterations=1000)
+    payload = {
+        "users": [
+            {
+                "username": "sasha.kim",
+                "full_name": "Sasha Kim",
+                "role": "client",
+                "password_hash": record.password_hash,
+            }
+        ]
+    }
+    default_users.write_text(json.dumps(payload))
+    monkeypatch.setattr(login_module, "DEFAULT_USERS_PATH", default_users)
+    roles = load_roles()
+    perform_login(
+        "sasha.kim",
+        "Secure@123",
+        AccessControlEngine(roles),
+        roles=roles,
+        passwd_path=passwd,
+        as_of=datetime(2025, 1, 1, 10, 0),
+        rehash=FAST_SCRYPT,
+    )
+    assert FAST_SCRYPT.is_current(get_record("sasha.kim", passwd).password_hash)
+    assert load_users(default_users)[0].password_hash == record.password_hash
+    assert not journal_path_for(default_users).exists()
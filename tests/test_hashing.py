@@ -0,0 +1,87 @@
+"""Tests for the shared hashing pool."""
+
+import threading
+from datetime import datetime
+from pathlib import Path
+from shutil import copyfile
+
+import pytest
+
+from justinvest.access_control import AccessControlEngine
+from justinvest.authentication import AuthenticationError, CredentialStore
+from justinvest.credentials import hash_password
+from justinvest.hashing import HashingPool, HashingPoolSaturated
+from justinvest.login import LoginError, perform_login
+from justinvest.repository import load_roles, load_users
+
+
+@pytest.fixture()
+def pool():
+    pool = HashingPool(workers=2, max_pending=2)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def test_verify_many(pool: HashingPool) -> None:
+    """verifies that batch verification returns results in input order."""
+    stored = hash_password("Secure@123", iterations=1000, salt_bytes=8)
+    results = pool.verify_many(
+        [("Secure@123", stored), ("wrong", stored), ("Secure@123", stored)] * 2
+    )
+    assert results == [True, False, True] * 2
+    stats = pool.stats()
+    assert stats.completed == 6
+    assert stats.queue_depth == 0
+    assert stats.rejected == 0
+
+
+def test_saturated_pool_rejects_quickly(pool: HashingPool) -> None:
+    """verifies that submissions beyond the queue bound fail instead of waiting."""
+    release = threading.Event()
+    blockers = [pool.submit(release.wait) for _ in range(2)]
+    with pytest.raises(HashingPoolSaturated):
+        pool.verify("Secure@123", "pbkdf2_sha256$1000$00$00")
+    assert pool.stats().rejected == 1
+    assert pool.stats().in_flight == 2
+    release.set()
+    for blocker in blockers:
+        blocker.result()
+
+
+def test_login_reports_busy_pool(pool: HashingPool, tmp_path: Path) -> None:
+    """verifies that a saturated pool turns into a distinct login error."""
+    passwd = tmp_path / "passwd.txt"
+    copyfile(Path(__file__).resolve().parents[1] / "passwd.txt", passwd)
+    roles = load_roles()
+    engine = AccessControlEngine(roles)
+    release = threading.Event()
+    blockers = [pool.submit(release.wait) for _ in range(2)]
+    with pytest.raises(LoginError, match="busy"):
+        perform_login("sasha.kim", "Aster!1A", engine, roles=roles, passwd_path=passwd, pool=pool)
+    release.set()
+    for blocker in blockers:
+        blocker.result()
+    result = perform_login(
+        "sasha.kim",
+        "Aster!1A",
+        engine,
+        roles=roles,
+        passwd_path=passwd,
+        pool=pool,
+        as_of=datetime(2025, 1, 1, 10, 0),
+    )
+    assert result.role_name == "client"
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_credential_store_reports_busy_pool(pool: HashingPool, compact: bool) -> None:
+    """verifies that a saturated pool fails authenticate with a retry message."""
+    credentials = CredentialStore(load_users(), pool=pool, compact=compact)
+    release = threading.Event()
+    blockers = [pool.submit(release.wait) for _ in range(2)]
+    with pytest.raises(AuthenticationError, match="busy"):
+        credentials.authenticate("sasha.kim", "Aster!1A")
+    release.set()
+    for blocker in blockers:
+        blocker.result()
+    assert credentials.authenticate("sasha.kim", "Aster!1A") is not None
@@ -1,11 +1,17 @@
 """Tests for the passwd.txt helper functions."""
 
+import os
 from pathlib import Path
 from shutil import copyfile
 
 import pytest
 
-from justinvest.password_file import add_record, get_record, verify_credentials
+from justinvest.password_file import (
+    PasswordStore,
+    add_record,
+    get_record,
+    verify_credentials,
+)
 
 
 @pytest.fixture()
@@ -50,3 +56,80 @@ def test_add_record_duplicate(passwd_file: Path) -> None:
     with pytest.raises(ValueError):
         add_record("sasha.kim", "client", "Another@123", path=passwd_file)
 
+
+
+def test_password_store_lookup(passwd_file: Path) -> None:
+    """verifies that the in-memory store finds and verifies users without rescanning."""
+    store = PasswordStore(passwd_file)
+    record = store.get("sasha.kim")
+    assert record is not None
+    assert record.role == "client"
+    assert store.verify("sasha.kim", "Aster!1A")
+    assert not store.verify("sasha.kim", "wrongpass")
+    assert store.get("unknown") is None
+    assert get_record("sasha.kim", store=store) == record
+
+
+def test_password_store_reloads_on_change(passwd_file: Path) -> None:
+    """verifies that the store picks up records written behind its back."""
+    store = PasswordStore(passwd_file)
+    assert "new.user" not in store
+    add_record(
+        "new.user", "client", "Secure@123", path=passwd_file, iterations=1000, salt_bytes=8
+    )
+    assert "new.user" in store
+    passwd_file.write_text("only.user|teller|pbkdf2_sha256$1$00$00\n", encoding="utf-8")
+    assert "new.user" not in store
+    assert len(store) == 1
+
+
+def test_password_store_add_duplicate(passwd_file: Path) -> None:
+    """verifies that adding through the store rejects existing usernames."""
+    store = PasswordStore(passwd_file)
+    store.add("store.user", "client", "Secure@123", iterations=1000, salt_bytes=8)
+    assert store.get("store.user") is not None
+    with pytest.raises(ValueError):
+        store.add("store.user", "client", "Secure@123", iterations=1000, salt_bytes=8)
+
+
+def test_password_store_reads_only_appended_bytes(passwd_file: Path) -> None:
+    """verifies that appends are parsed from the saved offset instead of from scratch."""
+    store = PasswordStore(passwd_file)
+    assert store.get("sasha.kim") is not None
+    with passwd_file.open("a", encoding="utf-8") as handle:
+        handle.write("\ntail.user|client|pbkdf2_sha256$1000$00$00")
+    record = store.get("tail.user")
+    assert record is not None and record.role == "client"
+    with passwd_file.open("a", encoding="utf-8") as handle:
+        handle.write("11\n")
+    assert store.get("tail.user").password_hash == "pbkdf2_sha256$1000$00$0011"
+    assert store.offset == passwd_file.stat().st_size
+
+
+def test_password_store_rebuilds_after_replace(passwd_file: Path, tmp_path: Path) -> None:
+    """verifies that a file swapped in under a new inode triggers a full rebuild."""
+    store = PasswordStore(passwd_file)
+    assert store.get("sasha.kim") is not None
+    replacement = tmp_path / "replacement.txt"
+    replacement.write_text(
+        "first.user|client|pbkdf2_sha256$1$00$00\n"
+        "second.user|teller|pbkdf2_sha256$1$00$00\n"
+        + "x" * 4096
+        + "|client|pbkdf2_sha256$1$00$00\n",
+        encoding="utf-8",
+    )
+    os.replace(replacement, passwd_file)
+    assert store.get("sasha.kim") is None
+    assert store.get("second.user").role == "teller"
+
+
+def test_get_record_stops_at_first_match(tmp_path: Path) -> None:
+    """verifies that lookups stream the file and never decode lines past the match."""
+    passwd = tmp_path / "passwd.txt"
+    passwd.write_bytes(
+        b"first.user|client|pbkdf2_sha256$1$00$00\r\n"
+        b"\xff\xfe not utf-8 |teller|x\n"
+    )
+    record = get_record("first.user", passwd)
+    assert record is not None
+    assert record.password_hash == "pbkdf2_sha256$1$00$00"
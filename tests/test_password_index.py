@@ -0,0 +1,94 @@
+"""Tests for the on-disk passwd.txt index."""
+
+import os
+from pathlib import Path
+from shutil import copyfile
+
+import pytest
+
+from justinvest.password_file import add_record, get_record, main
+from justinvest.password_index import PasswordIndex, build_index, index_path_for
+
+
+@pytest.fixture()
+def passwd_file(tmp_path: Path) -> Path:
+    src = Path(__file__).resolve().parents[1] / "passwd.txt"
+    dest = tmp_path / "passwd.txt"
+    copyfile(src, dest)
+    return dest
+
+
+def test_reindex_command(passwd_file: Path, capsys) -> None:
+    """verifies that the reindex entry point writes an index next to passwd.txt."""
+    assert main(["reindex", str(passwd_file)]) == 0
+    assert index_path_for(passwd_file).exists()
+    assert "Indexed" in capsys.readouterr().out
+
+
+def test_indexed_lookup(passwd_file: Path) -> None:
+    """verifies that every record is found through the index."""
+    build_index(passwd_file)
+    for line in passwd_file.read_text(encoding="utf-8").splitlines():
+        username = line.split("|", 1)[0]
+        record = get_record(username, passwd_file)
+        assert record is not None
+        assert record.username == username
+    assert get_record("unknown", passwd_file) is None
+
+
+def test_add_record_extends_index(passwd_file: Path) -> None:
+    """verifies that add_record keeps the index covering the whole file."""
+    build_index(passwd_file)
+    add_record("new.user", "client", "Secure@123", path=passwd_file, iterations=1000, salt_bytes=8)
+    with PasswordIndex.open(passwd_file) as index:
+        assert index._indexed_size == passwd_file.stat().st_size
+        assert index.find_line("new.user").startswith("new.user|client|")
+    with pytest.raises(ValueError):
+        add_record("new.user", "client", "Secure@123", path=passwd_file, iterations=1000, salt_bytes=8)
+
+
+def test_unindexed_appends_are_scanned(passwd_file: Path) -> None:
+    """verifies that lines appended without updating the index are still found."""
+    build_index(passwd_file)
+    with passwd_file.open("a", encoding="utf-8") as handle:
+        handle.write("\nraw.user|teller|pbkdf2_sha256$1$00$00\n")
+    assert get_record("raw.user", passwd_file).role == "teller"
+
+
+def test_add_record_after_unindexed_append(passwd_file: Path) -> None:
+    """verifies that an index lagging the file is not extended over the gap."""
+    build_index(passwd_file)
+    with passwd_file.open("a", encoding="utf-8") as handle:
+        handle.write("\nraw.user|teller|pbkdf2_sha256$1$00$00\n")
+    add_record("new.user", "client", "Secure@123", path=passwd_file, iterations=1000, salt_bytes=8)
+    assert get_record("raw.user", passwd_file).role == "teller"
+    assert get_record("new.user", passwd_file).role == "client"
+    with pytest.raises(ValueError):
+        add_record("raw.user", "client", "Secure@123", path=passwd_file, iterations=1000, salt_bytes=8)
+    assert passwd_file.read_text(encoding="utf-8").count("raw.user|") == 1
+    with PasswordIndex.open(passwd_file) as index:
+        assert index._indexed_size == passwd_file.stat().st_size
+        assert index.find_line("raw.user").startswith("raw.user|teller|")
+
+
+def test_stale_index_is_ignored(passwd_file: Path, tmp_path: Path) -> None:
+    """verifies that an index for a replaced file falls back to a plain scan."""
+    build_index(passwd_file)
+    replacement = tmp_path / "replacement.txt"
+    replacement.write_text("only.user|client|pbkdf2_sha256$1$00$00\n", encoding="utf-8")
+    os.replace(replacement, passwd_file)
+    assert PasswordIndex.open(passwd_file) is None
+    assert get_record("only.user", passwd_file) is not None
+    assert get_record("sasha.kim", passwd_file) is None
+
+
+def test_rewrite_in_place_is_detected(passwd_file: Path) -> None:
+    """verifies that a rewrite keeping the inode but moving lines is not trusted."""
+    build_index(passwd_file)
+    inode = passwd_file.stat().st_ino
+    original = passwd_file.read_text(encoding="utf-8")
+    passwd_file.write_text("first.user|client|pbkdf2_sha256$1$00$00\n" + original)
+    assert passwd_file.stat().st_ino == inode
+    assert PasswordIndex.open(passwd_file) is None
+    assert get_record("first.user", passwd_file).role == "client"
+    assert get_record("sasha.kim", passwd_file) is not None
@@ -67,3 +67,78 @@ def test_valid_password(policy: PasswordPolicy) -> None:
     result = policy.validate("alice", "Valid@123")
     assert result.is_valid
 
+
+
+def reference_violations(policy: PasswordPolicy, username: str, password: str) -> list[str]:
+    """the rule-by-rule checks validate used to make."""
+    expected = []
+    if password != password.strip():
+        expected.append("whitespace")
+    if not policy.min_length <= len(password) <= policy.max_length:
+        expected.append("between")
+    if not any(c.islower() for c in password):
+        expected.append("lowercase")
+    if not any(c.isupper() for c in password):
+        expected.append("uppercase")
+    if not any(c.isdigit() for c in password):
+        expected.append("digit")
+    if not any(c in policy.special_characters for c in password):
+        expected.append("special")
+    if username and password.lower() == username.lower():
+        expected.append("username")
+    if password.lower() in {"password", "letmein", "12345678"}:
+        expected.append("blacklist")
+    return expected
+
+
+SAMPLES = [
+    ("alice", "Valid@123"),
+    ("alice", "Ab1!"),
+    ("alice", " Valid@123"),
+    ("alice", "abcdefgh"),
+    ("alice", "UPPER123!"),
+    ("alice", "Alice"),
+    ("alice", "password"),
+    ("", "12345678"),
+    ("bob", "Ünïcödé@1"),
+    ("bob", "ÉCOLE٣!ok"),
+    ("bob", "x" * 40),
+]
+
+
+def test_validate_many_matches_validate(policy: PasswordPolicy) -> None:
+    """verifies that batch codes give the same messages, in the same order."""
+    batch = policy.validate_many(SAMPLES, chunk_size=3)
+    assert len(batch) == len(SAMPLES)
+    for position, (username, password) in enumerate(SAMPLES):
+        single = policy.validate(username, password)
+        assert batch.messages(position) == single.violations
+        assert batch.codes[position] == single.codes
+        assert batch.is_valid(position) == single.is_valid
+        expected = reference_violations(policy, username, password)
+        assert len(single.violations) == len(expected)
+        for message, keyword in zip(single.violations, expected):
+            assert keyword in message
+    assert batch.valid_count == 3
+
+
+def test_short_circuit_reports_first_failure(policy: PasswordPolicy) -> None:
+    """verifies that short-circuit mode keeps only the cheapest failing rule."""
+    full = policy.validate_many(SAMPLES)
+    short = policy.validate_many(SAMPLES, short_circuit=True)
+    for full_code, short_code in zip(full.codes, short.codes):
+        assert bool(full_code) == bool(short_code)
+        assert short_code & (short_code - 1) == 0
+        assert full_code & short_code == short_code
+    assert short.messages(6) == ["Password must include at least one uppercase letter."]
+
+
+def test_classifier_is_shared_per_special_set() -> None:
+    """verifies that policies reuse the compiled classifier for their specials."""
+    first, second = PasswordPolicy(weak_passwords=[]), PasswordPolicy(weak_passwords=[])
+    custom = PasswordPolicy(weak_passwords=[], special_characters="?")
+    assert first._class_table is second._class_table
+    assert custom._class_table is not first._class_table
+    assert custom.validate("alice", "Abcdef1?").is_valid
+    assert not custom.validate("alice", "Abcdef1!").is_valid
+    assert first.validate("alice", "Abcdef1!").is_valid
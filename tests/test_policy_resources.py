@@ -0,0 +1,69 @@
+"""Tests for the shared policy resource registry."""
+
+import os
+from pathlib import Path
+
+from justinvest.breach_filter import BreachFilter, build_filter
+from justinvest.password_policy import PasswordPolicy
+from justinvest.policy_resources import PolicyResourceRegistry
+
+
+def touch_later(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_policies_share_one_lazy_load(tmp_path: Path) -> None:
+    """verifies that the list is read on first use and then shared."""
+    weak = tmp_path / "weak.txt"
+    weak.write_text("letmein\npassword\n")
+    registry = PolicyResourceRegistry()
+    first = PasswordPolicy(weak_passwords_path=weak, registry=registry)
+    second = PasswordPolicy(weak_passwords_path=weak, registry=registry)
+    assert registry.stats() == {}
+    assert not first.validate("alice", "Password").is_valid
+    assert not second.validate("bob", "LetMeIn").is_valid
+    stats = registry.stats()[("list", weak)]
+    assert (stats.kind, stats.loads, stats.entries) == ("list", 1, 2)
+    assert stats.hits >= 1
+    assert stats.last_load_seconds > 0
+    assert registry.weak_passwords(weak) is registry.weak_passwords(weak)
+
+
+def test_changed_list_is_reloaded(tmp_path: Path) -> None:
+    """verifies that editing the list invalidates the cached copy."""
+    weak = tmp_path / "weak.txt"
+    weak.write_text("letmein\n")
+    registry = PolicyResourceRegistry()
+    policy = PasswordPolicy(weak_passwords_path=weak, registry=registry)
+    assert policy.validate("alice", "Fresh@123").is_valid
+    weak.write_text("letmein\nfresh@123\n")
+    touch_later(weak)
+    assert not policy.validate("alice", "Fresh@123").is_valid
+    assert registry.stats()[("list", weak)].loads == 2
+
+
+def test_compiled_filter_is_picked_up(tmp_path: Path) -> None:
+    """verifies that building a filter next to the list switches to it."""
+    weak = tmp_path / "weak.txt"
+    weak.write_text("letmein\n")
+    registry = PolicyResourceRegistry()
+    assert isinstance(registry.weak_passwords(weak), frozenset)
+    build_filter(weak)
+    assert isinstance(registry.weak_passwords(weak), BreachFilter)
+    registry.clear()
+    assert registry.stats() == {}
+
+
+def test_stats_keep_list_and_filter_apart(tmp_path: Path) -> None:
+    """verifies that one path used as a list and as a filter reports both."""
+    weak = tmp_path / "weak.txt"
+    weak.write_text("letmein\n")
+    corpus = tmp_path / "corpus.filter"
+    build_filter(weak, corpus)
+    registry = PolicyResourceRegistry()
+    registry.weak_passwords(corpus)
+    registry.breach_filter(corpus)
+    stats = registry.stats()
+    assert set(stats) == {("list", corpus), ("filter", corpus)}
+    assert stats[("filter", corpus)].entries == 1
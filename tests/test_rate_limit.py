@@ -0,0 +1,125 @@
+"""Tests for login rate limiting."""
+
+import threading
+from datetime import datetime
+from pathlib import Path
+from shutil import copyfile
+
+import pytest
+
+from justinvest.access_control import AccessControlEngine
+from justinvest.login import LoginError, LoginRateLimited, perform_login
+from justinvest.rate_limit import LoginRateLimiter, RateLimitExceeded, TokenBucketTable
+from justinvest.repository import load_roles
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def passwd_file(tmp_path: Path) -> Path:
+    src = Path(__file__).resolve().parents[1] / "passwd.txt"
+    dest = tmp_path / "passwd.txt"
+    copyfile(src, dest)
+    return dest
+
+
+def test_bucket_allows_burst_then_refills() -> None:
+    """verifies that a bucket spends its burst and then refills at its rate."""
+    clock = FakeClock()
+    table = TokenBucketTable(rate=1.0, burst=3, clock=clock)
+    assert [table.take("alice") for _ in range(4)] == [True, True, True, False]
+    assert table.take("bob")
+    clock.now += 1.0
+    assert table.take("alice")
+    assert not table.take("alice")
+
+
+def test_refilled_buckets_are_dropped() -> None:
+    """verifies that keys carry no state once their bucket is full again."""
+    clock = FakeClock()
+    table = TokenBucketTable(rate=1.0, burst=2, clock=clock)
+    for key in ("a", "b", "c"):
+        table.take(key)
+    assert len(table) == 3
+    clock.now += 5.0
+    table.take("d")
+    assert len(table) == 1
+
+
+def test_table_never_exceeds_max_keys() -> None:
+    """verifies that the least recently used keys are evicted at the bound."""
+    table = TokenBucketTable(rate=0.001, burst=1, max_keys=100, clock=FakeClock())
+    for number in range(1000):
+        assert table.take(f"user{number}")
+    assert len(table) == 100
+    assert not table.take("user999")
+    assert table.take("user0")
+
+
+def test_source_and_user_limits() -> None:
+    """verifies that both the per-source and per-user buckets are enforced."""
+    limiter = LoginRateLimiter(user_burst=2, source_burst=3, clock=FakeClock())
+    for _ in range(2):
+        with limiter.attempt("alice", "10.0.0.1"):
+            pass
+    with pytest.raises(RateLimitExceeded, match="for this user"):
+        with limiter.attempt("alice", "10.0.0.1"):
+            pass
+    with pytest.raises(RateLimitExceeded, match="from this source"):
+        with limiter.attempt("bob", "10.0.0.1"):
+            pass
+    with limiter.attempt("bob", "10.0.0.2"):
+        pass
+    stats = limiter.stats()
+    assert (stats.allowed, stats.rejected, stats.active) == (3, 2, 0)
+
+
+def test_concurrency_cap_rejects_instead_of_queueing() -> None:
+    """verifies that attempts beyond the in-progress cap are refused."""
+    limiter = LoginRateLimiter(user_burst=10, max_concurrent=1, clock=FakeClock())
+    inside, release = threading.Event(), threading.Event()
+
+    def hold() -> None:
+        with limiter.attempt("alice"):
+            inside.set()
+            release.wait(5)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    inside.wait(5)
+    try:
+        with pytest.raises(RateLimitExceeded, match="in progress"):
+            with limiter.attempt("bob"):
+                pass
+    finally:
+        release.set()
+        worker.join()
+    with limiter.attempt("bob"):
+        pass
+
+
+def test_login_is_refused_before_hashing(passwd_file: Path) -> None:
+    """verifies that a throttled login fails fast with LoginRateLimited."""
+    roles = load_roles()
+    engine = AccessControlEngine(roles)
+    limiter = LoginRateLimiter(user_burst=1, clock=FakeClock())
+    with pytest.raises(LoginError, match="Invalid username or password"):
+        perform_login(
+            "sasha.kim", "wrong", engine, roles=roles, passwd_path=passwd_file, limiter=limiter
+        )
+    with pytest.raises(LoginRateLimited):
+        perform_login(
+            "sasha.kim",
+            "Aster!1A",
+            engine,
+            roles=roles,
+            passwd_path=passwd_file,
+            as_of=datetime(2025, 1, 1, 10, 0),
+            limiter=limiter,
+        )
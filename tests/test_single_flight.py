@@ -0,0 +1,77 @@
+"""Tests for single-flight credential verification."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from justinvest.credentials import hash_password
+from justinvest.single_flight import SingleFlightVerifier
+
+
+def gated_verifier(release: threading.Event, started: threading.Event, calls: list):
+    def verify(password: str, stored_hash: str) -> bool:
+        calls.append(password)
+        started.set()
+        release.wait(5)
+        if password == "boom":
+            raise RuntimeError("hash failure")
+        return password == "right"
+
+    return verify
+
+
+def run_concurrently(verifier, attempts, release, started, calls):
+    with ThreadPoolExecutor(max_workers=len(attempts)) as executor:
+        futures = [executor.submit(verifier.verify, *attempt) for attempt in attempts]
+        try:
+            assert started.wait(5), "no verification started"
+            deadline = time.monotonic() + 5
+            while verifier.stats().calls < len(attempts):
+                assert time.monotonic() < deadline, "not every caller reached the verifier"
+                time.sleep(0.001)
+        finally:
+            # let the workers finish even when the wait fails, so the
+            # executor can shut down and the test reports instead of hanging
+            release.set()
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_identical_checks_share_one_computation() -> None:
+    """verifies that concurrent identical verifications run the hash once."""
+    release, started, calls = threading.Event(), threading.Event(), []
+    verifier = SingleFlightVerifier(gated_verifier(release, started, calls))
+    results = run_concurrently(verifier, [("alice", "right", "h")] * 5, release, started, calls)
+    assert results == [True] * 5
+    assert calls == ["right"]
+    stats = verifier.stats()
+    assert (stats.calls, stats.computations, stats.coalesced) == (5, 1, 4)
+    assert verifier.in_flight == 0
+
+
+def test_different_candidates_are_not_shared() -> None:
+    """verifies that a wrong password never borrows the result of a right one."""
+    release, started, calls = threading.Event(), threading.Event(), []
+    verifier = SingleFlightVerifier(gated_verifier(release, started, calls))
+    attempts = [("alice", "right", "h"), ("alice", "wrong", "h"), ("bob", "right", "h")]
+    results = run_concurrently(verifier, attempts, release, started, calls)
+    assert results == [True, False, True]
+    assert verifier.stats().coalesced == 0
+
+
+def test_errors_reach_every_waiter() -> None:
+    """verifies that a failing check raises for all callers and is not kept."""
+    release, started, calls = threading.Event(), threading.Event(), []
+    verifier = SingleFlightVerifier(gated_verifier(release, started, calls))
+    results = run_concurrently(verifier, [("alice", "boom", "h")] * 3, release, started, calls)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert verifier.in_flight == 0
+
+
+def test_sequential_calls_recompute() -> None:
+    """verifies that nothing is cached once a verification completes."""
+    stored = hash_password("Secure@123", iterations=1000, salt_bytes=8)
+    verifier = SingleFlightVerifier()
+    assert verifier.verify("alice", "Secure@123", stored)
+    assert not verifier.verify("alice", "wrong", stored)
+    assert verifier.verify("alice", "Secure@123", stored)
+    assert verifier.stats().computations == 3
@@ -0,0 +1,105 @@
+"""Tests for the startup snapshot of roles, users and policy data."""
+
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+from justinvest.models import SessionContext
+from justinvest.policy_resources import PolicyResourceRegistry
+from justinvest.repository import load_users
+from justinvest.snapshot import _decode, _encode, load_startup_state
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def copy_data(tmp_path: Path) -> dict:
+    for name in ("roles.json", "users.json", "weak_passwords.txt"):
+        shutil.copy(DATA / name, tmp_path / name)
+    return {
+        "roles_path": tmp_path / "roles.json",
+        "users_path": tmp_path / "users.json",
+        "weak_passwords_path": tmp_path / "weak_passwords.txt",
+        "snapshot_path": tmp_path / "startup.snapshot",
+    }
+
+
+def test_second_start_uses_snapshot(tmp_path: Path) -> None:
+    """verifies that the snapshot is written once and then served as is."""
+    paths = copy_data(tmp_path)
+    first = load_startup_state(**paths)
+    assert not first.from_snapshot and paths["snapshot_path"].exists()
+    second = load_startup_state(**paths)
+    assert second.from_snapshot
+    assert second.roles == first.roles
+    assert second.users == first.users
+    assert second.weak_passwords == first.weak_passwords
+    assert load_startup_state(**paths, include_users=False).users is None
+
+
+def test_snapshot_state_is_usable(tmp_path: Path) -> None:
+    """verifies that the cached engine and credentials behave like fresh ones."""
+    paths = copy_data(tmp_path)
+    load_startup_state(**paths)
+    state = load_startup_state(**paths)
+    user = state.credential_store().authenticate("sasha.kim", "Aster!1A")
+    assert (user.username, user.role) == ("sasha.kim", "client")
+    noon = SessionContext(as_of=datetime(2024, 1, 2, 12))
+    evening = SessionContext(as_of=datetime(2024, 1, 2, 20))
+    assert state.engine.is_operation_allowed("client", "VIEW_ACCOUNT_BALANCE", noon).granted
+    assert state.engine.is_operation_allowed("teller", "VIEW_ACCOUNT_BALANCE", noon).granted
+    assert not state.engine.is_operation_allowed("teller", "VIEW_ACCOUNT_BALANCE", evening).granted
+    assert len(state.users) == len(load_users(paths["users_path"]))
+
+
+def test_touch_keeps_snapshot_but_edits_rebuild(tmp_path: Path) -> None:
+    """verifies that only a content change makes the snapshot stale."""
+    paths = copy_data(tmp_path)
+    load_startup_state(**paths)
+    roles = paths["roles_path"]
+    stat = roles.stat()
+    os.utime(roles, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_startup_state(**paths).from_snapshot
+    roles.write_text(roles.read_text().replace('"client"', '"customer"', 1))
+    state = load_startup_state(**paths)
+    assert not state.from_snapshot
+    assert "customer" in {role.name for role in state.roles}
+    assert load_startup_state(**paths).from_snapshot
+
+
+def test_corrupt_snapshot_is_rebuilt(tmp_path: Path) -> None:
+    """verifies that a damaged or foreign snapshot is replaced, not trusted."""
+    paths = copy_data(tmp_path)
+    expected = load_startup_state(**paths).users
+    snapshot = paths["snapshot_path"]
+    for damaged in (b"", b"JISS\xff\xff" + bytes(10), snapshot.read_bytes()[:-20]):
+        snapshot.write_bytes(damaged)
+        state = load_startup_state(**paths)
+        assert not state.from_snapshot and state.users == expected
+        assert load_startup_state(**paths).from_snapshot
+
+
+def test_code_change_rebuilds(tmp_path: Path) -> None:
+    """verifies that a snapshot written by other package code is not reused."""
+    paths = copy_data(tmp_path)
+    load_startup_state(**paths)
+    snapshot = paths["snapshot_path"]
+    known, body, lengths = _decode(snapshot.read_bytes())
+    size, mtime, _ = known["code:models.py"]
+    known["code:models.py"] = (size, mtime + 1, "0" * 32)
+    snapshot.write_bytes(_encode(known, body, lengths))
+    assert not load_startup_state(**paths).from_snapshot
+    assert load_startup_state(**paths).from_snapshot
+
+
+def test_policy_registry_is_seeded(tmp_path: Path) -> None:
+    """verifies that the weak-password list comes from the snapshot."""
+    paths = copy_data(tmp_path)
+    paths["weak_passwords_path"].write_text("zebra!9crab\n")
+    load_startup_state(**paths)
+    registry = PolicyResourceRegistry()
+    policy = load_startup_state(**paths).password_policy(registry=registry)
+    assert not policy.validate("new.user", "Zebra!9Crab").is_valid
+    assert policy.validate("new.user", "Qz7!vBn2").is_valid
+    stats = registry.stats()[("list", paths["weak_passwords_path"])]
+    assert stats.loads == 0 and stats.hits == 2
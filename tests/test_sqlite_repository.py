@@ -0,0 +1,172 @@
+"""Tests for the SQLite-backed repository."""
+
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from shutil import copyfile
+
+import pytest
+
+from justinvest.access_control import AccessControlEngine
+from justinvest.authentication import CredentialStore
+from justinvest.enrollment import EnrollmentError, enroll_user
+from justinvest.file_lock import file_lock
+from justinvest.hash_params import HashParameters
+from justinvest.login import LoginError, perform_login
+from justinvest.models import SessionContext, UserRecord
+from justinvest.password_file import get_record
+from justinvest.password_index import PasswordIndex, build_index
+from justinvest.password_policy import PasswordPolicy
+from justinvest.repository import load_roles, load_users
+from justinvest.sqlite_repository import RepositoryError, SqliteRepository, main
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture()
+def repository(tmp_path: Path):
+    passwd = tmp_path / "passwd.txt"
+    copyfile(ROOT / "passwd.txt", passwd)
+    repository = SqliteRepository(tmp_path / "justinvest.db")
+    repository.import_files(passwd_path=passwd)
+    yield repository
+    repository.close()
+
+
+def test_import_bridges_existing_files(repository: SqliteRepository) -> None:
+    """verifies that roles and users arrive intact from the flat files."""
+    assert [role.name for role in repository.load_roles()] == [
+        role.name for role in load_roles()
+    ]
+    teller = repository.get_role("teller")
+    assert teller.constraints[0].params["start"] == "09:00"
+    expected = {user.username: user for user in load_users()}
+    for username, user in expected.items():
+        assert repository.get_user(username) == user
+    assert len(repository) >= len(expected)
+    assert "nobody" not in repository
+
+
+def test_engine_and_login_use_database(repository: SqliteRepository) -> None:
+    """verifies that authorization and login work from the database alone."""
+    roles = repository.load_roles()
+    engine = AccessControlEngine(roles)
+    context = SessionContext(as_of=datetime(2025, 1, 1, 10, 0))
+    assert "VIEW_ACCOUNT_BALANCE" in engine.permitted_operations("teller", context)
+    result = perform_login(
+        "sasha.kim",
+        "Aster!1A",
+        engine,
+        roles=roles,
+        as_of=datetime(2025, 1, 1, 10, 0),
+        repository=repository,
+    )
+    assert result.role_label == "Client"
+    with pytest.raises(LoginError):
+        perform_login("sasha.kim", "wrong", engine, roles=roles, repository=repository)
+    credentials = CredentialStore.from_repository(repository)
+    assert credentials.authenticate("sasha.kim", "Aster!1A").full_name == "Sasha Kim"
+    assert credentials.authenticate("nobody", "Aster!1A") is None
+
+
+def test_rehash_on_login_updates_database(repository: SqliteRepository) -> None:
+    """verifies that an outdated hash is replaced in the database."""
+    roles = repository.load_roles()
+    params = HashParameters(scheme="scrypt", scrypt_n=2**8)
+    perform_login(
+        "sasha.kim",
+        "Aster!1A",
+        AccessControlEngine(roles),
+        roles=roles,
+        repository=repository,
+        rehash=params,
+    )
+    assert params.is_current(repository.get_user("sasha.kim").password_hash)
+
+
+def test_enrollment_is_transactional(repository: SqliteRepository, tmp_path: Path) -> None:
+    """verifies that enrollment writes one row and refuses duplicates."""
+    client = repository.get_role("client")
+    policy = PasswordPolicy(weak_passwords=[])
+    result = enroll_user("new.user", client, "Secure@123", policy=policy, repository=repository)
+    assert result.users_file == repository.path
+    assert repository.get_user("new.user").role == "client"
+    assert not (tmp_path / "users.json").exists()
+    with pytest.raises(EnrollmentError, match="already exists"):
+        enroll_user("new.user", client, "Secure@123", policy=policy, repository=repository)
+    with pytest.raises(RepositoryError):
+        repository.add_users(
+            [
+                UserRecord("other.user", "Other", "client", result.password_hash),
+                UserRecord("new.user", "Dup", "client", result.password_hash),
+            ]
+        )
+    assert "other.user" not in repository
+
+
+def test_threads_get_their_own_connections(repository: SqliteRepository) -> None:
+    """verifies that lookups work from several threads at once."""
+    errors = []
+
+    def lookup() -> None:
+        try:
+            for _ in range(50):
+                assert repository.get_user("sasha.kim") is not None
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+        finally:
+            repository.close()
+
+    threads = [threading.Thread(target=lookup) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_export_round_trip(repository: SqliteRepository, tmp_path: Path) -> None:
+    """verifies that exported files load back to the same users and roles."""
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "users.json.journal").write_text('{"username":"ghost","role":"client"}\n')
+    argv = [
+        "--db", str(repository.path), "export",
+        "--roles", str(out / "roles.json"),
+        "--users", str(out / "users.json"),
+        "--passwd", str(out / "passwd.txt"),
+    ]
+    assert main(argv) == 0
+    assert load_users(out / "users.json") == repository.load_users()
+    assert [role.name for role in load_roles(out / "roles.json")] == [
+        role.name for role in repository.load_roles()
+    ]
+    assert get_record("sasha.kim", out / "passwd.txt").role == "client"
+    assert json.loads((out / "roles.json").read_text())["roles"][0]["allow_self_signup"]
+
+
+def test_export_waits_for_file_locks(repository: SqliteRepository, tmp_path: Path) -> None:
+    """verifies that export replaces the files under their locks and reindexes passwd.txt."""
+    out = tmp_path / "out"
+    out.mkdir()
+    passwd = out / "passwd.txt"
+    passwd.write_text("old.user|client|pbkdf2_sha256$1$00$00\n")
+    build_index(passwd)
+    export = threading.Thread(
+        target=repository.export_files,
+        kwargs={
+            "roles_path": out / "roles.json",
+            "users_path": out / "users.json",
+            "passwd_path": passwd,
+        },
+    )
+    with file_lock(passwd):
+        export.start()
+        export.join(timeout=0.3)
+        assert export.is_alive()
+        assert get_record("old.user", passwd) is not None
+    export.join()
+    assert get_record("old.user", passwd) is None
+    with PasswordIndex.open(passwd) as index:
+        assert index.find_line("sasha.kim").startswith("sasha.kim|client|")
@@ -0,0 +1,66 @@
+"""Tests for signed session tokens."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from justinvest.access_control import AccessControlEngine
+from justinvest.login import LoginResult
+from justinvest.repository import load_roles
+from justinvest.tokens import TokenError, TokenService
+
+
+@pytest.fixture(scope="module")
+def service() -> TokenService:
+    engine = AccessControlEngine(load_roles())
+    return TokenService(b"s" * 32, engine, ttl=timedelta(minutes=30))
+
+
+def login_result(engine_role: str, codes: list[str]) -> LoginResult:
+    return LoginResult(
+        username="someone",
+        role_name=engine_role,
+        role_label=engine_role.title(),
+        allowed_operation_codes=codes,
+    )
+
+
+def test_token_round_trip(service: TokenService) -> None:
+    """verifies that a token carries the login's permitted operations."""
+    issued_at = datetime(2025, 1, 1, 10, 0)
+    token = service.issue(
+        login_result("client", ["VIEW_ACCOUNT_BALANCE", "VIEW_INVESTMENT_PORTFOLIO"]), issued_at
+    )
+    claims = service.verify_token(token, now=issued_at + timedelta(minutes=5))
+    assert claims.username == "someone"
+    assert claims.role_name == "client"
+    assert claims.allows("VIEW_ACCOUNT_BALANCE")
+    assert not claims.allows("MODIFY_INVESTMENT_PORTFOLIO")
+    assert claims.allowed_operation_codes == ["VIEW_ACCOUNT_BALANCE", "VIEW_INVESTMENT_PORTFOLIO"]
+    assert claims.expires_at == int((issued_at + timedelta(minutes=30)).timestamp())
+
+
+def test_token_expiry_capped_by_time_window(service: TokenService) -> None:
+    """verifies that a teller token dies when the business-hours window closes."""
+    issued_at = datetime(2025, 1, 1, 16, 50)
+    token = service.issue(login_result("teller", ["VIEW_ACCOUNT_BALANCE"]), issued_at)
+    assert service.verify_token(token, now=datetime(2025, 1, 1, 16, 59)).allows(
+        "VIEW_ACCOUNT_BALANCE"
+    )
+    with pytest.raises(TokenError, match="expired"):
+        service.verify_token(token, now=datetime(2025, 1, 1, 17, 0, 1))
+
+
+def test_tampered_token_rejected(service: TokenService) -> None:
+    """verifies that changing the payload or using another key breaks the signature."""
+    issued_at = datetime(2025, 1, 1, 10, 0)
+    token = service.issue(login_result("client", ["VIEW_ACCOUNT_BALANCE"]), issued_at)
+    version, payload, signature = token.split(".")
+    forged = ".".join([version, payload[:-2] + ("AA" if payload[-2:] != "AA" else "BB"), signature])
+    with pytest.raises(TokenError):
+        service.verify_token(forged, now=issued_at)
+    other = TokenService(b"t" * 32, AccessControlEngine(load_roles()))
+    with pytest.raises(TokenError, match="signature"):
+        other.verify_token(token, now=issued_at)
+    with pytest.raises(TokenError, match="Malformed"):
+        service.verify_token("not-a-token", now=issued_at)
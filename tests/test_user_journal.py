@@ -0,0 +1,88 @@
+"""Tests for the users.json journal."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from justinvest.repository import load_users
+from justinvest.user_journal import UserJournal, journal_path_for, main
+
+
+def entry(username: str, role: str = "client") -> dict:
+    return {
+        "username": username,
+        "full_name": username,
+        "role": role,
+        "password_hash": "pbkdf2_sha256$1$00$00",
+    }
+
+
+@pytest.fixture()
+def users_file(tmp_path: Path) -> Path:
+    path = tmp_path / "users.json"
+    path.write_text(json.dumps({"users": [entry("existing.user")]}), encoding="utf-8")
+    return path
+
+
+def test_append_does_not_rewrite_snapshot(users_file: Path) -> None:
+    """verifies that appends go to the journal and load_users merges them in."""
+    before = users_file.read_text(encoding="utf-8")
+    journal = UserJournal(users_file)
+    journal.append(entry("new.user"))
+    assert users_file.read_text(encoding="utf-8") == before
+    assert "new.user" in journal
+    assert "existing.user" in journal
+    assert [user.username for user in load_users(users_file)] == ["existing.user", "new.user"]
+
+
+def test_later_entries_replace_earlier_ones(users_file: Path) -> None:
+    """verifies that a journal entry for an existing user overrides the snapshot."""
+    UserJournal(users_file).append(entry("existing.user", role="premium_client"))
+    users = load_users(users_file)
+    assert len(users) == 1
+    assert users[0].role == "premium_client"
+
+
+def test_compaction_threshold(users_file: Path) -> None:
+    """verifies that the journal is folded into users.json once it is large enough."""
+    journal = UserJournal(users_file, compact_threshold=3)
+    journal.extend([entry("a.user"), entry("b.user")])
+    assert journal.pending_entries == 2
+    journal.append(entry("c.user"))
+    assert journal.pending_entries == 0
+    assert not journal_path_for(users_file).exists()
+    snapshot = json.loads(users_file.read_text(encoding="utf-8"))
+    assert [user["username"] for user in snapshot["users"]] == [
+        "existing.user",
+        "a.user",
+        "b.user",
+        "c.user",
+    ]
+    assert "c.user" in journal
+
+
+def test_index_follows_other_writers(users_file: Path) -> None:
+    """verifies that a journal notices entries appended by another instance."""
+    reader = UserJournal(users_file)
+    assert "late.user" not in reader
+    UserJournal(users_file).append(entry("late.user"))
+    assert "late.user" in reader
+
+
+def test_torn_journal_line_is_ignored(users_file: Path) -> None:
+    """verifies that a half-written trailing line does not break loading."""
+    journal_path_for(users_file).write_text(
+        json.dumps(entry("whole.user")) + "\n" + '{"username": "torn', encoding="utf-8"
+    )
+    assert [user.username for user in load_users(users_file)] == ["existing.user", "whole.user"]
+    UserJournal(users_file).append(entry("after.torn"))
+    assert [user.username for user in load_users(users_file)][-1] == "after.torn"
+
+
+def test_compact_command(users_file: Path, capsys) -> None:
+    """verifies that the compact entry point merges pending entries."""
+    UserJournal(users_file).append(entry("cli.user"))
+    assert main(["compact", str(users_file)]) == 0
+    assert "Compacted 1" in capsys.readouterr().out
+    assert not journal_path_for(users_file).exists()